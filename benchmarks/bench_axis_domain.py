@@ -0,0 +1,85 @@
+#File: bench_axis_domain.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Scaling of the axis domain scan of a figure, that references many
+##datafiles, with the number of workers. The statistics sidecars are
+##removed before every scan, such that all datafiles are read, and the
+##scan with all sidecars in place is shown for comparison.
+##Usage: python bench_axis_domain.py [files] [rows] [max_workers]
+
+
+import os
+import sys
+import glob
+import time
+import shutil
+import tempfile
+import multiprocessing
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from pgfdata import write_array_pgfplots_data_file
+from column_stats import STATS_SUFFIX
+from axis_domain import plot_domain
+
+
+def remove_sidecars(dir):
+  for filename in glob.glob(os.path.join(dir, '*'+STATS_SUFFIX)):
+    os.remove(filename)
+
+
+def timeit(func, *args, **kwargs):
+  start = time.time()
+  result = func(*args, **kwargs)
+  return time.time() - start, result
+
+
+def main(files=32, rows=200000, max_workers=None):
+  if (max_workers is None):
+    max_workers = multiprocessing.cpu_count()
+  tmpdir = tempfile.mkdtemp()
+  try:
+    references = []
+    for k in range(files):
+      datafilename = 'curve'+str(k)+'.pgfdat'
+      write_array_pgfplots_data_file(os.path.join(tmpdir, datafilename), np.random.randn(rows, 4)*(k+1), ['x', 'y', 'dx', 'dy'], column_stats=False)
+      references.append((datafilename, 'x', 'y'))
+    size = sum([os.path.getsize(os.path.join(tmpdir, reference[0])) for reference in references])
+    print "%d datafiles of %d rows, %.1f MB in total, %d CPUs" % (files, rows, size/1e6, multiprocessing.cpu_count())
+    print "%8s %12s %8s" % ('workers', 'time [s]', 'speedup')
+    serial = None
+    domain = None
+    workers = 1
+    while (workers <= max_workers):
+      remove_sidecars(tmpdir)
+      (elapsed, result) = timeit(plot_domain, tmpdir, references, workers=workers)
+      if (serial is None):
+        (serial, domain) = (elapsed, result)
+      elif (result != domain):
+        print "Error: the domain with "+str(workers)+" workers differs: "+str(result)+" != "+str(domain)
+      print "%8d %12.4f %8.2f" % (workers, elapsed, serial/elapsed)
+      workers *= 2
+    (elapsed, result) = timeit(plot_domain, tmpdir, references)
+    print "%8s %12.4f %8.2f" % ('cached', elapsed, serial/elapsed)
+    print "domain: "+str(domain)
+  finally:
+    shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:4]])
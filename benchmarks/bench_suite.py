@@ -0,0 +1,315 @@
+#File: bench_suite.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Benchmarks of the hot paths of py2pgftable on synthetic numeric, string
+##and mixed tables of 10^2 up to 10^7 cells. Every benchmark runs in its
+##own process, such that its peak memory can be measured, and pdflatex and
+##pdfcrop are replaced by the stubs in benchmarks/stubs, unless --real-latex
+##is given. The results are written to a JSON file, and can be compared to
+##the results of another commit with --compare.
+##Usage: python bench_suite.py [--min-exponent 2] [--max-exponent 6]
+##         [--kinds numeric,string,mixed] [--benchmarks write,read,...]
+##         [--repeat 3] [--output results.json] [--compare old.json]
+##Runs with Python 2.7 and numpy from any directory, e.g. from the root of
+##the repository: python2 benchmarks/bench_suite.py --max-exponent 4
+##io_routines of py2pgfplots is used if it is on the PYTHONPATH, otherwise
+##the fallbacks of src/io_fallback.py.
+
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import resource
+import tempfile
+import argparse
+import subprocess
+import multiprocessing
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, '..', 'tests'))
+from py2pgftable_module import py2pgftable
+from pgfdata import materialize_staged_columns
+
+# Number of columns of the synthetic tables:
+NCOLS = 10
+
+# Words of the string cells, some with underscores and math mode:
+WORDS = ['mesh', 'run_1', 'adaptive', 'dt_max', '$\\Delta t$', 'fixed', 'p_1', '$u_x$', 'coarse', 'fine_res']
+
+
+def numeric_table(rows, cols=NCOLS):
+  """ Returns the labels and a 2D float ndarray of a numeric table """
+  labels = ['col'+str(j) for j in range(cols)]
+  return labels, np.random.rand(rows, cols)*10.0**np.random.randint(-3, 4, size=cols)
+
+
+def string_table(rows, cols=NCOLS):
+  """ Returns the labels and a 2D list of strings of a string table """
+  labels = ['col_'+str(j) for j in range(cols)]
+  data = [[random.choice(WORDS)+'_'+str(i) for j in range(cols)] for i in range(rows)]
+  return labels, data
+
+
+def mixed_table(rows, cols=NCOLS):
+  """ Returns the labels and a 2D list of strings of a table with a name
+      column, followed by integer, float and boolean columns.
+  """
+  labels = ['name'] + ['col_'+str(j) for j in range(1, cols)]
+  kinds = [lambda i: str(i), lambda i: repr(random.random()), lambda i: str(random.random() > 0.5)]
+  data = [['sim_'+str(i)] + [kinds[j % 3](i) for j in range(1, cols)] for i in range(rows)]
+  return labels, data
+
+
+GENERATORS = {'numeric': numeric_table, 'string': string_table, 'mixed': mixed_table}
+
+
+def table_rows(data):
+  """ Returns the table as 2D list of strings """
+  if (isinstance(data, np.ndarray)):
+    return [[repr(value) for value in row] for row in data.tolist()]
+  return data
+
+
+def timed(func, *args, **kwargs):
+  """ Returns the wall time of func(*args, **kwargs) in seconds """
+  start = time.time()
+  func(*args, **kwargs)
+  return time.time() - start
+
+
+def bench_write(workdir, labels, data):
+  return timed(py2pgftable.write_pgfplots_data_file, None, os.path.join(workdir, 'data.pgfdat'), data, array_labels=labels)
+
+
+def bench_append_rows(workdir, labels, data):
+  filename = os.path.join(workdir, 'rows.pgfdat')
+  rows = table_rows(data)
+  py2pgftable.write_pgfplots_data_file_header_simple(filename, labels)
+  start = time.time()
+  for row in rows:
+    py2pgftable.append_pgfplots_data_file_simple(filename, row)
+  return time.time() - start
+
+
+def bench_append_columns(workdir, labels, data):
+  filename = os.path.join(workdir, 'cols.pgfdat')
+  rows = table_rows(data)
+  columns = [[labels[j]] + [row[j] for row in rows] for j in range(len(labels))]
+  py2pgftable.write_pgfplots_data_file_simple(filename, columns[0][1:], columns[1][1:], array_labels=labels[:2])
+  start = time.time()
+  for col in columns[2:]:
+    py2pgftable.append_column_pgfplots_data_file_simple(filename, col)
+  return time.time() - start
+
+
+def bench_append_columns_staged(workdir, labels, data):
+  filename = os.path.join(workdir, 'staged.pgfdat')
+  rows = table_rows(data)
+  columns = [[labels[j]] + [row[j] for row in rows] for j in range(len(labels))]
+  py2pgftable.write_pgfplots_data_file_simple(filename, columns[0][1:], columns[1][1:], array_labels=labels[:2])
+  start = time.time()
+  for col in columns[2:]:
+    py2pgftable.append_column_pgfplots_data_file_simple(filename, col, staged=True)
+  materialize_staged_columns(filename)
+  return time.time() - start
+
+
+def is_number(cell):
+  try:
+    float(cell)
+    return True
+  except ValueError:
+    return False
+
+
+def bench_read(workdir, labels, data):
+  # Only the numeric columns are read, the others cannot be converted to floats:
+  numeric_labels = [labels[j] for j in range(len(labels)) if is_number(table_rows(data[:1])[0][j])]
+  if (not numeric_labels):
+    return None
+  filename = os.path.join(workdir, 'read.pgfdat')
+  py2pgftable.write_pgfplots_data_file(None, filename, data, array_labels=labels)
+  start = time.time()
+  for label in numeric_labels:
+    py2pgftable.read_column_pgfplots_data_file(filename, label)
+  return time.time() - start
+
+
+def bench_escape(workdir, labels, data):
+  rows = table_rows(data)
+  start = time.time()
+  for row in rows:
+    for cell in row:
+      py2pgftable.remove_underscore_preserve_math_mode(cell, replace_char='\\_')
+  return time.time() - start
+
+
+def bench_tex(workdir, labels, data):
+  datafile = os.path.join(workdir, 'tex.pgfdat')
+  py2pgftable.write_pgfplots_data_file(None, datafile, data, array_labels=labels)
+  return timed(py2pgftable.write_pgfplotstable_tex_file, os.path.join(workdir, 'table.tex'), datafile, labels, data)
+
+
+def status_dict(labels, data):
+  """ Returns the table as dictionary of dictionaries, as taken by write_dict_status_pgftable """
+  rows = table_rows(data)
+  return dict([('row_'+str(i), dict(zip(labels[1:], rows[i][1:]))) for i in range(len(rows))])
+
+
+def bench_status(workdir, labels, data):
+  status = status_dict(labels, data)
+  return timed(py2pgftable.write_dict_status_pgftable, workdir, 'status.tex', status, labels[0], pdflatex=False)
+
+
+def bench_status_pdf(workdir, labels, data):
+  status = status_dict(labels, data)
+  return timed(py2pgftable.write_dict_status_pgftable, workdir, 'status.tex', status, labels[0])
+
+
+def bench_status_prerender_pdf(workdir, labels, data):
+  status = status_dict(labels, data)
+  return timed(py2pgftable.write_dict_status_pgftable, workdir, 'status.tex', status, labels[0], prerender=True)
+
+
+def bench_status_tightpage_pdf(workdir, labels, data):
+  status = status_dict(labels, data)
+  return timed(py2pgftable.write_dict_status_pgftable, workdir, 'status.tex', status, labels[0], tightpage=True)
+
+
+BENCHMARKS = [
+  ('write', bench_write),
+  ('append_rows', bench_append_rows),
+  ('append_columns', bench_append_columns),
+  ('append_columns_staged', bench_append_columns_staged),
+  ('read', bench_read),
+  ('escape', bench_escape),
+  ('tex', bench_tex),
+  ('status', bench_status),
+  ('status_pdf', bench_status_pdf),
+  ('status_prerender_pdf', bench_status_prerender_pdf),
+  ('status_tightpage_pdf', bench_status_tightpage_pdf),
+]
+
+
+def peak_rss_kb():
+  """ Returns the peak resident memory of this process in kB """
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  if (sys.platform == 'darwin'):
+    # ru_maxrss is in bytes on Mac OS
+    peak = peak // 1024
+  return peak
+
+
+def run_case(queue, name, kind, cells, repeat):
+  """ Runs one benchmark in a child process and puts its result into 'queue' """
+  try:
+    random.seed(cells)
+    np.random.seed(cells)
+    rows = max(1, cells // NCOLS)
+    (labels, data) = GENERATORS[kind](rows)
+    rss_data = peak_rss_kb()
+    func = dict(BENCHMARKS)[name]
+    times = []
+    for i in range(repeat):
+      workdir = tempfile.mkdtemp(prefix='py2pgftable_bench_')
+      try:
+        times.append(func(workdir, labels, data))
+      finally:
+        shutil.rmtree(workdir)
+    if (None in times):
+      queue.put({'benchmark': name, 'kind': kind, 'cells': rows*NCOLS, 'skipped': True})
+      return
+    peak = peak_rss_kb()
+    queue.put({'benchmark': name, 'kind': kind, 'cells': rows*NCOLS, 'rows': rows, 'cols': NCOLS,
+               'seconds': min(times), 'times': times, 'peak_rss_kb': peak, 'peak_rss_delta_kb': peak - rss_data})
+  except Exception as error:
+    queue.put({'benchmark': name, 'kind': kind, 'cells': cells, 'error': repr(error)})
+
+
+def git_commit():
+  """ Returns the commit of the source tree, or None """
+  try:
+    return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BENCHMARK_DIR, stderr=subprocess.STDOUT).strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def compare(results, filename):
+  """ Prints the time ratios of 'results' to the results stored in 'filename' """
+  infile = open(filename, 'r')
+  old = json.load(infile)
+  infile.close()
+  old_seconds = dict([((entry['benchmark'], entry['kind'], entry['cells']), entry['seconds']) for entry in old['results'] if 'seconds' in entry])
+  print
+  print "Compared to "+filename+" (commit "+str(old.get('commit'))+"):"
+  print "%-24s %-8s %10s %12s %12s %8s" % ('benchmark', 'kind', 'cells', 'old [s]', 'new [s]', 'ratio')
+  for entry in results:
+    key = (entry['benchmark'], entry['kind'], entry['cells'])
+    if ('seconds' in entry and key in old_seconds and old_seconds[key] > 0):
+      print "%-24s %-8s %10d %12.4f %12.4f %8.2f" % (key + (old_seconds[key], entry['seconds'], entry['seconds']/old_seconds[key]))
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Benchmarks of py2pgftable")
+  parser.add_argument('--min-exponent', type=int, default=2, help="smallest table has 10^min cells")
+  parser.add_argument('--max-exponent', type=int, default=6, help="largest table has 10^max cells, up to 7")
+  parser.add_argument('--kinds', default=','.join(sorted(GENERATORS.keys())), help="comma separated kinds of tables")
+  parser.add_argument('--benchmarks', default=','.join([name for (name, func) in BENCHMARKS]), help="comma separated benchmarks")
+  parser.add_argument('--repeat', type=int, default=3, help="runs of each benchmark, the fastest is reported")
+  parser.add_argument('--output', default='bench_results.json', help="JSON file the results are written to")
+  parser.add_argument('--compare', default=None, help="JSON file of earlier results to compare with")
+  parser.add_argument('--real-latex', action='store_true', help="use pdflatex and pdfcrop instead of the stubs")
+  args = parser.parse_args()
+  if (not args.real_latex):
+    os.environ['PATH'] = os.path.join(BENCHMARK_DIR, 'stubs')+os.pathsep+os.environ.get('PATH', '')
+  names = args.benchmarks.split(',')
+  for name in names:
+    if (not (name in dict(BENCHMARKS))):
+      parser.error("Unknown benchmark "+name)
+  results = []
+  print "%-24s %-8s %10s %12s %14s" % ('benchmark', 'kind', 'cells', 'time [s]', 'peak rss [kB]')
+  for exponent in range(args.min_exponent, args.max_exponent+1):
+    for kind in args.kinds.split(','):
+      for name in names:
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run_case, args=(queue, name, kind, 10**exponent, args.repeat))
+        process.start()
+        entry = queue.get()
+        process.join()
+        results.append(entry)
+        if ('error' in entry):
+          print "%-24s %-8s %10d %s" % (name, kind, 10**exponent, entry['error'])
+        elif ('skipped' in entry):
+          print "%-24s %-8s %10d %12s" % (name, kind, entry['cells'], 'skipped')
+        else:
+          print "%-24s %-8s %10d %12.4f %14d" % (name, kind, entry['cells'], entry['seconds'], entry['peak_rss_kb'])
+  outfile = open(args.output, 'w')
+  json.dump({'commit': git_commit(), 'python': sys.version.split()[0], 'numpy': np.__version__,
+             'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'stubs': not args.real_latex, 'results': results}, outfile, indent=1, sort_keys=True)
+  outfile.close()
+  print "Results written to "+args.output
+  if (args.compare is not None):
+    compare(results, args.compare)
+
+
+if __name__ == '__main__':
+  main()
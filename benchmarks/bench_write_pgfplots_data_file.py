@@ -0,0 +1,82 @@
+#File: bench_write_pgfplots_data_file.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Compares the bulk ndarray writer against the former row-by-row,
+##cell-by-cell loop of Py2pgfplots.write_pgfplots_data_file.
+##Usage: python bench_write_pgfplots_data_file.py [max_exponent]
+
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from pgfdata import write_array_pgfplots_data_file
+
+
+def legacy_write(filename, array, array_labels):
+  """ The per-cell loop as it was used for ndarrays before the bulk writer,
+      without the (no-op) underscore replacement. Works on a copy, as the
+      legacy loop modified its input.
+  """
+  array = array.astype(object)
+  for i in range(len(array)):
+    tmp = str(list(array[i])).replace('[','').replace(']','')
+    tmp = tmp.split(', ')
+    for j in range(len(tmp)):
+      array[i][j] = tmp[j]
+  datafile = open(filename, "w")
+  datafile.write('\t'.join(array_labels)+'\n')
+  for i in range(len(array)):
+    for j in range(len(array[0])):
+      datafile.write(str(array[i][j]))
+      datafile.write('\t')
+    datafile.write('\n')
+  datafile.close()
+
+
+def timeit(func, *args):
+  start = time.time()
+  func(*args)
+  return time.time() - start
+
+
+def main(max_exponent=7):
+  ncols = 10
+  tmpdir = tempfile.mkdtemp()
+  filename = os.path.join(tmpdir, 'bench.pgfdat')
+  print "%10s %12s %12s %8s %12s" % ('cells', 'legacy [s]', 'bulk [s]', 'speedup', 'bulk %.6g')
+  for exponent in range(4, max_exponent+1):
+    cells = 10**exponent
+    array = np.random.rand(cells // ncols, ncols)
+    labels = ['col'+str(j) for j in range(ncols)]
+    t_bulk = timeit(write_array_pgfplots_data_file, filename, array, labels)
+    t_fmt = timeit(write_array_pgfplots_data_file, filename, array, labels, '%.6g')
+    t_legacy = timeit(legacy_write, filename, array, labels)
+    print "%10d %12.4f %12.4f %8.1f %12.4f" % (cells, t_legacy, t_bulk, t_legacy/t_bulk, t_fmt)
+  os.remove(filename)
+  os.rmdir(tmpdir)
+
+
+if __name__ == '__main__':
+  if (len(sys.argv) > 1):
+    main(int(sys.argv[1]))
+  else:
+    main()
@@ -0,0 +1,282 @@
+#File: axis_domain.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Axis domains of pgfplots figures, to prevent pgfplots' '! Dimension too
+##large' error: the '\addplot table[x=..,y=..]{datafile}' commands of a
+##texfile are parsed, the min/max of their x and y columns are computed,
+##and written into the 'restrict x/y to domain' lines of the texfile.
+##The min/max of the columns are cached next to the datafiles, see
+##pgfdata.column_statistics, such that unchanged datafiles are not read again.
+##The other datafiles are scanned at the same time on a pool of workers.
+
+
+import os
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+from pgfdata import column_statistics, materialize_staged_columns
+from column_stats import load_column_stats
+
+
+# Maximum number of datafiles that are scanned at the same time, None for
+# the number of CPUs. Used if no number of workers is given, and several
+# datafiles of at least POOL_MIN_BYTES need scanning:
+DOMAIN_WORKERS = None
+
+# Size in bytes from which a datafile is worth a worker of its own. Smaller
+# datafiles are scanned faster than a pool of workers is started:
+POOL_MIN_BYTES = 1 << 22
+
+
+def datafile_error_message(datafilename):
+  """ Returns the error message for a datafile, whose columns could not be read """
+  return '\n'.join([
+    "++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++",
+    "Serious error was found. Please check your datafile",
+    "   \""+datafilename+"\"",
+    "for valid floating point numbers and",
+    "that the column labels are as they are supposed to be.",
+    "Skipping this datafile!",
+  ])
+
+
+def addplot_references(lines):
+  """ Returns the datafiles and columns plotted by the '\\addplot table'
+      commands in the given lines of a texfile. Commands without an x or
+      y column are skipped.
+      Input:
+       lines: List of strings of the lines of the texfile
+      Output:
+       references: List of tuples of the datafilename, as given in the
+         texfile, the x column name and the y column name
+  """
+  references = []
+  for line in lines:
+    line = line.strip()
+    if (not line.startswith('\\addplot')):
+      continue
+    # Get the datafilename:
+    datafilename = line.split('{')[-1].split('}')[0]
+    # And get the relevant columns of that datafile:
+    colnames = {}
+    for option in line.split('table[')[-1].split(']')[0].split(','):
+      option = option.replace(' ','')
+      for axis in ('x', 'y'):
+        if (option.startswith(axis+'=')):
+          colnames[axis] = option.split('=')[-1].strip()
+    if ('x' in colnames and 'y' in colnames):
+      references.append((datafilename, colnames['x'], colnames['y']))
+  return references
+
+
+def datafile_ranges(task):
+  """ Worker of scan_datafiles, returns the statistics of the given columns
+      of a datafile (see pgfdata.column_statistics), or None if they could
+      not be read.
+      Input:
+       task: Tuple of the path of the datafile and the list of column names
+  """
+  (filename, colnames) = task
+  try:
+    (stats, status) = column_statistics(filename, colnames)
+  except (IOError, OSError):
+    status = 2
+  if (status != 0):
+    return None
+  return stats
+
+
+def pool_workers(filenames):
+  """ Returns the number of workers that scan the given datafiles, if no
+      number is given: DOMAIN_WORKERS, or the number of CPUs, if several of
+      them have at least POOL_MIN_BYTES, and 1 otherwise.
+  """
+  large = 0
+  for filename in filenames:
+    try:
+      if (os.path.getsize(filename) >= POOL_MIN_BYTES):
+        large += 1
+    except OSError:
+      # A missing datafile is reported by its worker
+      pass
+  if (large < 2):
+    return 1
+  if (DOMAIN_WORKERS is None):
+    return multiprocessing.cpu_count()
+  return DOMAIN_WORKERS
+
+
+def map_workers(func, tasks, workers=1):
+  """ Returns [func(task) for task in tasks], computed on a pool of at most
+      'workers' processes, or in this process for workers=1. Within a worker
+      process of a multiprocessing.Pool, which must not start processes
+      itself, threads are used instead.
+      'func' must be a module level function, such that it can be pickled.
+  """
+  workers = max(1, min(workers, len(tasks)))
+  if (workers == 1):
+    return [func(task) for task in tasks]
+  if (multiprocessing.current_process().daemon):
+    pool = ThreadPool(workers)
+  else:
+    pool = multiprocessing.Pool(workers)
+  try:
+    results = pool.map(func, tasks, chunksize=1)
+  finally:
+    pool.close()
+    pool.join()
+  return results
+
+
+def scan_datafiles(dir, references, workers=None):
+  """ Returns the statistics of the columns of the references of
+      addplot_references. Statistics cached next to the datafiles are used
+      as they are, the other datafiles are read each once for all of its
+      columns, at the same time on a pool of 'workers' processes.
+      Input:
+       dir: Directory the datafiles are relative to
+       references: List of tuples of the datafilename, x and y column name
+       workers: Maximum number of datafiles read at the same time, None
+         to use a pool only for several large datafiles, see pool_workers
+      Output:
+       scanned: Dictionary with the datafilenames as keys, and as values the
+         statistics of their columns, see pgfdata.column_statistics, or None
+         if the datafile could not be read
+  """
+  datafilenames = []
+  colnames = {}
+  for (datafilename, xcolname, ycolname) in references:
+    if (not (datafilename in colnames)):
+      datafilenames.append(datafilename)
+      colnames[datafilename] = []
+    for colname in (xcolname, ycolname):
+      if (not (colname in colnames[datafilename])):
+        colnames[datafilename].append(colname)
+  scanned = {}
+  tasks = []
+  for datafilename in datafilenames:
+    filename = os.path.join(dir, datafilename)
+    # Staged columns only exist in this process, so write them before the workers read the datafile:
+    materialize_staged_columns(filename)
+    stored = load_column_stats(filename)
+    if (all([colname in stored for colname in colnames[datafilename]])):
+      scanned[datafilename] = dict([(colname, stored[colname]) for colname in colnames[datafilename]])
+    else:
+      tasks.append((datafilename, (filename, colnames[datafilename])))
+  if (workers is None):
+    workers = pool_workers([filename for (datafilename, (filename, task_colnames)) in tasks])
+  for ((datafilename, task), stats) in zip(tasks, map_workers(datafile_ranges, [task for (datafilename, task) in tasks], workers)):
+    if (stats is None):
+      # Error occured, so skip this datafile
+      print datafile_error_message(datafilename)
+    scanned[datafilename] = stats
+  return scanned
+
+
+def merge_domains(domains):
+  """ Returns the tuple (xmin, xmax, ymin, ymax) enclosing all given
+      domains, ignoring None entries. Returns None if there is no domain.
+  """
+  domains = [domain for domain in domains if domain is not None]
+  if (not domains):
+    return None
+  return (min([domain[0] for domain in domains]), max([domain[1] for domain in domains]),
+          min([domain[2] for domain in domains]), max([domain[3] for domain in domains]))
+
+
+def plot_domain(dir, references, workers=None):
+  """ Returns the tuple (xmin, xmax, ymin, ymax) of the whole plot, that
+      encloses the columns of all references of addplot_references, or None
+      if none of their datafiles could be read. The datafiles are scanned
+      by 'workers' workers, see scan_datafiles.
+  """
+  scanned = scan_datafiles(dir, references, workers=workers)
+  domains = []
+  for (datafilename, xcolname, ycolname) in references:
+    stats = scanned[datafilename]
+    if (stats is None):
+      continue
+    domain = (stats[xcolname]['min'], stats[xcolname]['max'], stats[ycolname]['min'], stats[ycolname]['max'])
+    # Columns without a valid number do not restrict the domain:
+    if (not (None in domain)):
+      domains.append(domain)
+  return merge_domains(domains)
+
+
+def restrict_domain_lines(lines, domain, scale_only_axis=True):
+  """ Returns the lines of a texfile, with the bounds of the 'restrict x to
+      domain' and 'restrict y to domain' lines, or their commented out
+      versions, set to the given domain.
+      Input:
+       lines: List of strings of the lines of the texfile, with line endings
+       domain: Tuple of (xmin, xmax, ymin, ymax), the bounds are written by
+         their repr, such that no digits are lost
+       scale_only_axis: Boolean determining if the 'scale only axis' option
+         is kept, otherwise it is commented out
+  """
+  (xmin, xmax, ymin, ymax) = domain
+  new_lines = []
+  for line in lines:
+    # Find line starting with 'scale only axis':
+    if (line.strip().startswith('scale only axis') and not scale_only_axis):
+      # Commenting out 'scale only axis command:
+      new_lines.append(line.split('scale only axis')[0]+'% scale only axis'+line.split('scale only axis')[-1])
+    elif (line.strip().startswith('restrict x to domain') or line.strip().replace(' ','').startswith('%restrictxtodomain')):
+      precmndstring = line.split('restrict x to domain')[0].split('%')[0]
+      new_lines.append(precmndstring+'restrict x to domain='+repr(float(xmin))+':'+repr(float(xmax))+', % use this if you get a \'dimension too large\' error\n')
+    elif (line.strip().startswith('restrict y to domain') or line.strip().replace(' ','').startswith('%restrictytodomain')):
+      precmndstring = line.split('restrict y to domain')[0].split('%')[0]
+      new_lines.append(precmndstring+'restrict y to domain='+repr(float(ymin))+':'+repr(float(ymax))+', % use this if you get a \'dimension too large\' error\n')
+    else:
+      new_lines.append(line)
+  return new_lines
+
+
+def restrict_axis_domains(dir, texfilename, scale_only_axis=True, workers=None):
+  """ Sets the 'restrict x/y to domain' lines of the texfile 'texfilename'
+      in 'dir' to the domain of its '\\addplot table' data. The texfile is
+      only rewritten if its content changes. Returns True if it was.
+      Input:
+       dir: Directory name where the tex file is in, the datafiles of the
+         addplot commands are relative to it
+       texfilename: Name of the tex file
+       scale_only_axis: Boolean, if False, the 'scale only axis' option is
+         commented out, too
+       workers: Maximum number of datafiles read at the same time, None to
+         use a pool only for several large datafiles, see pool_workers
+  """
+  texfile = open(os.path.join(dir, texfilename), 'r')
+  content = texfile.read()
+  texfile.close()
+  # Texfiles without figures, e.g. of tables, are not parsed:
+  if (not ('\\addplot' in content)):
+    return False
+  texfile_lines = content.splitlines(True)
+  references = addplot_references(texfile_lines)
+  if (not references):
+    return False
+  domain = plot_domain(dir, references, workers=workers)
+  if (domain is None):
+    return False
+  new_texfile_lines = restrict_domain_lines(texfile_lines, domain, scale_only_axis=scale_only_axis)
+  if (new_texfile_lines == texfile_lines):
+    return False
+  # Now the new lines of the texfile have been assembled, write them to disk:
+  texfile = open(os.path.join(dir, texfilename), 'w')
+  texfile.write(''.join(new_texfile_lines))
+  texfile.close()
+  return True
@@ -0,0 +1,227 @@
+#File: build_manifest.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Build manifest for incremental rebuilds. Generated files are only
+##written if their content changed, so their mtimes stay stable, and
+##the hashes of the inputs of each pdf are recorded, such that pdflatex
+##and pdfcrop can be skipped if none of the inputs changed.
+
+
+import os
+import glob
+import json
+import hashlib
+import threading
+
+
+# Name of the manifest file, stored in the directory of the tables:
+MANIFEST_FILENAME = '.py2pgftable_manifest.json'
+
+# Serializes saving of manifests by background builds:
+manifest_lock = threading.Lock()
+
+
+def hash_content(content):
+  """ Returns the SHA1 hex digest of a string """
+  return hashlib.sha1(content).hexdigest()
+
+
+def hash_file(filename):
+  """ Returns the SHA1 hex digest of the content of a file,
+      or None if the file does not exist.
+  """
+  if (not os.path.isfile(filename)):
+    return None
+  sha1 = hashlib.sha1()
+  infile = open(filename, 'rb')
+  for block in iter(lambda: infile.read(1 << 20), ''):
+    sha1.update(block)
+  infile.close()
+  return sha1.hexdigest()
+
+
+def write_text_file(filename, content, manifest=None):
+  """ Writes the string 'content' to 'filename' with a single write. If a
+      BuildManifest is given, the file is only written if its content changed.
+      Returns True if the file was written.
+  """
+  if (manifest is not None):
+    return manifest.write_file(filename, content)
+  outfile = open(filename, 'w')
+  outfile.write(content)
+  outfile.close()
+  return True
+
+
+class BuildManifest:
+  """
+     Records the hashes of generated files, and the hashes of the inputs
+     that produced each target (e.g. a pdf), in the file MANIFEST_FILENAME
+     in 'directory'. Call save() to store the manifest after a build. Only
+     the entries changed through this object are saved, such that several
+     BuildManifest objects of the same directory can be used at once.
+     Input:
+      directory: String of the directory in which the tables are built
+  """
+
+  def __init__(self, directory):
+    self.directory = directory
+    self.filename = os.path.join(directory, MANIFEST_FILENAME)
+    (self.files, self.targets) = self.load()
+    self.changed_files = set()
+    self.changed_targets = set()
+
+  def load(self):
+    """ Returns the file and target entries stored on disk """
+    try:
+      manifest_file = open(self.filename, 'r')
+      entries = json.load(manifest_file)
+      manifest_file.close()
+      return entries.get('files', {}), entries.get('targets', {})
+    except (IOError, ValueError):
+      # No, or no valid manifest, so everything will be rebuilt:
+      return {}, {}
+
+  def key(self, filename):
+    """ Returns the path of 'filename' relative to the manifest's directory """
+    return os.path.relpath(os.path.abspath(filename), os.path.abspath(self.directory))
+
+  def save(self):
+    """ Writes the entries changed since the last save to the manifest on disk """
+    manifest_lock.acquire()
+    try:
+      (files, targets) = self.load()
+      for key in self.changed_files:
+        files[key] = self.files[key]
+      for key in self.changed_targets:
+        targets[key] = self.targets[key]
+      tmpfilename = self.filename+'.tmp'
+      manifest_file = open(tmpfilename, 'w')
+      json.dump({'files': files, 'targets': targets}, manifest_file, indent=1, sort_keys=True)
+      manifest_file.close()
+      os.rename(tmpfilename, self.filename)
+      self.files = files
+      self.targets = targets
+      self.changed_files = set()
+      self.changed_targets = set()
+    finally:
+      manifest_lock.release()
+
+  def write_file(self, filename, content):
+    """ Writes 'content' to 'filename', unless the file already has
+        exactly this content. Returns True if the file was written.
+    """
+    digest = hash_content(content)
+    self.files[self.key(filename)] = digest
+    self.changed_files.add(self.key(filename))
+    if (hash_file(filename) == digest):
+      return False
+    outfile = open(filename, 'w')
+    outfile.write(content)
+    outfile.close()
+    return True
+
+  def replace_file(self, tmpfilename, filename):
+    """ Moves the freshly written file 'tmpfilename' to 'filename', unless
+        'filename' already has the same content, in which case 'tmpfilename'
+        is removed and 'filename' is not touched. Returns True if 'filename'
+        was replaced.
+    """
+    digest = hash_file(tmpfilename)
+    self.files[self.key(filename)] = digest
+    self.changed_files.add(self.key(filename))
+    if (hash_file(filename) == digest):
+      os.remove(tmpfilename)
+      return False
+    os.rename(tmpfilename, filename)
+    return True
+
+  def is_current(self, target, inputs, options=None):
+    """ Returns True if 'target' exists, was not modified since it was
+        recorded, and was built from inputs with the current content,
+        with the same options.
+        Input:
+         target: String of the filename of the built file, e.g. a pdf
+         inputs: List of filenames the target was built from
+         options: Dictionary of the options of the build, that change the
+           target, but are not stored in the inputs, e.g. pgftable_build_options
+    """
+    entry = self.targets.get(self.key(target))
+    if (entry is None or hash_file(target) != entry['hash']):
+      return False
+    if (entry.get('options') != options):
+      return False
+    recorded = entry['inputs']
+    if (sorted(recorded.keys()) != sorted([self.key(filename) for filename in inputs])):
+      return False
+    for filename in inputs:
+      if (hash_file(filename) != recorded[self.key(filename)]):
+        return False
+    return True
+
+  def record(self, target, inputs, options=None):
+    """ Records that 'target' was built from the current content of 'inputs',
+        with the given options, see is_current.
+    """
+    self.targets[self.key(target)] = {
+      'hash': hash_file(target),
+      'inputs': dict([(self.key(filename), hash_file(filename)) for filename in inputs]),
+      'options': options,
+    }
+    self.changed_targets.add(self.key(target))
+
+
+def pgftable_data_filename(directory, texfilename):
+  """ Returns the filename of the datafile of the table 'texfilename', as
+      written by Py2pgfplots.write_dict_status_pgftable.
+  """
+  return directory+'/'+texfilename.split('.tex')[0].split('/')[-1]+'_data.pgfdat'
+
+
+def pgftable_chunk_filename(directory, texfilename, index):
+  """ Returns the filename of the datafile of chunk 'index' of a table, whose
+      rows were split into chunks by Py2pgfplots.write_dict_status_pgftable.
+  """
+  return pgftable_data_filename(directory, texfilename)[:-len('.pgfdat')]+'_part'+str(index)+'.pgfdat'
+
+
+def pgftable_chunk_filenames(directory, texfilename):
+  """ Returns the list of the existing chunk datafiles of a table, ordered by index """
+  prefix = pgftable_data_filename(directory, texfilename)[:-len('.pgfdat')]+'_part'
+  chunks = []
+  for filename in glob.glob(prefix+'*.pgfdat'):
+    index = filename[len(prefix):-len('.pgfdat')]
+    if (index.isdigit()):
+      chunks.append((int(index), filename))
+  return [filename for (index, filename) in sorted(chunks)]
+
+
+def pgftable_build_inputs(directory, texfilename):
+  """ Returns the list of files pdflatex reads to build the pdf of a table
+      written by Py2pgfplots.write_dict_status_pgftable.
+  """
+  (texfile_path, texfile) = os.path.split(directory+'/'+texfilename)
+  return [texfile_path+'/'+texfile, texfile_path+'/pgftablesettings_'+texfile, pgftable_data_filename(directory, texfilename)] + pgftable_chunk_filenames(directory, texfilename)
+
+
+def pgftable_build_options(pdfcrop, tightpage):
+  """ Returns the options of the build of a table's pdf, that are recorded
+      in the manifest with its inputs: if it is cropped with pdfcrop, and
+      if its page is cropped by pdflatex (tightpage).
+  """
+  return {'pdfcrop': bool(pdfcrop), 'tightpage': bool(tightpage)}
@@ -0,0 +1,238 @@
+#File: column_schema.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Infers the type of every column of a table from the whole column (or a
+##sample of its rows) with numpy, and caches the resulting schema in a
+##sidecar file next to the datafile, see column_stats for the invalidation.
+##The schema is stored with the content hash recorded by the writer of the
+##datafile, such that it stays valid if the same content is written again.
+
+
+import json
+import numpy as np
+from column_stats import file_signature, content_sha1
+
+
+# Suffix of the sidecar files holding the column schema:
+SCHEMA_SUFFIX = '.schema'
+
+# Column classes:
+INTEGER = 'integer'
+FLOAT = 'float'
+BOOLEAN = 'boolean'
+STRING = 'string'
+
+# Most decimals that are looked for in floating point columns:
+MAX_DECIMALS = 15
+
+# Number of rows, evenly spread over the table, the schema of a status table
+# is inferred from, see sample_indices:
+SAMPLE_ROWS = 1000
+
+
+class ColumnSchema:
+  """
+     Type information of one column of a table.
+     Attributes:
+      colname: String of the column name
+      dtype: String of the numpy dtype of the column's values
+      kind: One of 'integer', 'float', 'boolean' or 'string'
+      max_magnitude: Largest absolute value of a numeric column, None otherwise
+      decimals: Number of decimals needed to show all values of a numeric
+        column exactly (up to MAX_DECIMALS), None otherwise
+  """
+
+  def __init__(self, colname, dtype, kind, max_magnitude=None, decimals=None):
+    self.colname = colname
+    self.dtype = dtype
+    self.kind = kind
+    self.max_magnitude = max_magnitude
+    self.decimals = decimals
+
+  def __repr__(self):
+    return "ColumnSchema("+str(self.colname)+", "+self.kind+", dtype="+self.dtype+")"
+
+  def to_dict(self):
+    return {'colname': self.colname, 'dtype': self.dtype, 'kind': self.kind, 'max_magnitude': self.max_magnitude, 'decimals': self.decimals}
+
+
+def sample_indices(rows, sample_rows=None):
+  """ Returns the indices of evenly spread rows, or None for all rows """
+  if (sample_rows is None or rows <= sample_rows):
+    return None
+  return np.unique(np.linspace(0, rows-1, sample_rows).astype(int))
+
+
+def needed_decimals(values):
+  """ Returns the number of decimals needed to show all finite values exactly """
+  values = values[np.isfinite(values)]
+  for decimals in range(MAX_DECIMALS):
+    if (np.all(np.round(values, decimals) == values)):
+      return decimals
+  return MAX_DECIMALS
+
+
+def numeric_schema(colname, values, kind):
+  """ Returns the ColumnSchema of a numeric column """
+  finite = np.abs(values[np.isfinite(values)])
+  max_magnitude = float(finite.max()) if len(finite) else None
+  if (kind == INTEGER):
+    decimals = 0
+  else:
+    decimals = needed_decimals(values)
+  return ColumnSchema(colname, str(values.dtype), kind, max_magnitude, decimals)
+
+
+def infer_string_column(colname, cells):
+  """ Returns the ColumnSchema of a column given as numpy array of strings """
+  cells = np.char.strip(cells.astype(str))
+  if (len(cells) == 0):
+    return ColumnSchema(colname, str(cells.dtype), STRING)
+  if (np.all(np.in1d(cells, ['True', 'False']))):
+    return ColumnSchema(colname, 'bool', BOOLEAN)
+  try:
+    values = cells.astype(float)
+  except ValueError:
+    return ColumnSchema(colname, str(cells.dtype), STRING)
+  # Integers have only digits, after an optional sign:
+  if (np.all(np.char.isdigit(np.char.lstrip(cells, '+-')))):
+    return numeric_schema(colname, values, INTEGER)
+  return numeric_schema(colname, values, FLOAT)
+
+
+def infer_column(colname, col):
+  """ Returns the ColumnSchema of a single 1D numpy array """
+  if (col.dtype.kind == 'b'):
+    return ColumnSchema(colname, str(col.dtype), BOOLEAN)
+  if (col.dtype.kind in 'iu'):
+    return numeric_schema(colname, col.astype(float), INTEGER)
+  if (col.dtype.kind == 'f'):
+    return numeric_schema(colname, col, FLOAT)
+  return infer_string_column(colname, col)
+
+
+def infer_column_schema(data, colnames, sample_rows=None):
+  """ Infers the schema of all columns of a table at once.
+      Input:
+       data: 2D list of the table's rows, 2D numpy array, or structured/record array
+       colnames: List of the column names
+       sample_rows: Number of rows to inspect, evenly spread over the table,
+         None to inspect all rows
+      Output:
+       schema: List of ColumnSchema, one for each column
+  """
+  if (isinstance(data, np.ndarray) and data.dtype.names is not None):
+    indices = sample_indices(len(data), sample_rows)
+    if (indices is not None):
+      data = data[indices]
+    return [infer_column(colname, data[name]) for (colname, name) in zip(colnames, data.dtype.names)]
+  indices = sample_indices(len(data), sample_rows)
+  if (isinstance(data, np.ndarray)):
+    table = data
+  else:
+    if (indices is not None):
+      data = [data[i] for i in indices]
+      indices = None
+    table = np.array([[str(cell) for cell in row] for row in data])
+  if (indices is not None):
+    table = table[indices]
+  if (table.ndim != 2):
+    table = table.reshape(len(table), len(colnames))
+  return [infer_column(colnames[j], table[:, j]) for j in range(len(colnames))]
+
+
+def infer_columns_schema(columns, colnames, sample_rows=None):
+  """ Infers the schema of a table given as list of 1D column arrays,
+      see infer_column_schema. Only the rows of the sample are taken from
+      the columns, such that the string columns are not converted as a whole.
+  """
+  indices = sample_indices(len(columns[0]) if columns else 0, sample_rows)
+  if (indices is not None):
+    columns = [col[indices] for col in columns]
+  return [infer_column(colnames[j], columns[j]) for j in range(len(colnames))]
+
+
+def schema_filename(filename):
+  """ Returns the filename of the schema sidecar of a datafile """
+  return filename + SCHEMA_SUFFIX
+
+
+def store_column_schema(filename, schema, sample_rows=None):
+  """ Stores the schema of the datafile 'filename' in its sidecar file, with
+      the number of rows it was inferred from, see infer_column_schema.
+      This must be called after the datafile was written.
+  """
+  entry = {'file': file_signature(filename, sha1=content_sha1(filename)), 'sample_rows': sample_rows, 'columns': [col.to_dict() for col in schema]}
+  try:
+    schemafile = open(schema_filename(filename), 'w')
+    json.dump(entry, schemafile)
+    schemafile.close()
+  except IOError:
+    # The cache is optional, if it cannot be written, the schema is inferred again.
+    pass
+
+
+def load_column_schema(filename, colnames, sample_rows=None):
+  """ Returns the stored schema of the datafile 'filename', or None if no
+      schema was stored for the current content of the datafile, or if it
+      was stored for other columns, or inferred from another number of rows.
+  """
+  try:
+    schemafile = open(schema_filename(filename), 'r')
+    entry = json.load(schemafile)
+    schemafile.close()
+    signature = file_signature(filename)
+  except (IOError, OSError, ValueError):
+    return None
+  stored = entry.get('file', {})
+  for key in signature:
+    if (stored.get(key) != signature[key]):
+      return None
+  if (entry.get('sample_rows') != sample_rows):
+    return None
+  columns = entry.get('columns', [])
+  if ([col['colname'] for col in columns] != list(colnames)):
+    return None
+  return [ColumnSchema(str(col['colname']), str(col['dtype']), str(col['kind']), col['max_magnitude'], col['decimals']) for col in columns]
+
+
+def column_schema(filename, data, colnames, sample_rows=None, infer=infer_column_schema):
+  """ Returns the schema of a table, from the sidecar of its datafile if it
+      is up to date, and otherwise infers it from 'data' and stores it.
+      Input:
+       filename: String of the filename of the datafile, or None
+       data: Data of the table, see infer_column_schema
+       colnames: List of the column names
+       sample_rows: Number of rows to inspect, see infer_column_schema
+       infer: Function inferring the schema of 'data', e.g. infer_columns_schema
+         if 'data' is a list of column arrays
+      Output:
+       schema: List of ColumnSchema, one for each column
+  """
+  if (filename is not None):
+    schema = load_column_schema(filename, colnames, sample_rows=sample_rows)
+    if (schema is not None):
+      return schema
+  schema = infer(data, colnames, sample_rows=sample_rows)
+  if (filename is not None):
+    try:
+      store_column_schema(filename, schema, sample_rows=sample_rows)
+    except OSError:
+      # The datafile does not exist (yet), so there is nothing to cache the schema for
+      pass
+  return schema
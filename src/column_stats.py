@@ -0,0 +1,196 @@
+#File: column_stats.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Per-column statistics (min/max/count/NaN-count) of pgfplots datafiles,
+##stored in a sidecar file next to the datafile. The sidecar records the
+##size and modification time (or a content hash) of the datafile, so the
+##statistics are invalidated automatically if the datafile changes.
+##Writers also record the content hash of the datafiles they write, such
+##that sidecars stay valid if a datafile is rewritten with the same content.
+
+
+import os
+import json
+import hashlib
+import numpy as np
+
+
+# Suffix of the sidecar files holding the column statistics:
+STATS_SUFFIX = '.colstats'
+
+
+def stats_filename(filename):
+  """ Returns the filename of the statistics sidecar of a datafile """
+  return filename + STATS_SUFFIX
+
+
+def file_signature(filename, use_hash=False, sha1=None):
+  """ Returns a dictionary identifying the current content of 'filename'
+      by its size and modification time, plus a SHA1 hash of its content
+      if 'use_hash' is True. A hash 'sha1' known from writing the file is
+      recorded as it is.
+  """
+  stat = os.stat(filename)
+  signature = {'size': stat.st_size, 'mtime': stat.st_mtime}
+  if (sha1 is not None and not use_hash):
+    signature['sha1'] = sha1
+  elif (use_hash):
+    sha1 = hashlib.sha1()
+    datafile = open(filename, 'rb')
+    for block in iter(lambda: datafile.read(1 << 20), ''):
+      sha1.update(block)
+    datafile.close()
+    signature['sha1'] = sha1.hexdigest()
+  return signature
+
+
+def compute_column_stats(values):
+  """ Computes the statistics of a 1D numeric array.
+      Input:
+       values: 1D numpy array of numbers
+      Output:
+       stats: Dictionary with the entries 'min', 'max', 'count' and 'nan_count',
+         whereas min and max ignore NaN values and are None if the column
+         has no valid number.
+  """
+  values = np.asarray(values)
+  narrow = (values.dtype.kind == 'f' and values.dtype.itemsize < 8)
+  if (not narrow):
+    values = values.astype(float)
+  nan_count = int(np.isnan(values).sum())
+  if (nan_count < len(values)):
+    vmin = np.nanmin(values); vmax = np.nanmax(values)
+    if (narrow):
+      # As written to the datafile, see pgfdata.narrow_float_column:
+      vmin = str(vmin); vmax = str(vmax)
+    vmin = float(vmin); vmax = float(vmax)
+  else:
+    vmin = None; vmax = None
+  return {'min': vmin, 'max': vmax, 'count': len(values), 'nan_count': nan_count}
+
+
+def merge_column_stats(stats, other):
+  """ Combines the statistics of two parts of the same column """
+  if (stats is None):
+    return other
+  if (other['min'] is None):
+    vmin = stats['min']; vmax = stats['max']
+  elif (stats['min'] is None):
+    vmin = other['min']; vmax = other['max']
+  else:
+    vmin = min(stats['min'], other['min']); vmax = max(stats['max'], other['max'])
+  return {'min': vmin, 'max': vmax, 'count': stats['count']+other['count'], 'nan_count': stats['nan_count']+other['nan_count']}
+
+
+def store_column_stats(filename, columns, merge=False, use_hash=False, sha1=None):
+  """ Stores the statistics of the datafile 'filename' in its sidecar file.
+      This must be called after the datafile was written.
+      Input:
+       filename: String of the filename of the datafile
+       columns: Dictionary with the column names as keys and the statistics
+         of the columns (see compute_column_stats) as values
+       merge: Boolean determining if the statistics are added to the ones
+         that are already stored for the current content of the datafile
+       use_hash: Boolean determining if the datafile is identified by a
+         hash of its content, rather than only by its size and mtime
+       sha1: SHA1 hash of the content of the datafile, if known from writing
+         it, see restamp_sidecar. Otherwise the recorded hash is kept on merge.
+  """
+  if (sha1 is None and merge):
+    sha1 = content_sha1(filename)
+  if (merge):
+    stored = load_column_stats(filename, use_hash=use_hash)
+    stored.update(columns)
+    columns = stored
+  entry = {'file': file_signature(filename, use_hash=use_hash, sha1=sha1), 'columns': columns}
+  try:
+    statsfile = open(stats_filename(filename), 'w')
+    json.dump(entry, statsfile)
+    statsfile.close()
+  except IOError:
+    # The cache is optional, if it cannot be written, statistics are recomputed.
+    pass
+
+
+def load_column_stats(filename, use_hash=False):
+  """ Returns the stored statistics of the datafile 'filename' as dictionary
+      with the column names as keys. The dictionary is empty if no statistics
+      were stored, or if the datafile has changed since they were stored.
+  """
+  entry = load_sidecar(stats_filename(filename))
+  if (entry is None):
+    return {}
+  stored = entry.get('file', {})
+  try:
+    signature = file_signature(filename, use_hash=use_hash)
+  except OSError:
+    return {}
+  for key in signature:
+    if (stored.get(key) != signature[key]):
+      return {}
+  return entry.get('columns', {})
+
+
+def load_sidecar(sidecar_filename):
+  """ Returns the entry stored in a sidecar file, None if there is none """
+  try:
+    sidecar = open(sidecar_filename, 'r')
+    entry = json.load(sidecar)
+    sidecar.close()
+  except (IOError, ValueError):
+    return None
+  return entry
+
+
+def content_sha1(filename):
+  """ Returns the SHA1 hash of the content of the datafile 'filename', as
+      recorded in its statistics sidecar by the writer of the datafile, or
+      None if it was not recorded for the current content.
+  """
+  entry = load_sidecar(stats_filename(filename))
+  if (entry is None):
+    return None
+  stored = entry.get('file', {})
+  try:
+    signature = file_signature(filename)
+  except OSError:
+    return None
+  for key in signature:
+    if (stored.get(key) != signature[key]):
+      return None
+  return stored.get('sha1')
+
+
+def restamp_sidecar(filename, sidecar_filename, sha1):
+  """ Sets the size and mtime recorded in the sidecar 'sidecar_filename'
+      to the ones of the datafile 'filename', if the sidecar was stored for
+      the content with the SHA1 hash 'sha1'. This keeps the sidecar valid,
+      if the datafile was just rewritten with the same content.
+      Returns True if the sidecar was updated.
+  """
+  entry = load_sidecar(sidecar_filename)
+  if (entry is None or entry.get('file', {}).get('sha1') != sha1):
+    return False
+  entry['file'] = file_signature(filename, sha1=sha1)
+  try:
+    sidecar = open(sidecar_filename, 'w')
+    json.dump(entry, sidecar)
+    sidecar.close()
+  except IOError:
+    return False
+  return True
@@ -0,0 +1,123 @@
+#File: combined_build.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Building many tables with a single pdflatex run: the include files of
+##the tables of one directory are put into one document, one table per
+##page, and the pages of the (cropped) pdf are split with pdfseparate
+##into the pdfs of the single tables. With tightpage, every page is cropped
+##to its table by pdflatex already, see tex_templates.tightpage_document.
+##pdfseparate, of poppler-utils, must be on the PATH, otherwise the tables
+##are compiled on their own.
+
+
+import os
+import shutil
+import tempfile
+from latex_runner import run_command
+from latex_build import remove_build_files
+from tex_templates import standalone_document, preview_block, TIGHTPAGE_PREAMBLE, TIGHTPAGE_END, NOT_CROPPED_LINE
+
+
+# Prefix of the combined documents, which are removed after the build:
+COMBINED_PREFIX = 'pgftables_combined_'
+
+# Extensions of the files of a combined build, that are removed afterwards:
+COMBINED_EXTENSIONS = ('.tex', '.aux', '.log', '.pdf')
+
+# Resets the counters, that are global and not restored by the group of a
+# table, to their values at the start of a standalone document, such that
+# every table is numbered as in its single build:
+COUNTERS_RESET = "\\setcounter{table}{0}\n\\setcounter{footnote}{0}\n\\setcounter{page}{1}\n"
+
+
+def combined_texfilename():
+  """ Returns the filename of the combined document of this process """
+  return COMBINED_PREFIX+str(os.getpid())+'.tex'
+
+
+def include_has_float(filename):
+  """ Returns True if the include file 'filename' puts its table in a
+      table environment, i.e. if the table has a caption.
+  """
+  include_file = open(filename, 'r')
+  try:
+    return '\\begin{table}' in include_file.read()
+  finally:
+    include_file.close()
+
+
+def combined_document(include_filenames, tightpage=False, floats=None):
+  """ Returns the document typesetting the tables of the given include files,
+      one table per page. Each table is put in a group, such that its
+      pgfplotstable settings do not affect the following tables, and the
+      counters are reset before it, see COUNTERS_RESET.
+      Input:
+       include_filenames: List of strings of the include files of the tables
+       tightpage: Boolean determining if every page is cropped to its table
+         by pdflatex, see tex_templates.tightpage_document
+       floats: List of booleans, True for the tables in a table environment,
+         only needed with tightpage. These are only cropped to their height
+         by pdflatex, such that the pages are still cropped with pdfcrop
+  """
+  tables = ["\\begingroup\n\\input{"+filename+"}\n\\endgroup\n" for filename in include_filenames]
+  if (not tightpage):
+    return standalone_document("\\clearpage\n".join([COUNTERS_RESET + table for table in tables]))
+  if (floats is None):
+    floats = [False]*len(tables)
+  tables = [COUNTERS_RESET + (table if has_float else preview_block(table)) for (table, has_float) in zip(tables, floats)]
+  if (any(floats)):
+    tables[0] = NOT_CROPPED_LINE + tables[0]
+  return TIGHTPAGE_PREAMBLE + "\\clearpage\n".join(tables) + TIGHTPAGE_END
+
+
+def split_pages(dir, pdffile, pdffiles, timeout=None):
+  """ Splits the pages of 'pdffile' into the files 'pdffiles', one page
+      each, with pdfseparate. The files are only replaced if the number of
+      pages matches. Returns True on success.
+      Input:
+       dir: String of the directory the pdf is in
+       pdffile: String of the filename of the pdf to split, relative to 'dir'
+       pdffiles: List of strings of the paths of the pdfs of the pages
+       timeout: Number of seconds after which pdfseparate is killed
+  """
+  pagedir = tempfile.mkdtemp(prefix='.pages_', dir=dir)
+  try:
+    try:
+      result = run_command(['pdfseparate', pdffile, os.path.join(pagedir, 'page%d.pdf')], dir, timeout=timeout)
+    except OSError:
+      # pdfseparate is not installed
+      return False
+    pages = [os.path.join(pagedir, 'page'+str(k+1)+'.pdf') for k in range(len(pdffiles))]
+    if (result.returncode != 0 or len(os.listdir(pagedir)) != len(pdffiles) or not all([os.path.isfile(page) for page in pages])):
+      return False
+    for (page, filename) in zip(pages, pdffiles):
+      os.rename(page, filename)
+    return True
+  finally:
+    shutil.rmtree(pagedir, ignore_errors=True)
+
+
+def remove_combined_files(dir, texfilename):
+  """ Removes the files of the combined document 'texfilename' in 'dir',
+      and the files of its build kept by latex_build.
+  """
+  for extension in COMBINED_EXTENSIONS:
+    filename = os.path.join(dir, texfilename[:-4]+extension)
+    if (os.path.isfile(filename)):
+      os.remove(filename)
+  remove_build_files(dir, texfilename)
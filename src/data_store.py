@@ -0,0 +1,197 @@
+#File: data_store.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Content-addressed store of datafiles, shared by the tables of a
+##directory: a datafile is named by the SHA1 hash of its content and only
+##written if no table stored the same data before. The datafiles each
+##table uses are recorded in REFS_FILENAME, such that the datafiles no
+##table refers to anymore can be removed with collect_garbage.
+
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pgfdata import pgfplots_data_blocks, write_columns_pgfplots_data_file, store_numeric_column_stats
+from column_stats import STATS_SUFFIX
+from column_schema import SCHEMA_SUFFIX
+
+
+# Directory of the store, next to the texfiles of the tables:
+STORE_DIRNAME = '.pgftable_data'
+
+# File in the store, with the datafiles used by each table:
+REFS_FILENAME = 'refs.json'
+
+# Datafiles up to this size are kept in memory while their hash is computed,
+# larger ones are formatted a second time if they have to be written:
+STORE_BUFFER_BYTES = 1 << 26
+
+# Age in seconds after which a temporary file in the store is left over from
+# an interrupted write, and removed by collect_garbage:
+STALE_TMP_SECONDS = 3600
+
+# Serializes the updates of the references by background builds:
+refs_lock = threading.Lock()
+
+
+def store_directory(directory):
+  """ Returns the path of the store of the tables in 'directory' """
+  return os.path.join(directory, STORE_DIRNAME)
+
+
+def stored_filename(directory, digest):
+  """ Returns the path of the stored datafile with the content hash 'digest' """
+  return os.path.join(store_directory(directory), digest+'.pgfdat')
+
+
+def store_columns(directory, columns, array_labels, escape_specials=False):
+  """ Stores the pgfplots datafile of a list of 1D column arrays (see
+      pgfdata.write_columns_pgfplots_data_file) in the store of 'directory',
+      and returns its path. The datafile is only written, with its
+      statistics sidecar, if the same content was not stored before.
+  """
+  sha1 = hashlib.sha1()
+  blocks = []
+  size = 0
+  for block in pgfplots_data_blocks(columns, array_labels, escape_specials=escape_specials):
+    sha1.update(block)
+    if (blocks is not None):
+      blocks.append(block)
+      size += len(block)
+      if (size > STORE_BUFFER_BYTES):
+        blocks = None
+  filename = stored_filename(directory, sha1.hexdigest())
+  if (os.path.isfile(filename)):
+    return filename
+  try:
+    os.makedirs(store_directory(directory))
+  except OSError:
+    # Created by another table in the meantime
+    if (not os.path.isdir(store_directory(directory))):
+      raise
+  # Write to a file of this thread first, such that the datafile appears at once:
+  tmpfilename = filename+'.'+str(os.getpid())+'_'+str(threading.current_thread().ident)+'.tmp'
+  if (blocks is None):
+    write_columns_pgfplots_data_file(tmpfilename, columns, array_labels, column_stats=False, escape_specials=escape_specials)
+  else:
+    datafile = open(tmpfilename, 'w')
+    try:
+      for block in blocks:
+        datafile.write(block)
+    finally:
+      datafile.close()
+  os.rename(tmpfilename, filename)
+  if (array_labels):
+    store_numeric_column_stats(filename, columns, array_labels, sha1=sha1.hexdigest())
+  return filename
+
+
+def load_refs(directory):
+  """ Returns the references of the store of 'directory', a dictionary with
+      the texfilenames of the tables as keys, and the lists of the names of
+      the stored datafiles they use as values.
+  """
+  try:
+    refs_file = open(os.path.join(store_directory(directory), REFS_FILENAME), 'r')
+    refs = json.load(refs_file)
+    refs_file.close()
+    return refs
+  except (IOError, ValueError):
+    return {}
+
+
+def save_refs(directory, refs):
+  """ Writes the references of the store of 'directory', see load_refs """
+  filename = os.path.join(store_directory(directory), REFS_FILENAME)
+  tmpfilename = filename+'.'+str(os.getpid())+'.tmp'
+  refs_file = open(tmpfilename, 'w')
+  json.dump(refs, refs_file, indent=1, sort_keys=True)
+  refs_file.close()
+  os.rename(tmpfilename, filename)
+
+
+def set_refs(directory, texfilename, filenames):
+  """ Records that the table 'texfilename' in 'directory' uses the stored
+      datafiles 'filenames', instead of the ones recorded before. With an
+      empty list, the table's entry is removed.
+  """
+  if (not filenames and not os.path.isdir(store_directory(directory))):
+    return
+  refs_lock.acquire()
+  try:
+    refs = load_refs(directory)
+    if (filenames):
+      refs[texfilename] = [os.path.basename(filename) for filename in filenames]
+    elif (texfilename in refs):
+      del refs[texfilename]
+    else:
+      return
+    save_refs(directory, refs)
+  finally:
+    refs_lock.release()
+
+
+def table_datafiles(directory, texfilename):
+  """ Returns the list of paths of the stored datafiles of a table """
+  return [os.path.join(store_directory(directory), name) for name in load_refs(directory).get(texfilename, [])]
+
+
+def collect_garbage(directory):
+  """ Removes the stored datafiles of 'directory', that no table refers to,
+      with their sidecars. Tables whose texfile does not exist anymore are
+      removed from the references first. Temporary files of interrupted
+      writes, older than STALE_TMP_SECONDS, are removed as well.
+      Output:
+       removed: List of the paths of the removed datafiles and temporary files
+  """
+  store = store_directory(directory)
+  if (not os.path.isdir(store)):
+    return []
+  refs_lock.acquire()
+  try:
+    refs = load_refs(directory)
+    for texfilename in refs.keys():
+      if (not os.path.isfile(os.path.join(directory, texfilename))):
+        del refs[texfilename]
+    save_refs(directory, refs)
+    used = set()
+    for names in refs.values():
+      used.update(names)
+    removed = []
+    for name in sorted(os.listdir(store)):
+      if (name.endswith('.pgfdat') and not (name in used)):
+        filename = os.path.join(store, name)
+        os.remove(filename)
+        for suffix in (STATS_SUFFIX, SCHEMA_SUFFIX):
+          if (os.path.isfile(filename+suffix)):
+            os.remove(filename+suffix)
+        removed.append(filename)
+      elif (name.endswith('.tmp')):
+        filename = os.path.join(store, name)
+        try:
+          if (time.time() - os.path.getmtime(filename) > STALE_TMP_SECONDS):
+            os.remove(filename)
+            removed.append(filename)
+        except OSError:
+          # Renamed or removed by its writer in the meantime
+          pass
+    return removed
+  finally:
+    refs_lock.release()
@@ -0,0 +1,225 @@
+#File: instrumentation.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Named spans around the stages of a table build (writing data, tex
+##generation, pdflatex runs and their retries, pdfcrop), with their wall
+##time and metrics like bytes written or rows and columns. Finished spans
+##are passed as records to the installed sinks, e.g. a MemoryCollector.
+##Without a sink, span() returns a shared no-op span, so the stages cost
+##nothing more than a function call.
+##Sinks are installed per process, spans of the worker processes of
+##Py2pgfplots.write_dict_status_pgftables only reach sinks installed in
+##the workers.
+
+
+import json
+import time
+import logging
+import threading
+
+
+# Installed sinks, every finished span is passed to each of them:
+sinks = []
+sinks_lock = threading.Lock()
+
+# Stack of the open spans of each thread, to find the parent of a span:
+local = threading.local()
+
+# Logger of the errors raised by sinks:
+logger = logging.getLogger('py2pgftable')
+
+
+def install_sink(sink):
+  """ Installs a sink, any callable taking the record (a dictionary) of a
+      finished span, e.g. a CallbackSink, LogSink or MemoryCollector.
+      Returns the sink.
+  """
+  sinks_lock.acquire()
+  try:
+    sinks.append(sink)
+  finally:
+    sinks_lock.release()
+  return sink
+
+
+def remove_sink(sink):
+  """ Removes an installed sink """
+  sinks_lock.acquire()
+  try:
+    if (sink in sinks):
+      sinks.remove(sink)
+  finally:
+    sinks_lock.release()
+
+
+def enabled():
+  """ Returns True if any sink is installed """
+  return len(sinks) > 0
+
+
+class NullSpan:
+  """
+     Span that records nothing, used while no sink is installed.
+  """
+  enabled = False
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    return False
+
+  def set(self, key, value):
+    pass
+
+  def add(self, key, amount=1):
+    pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+  """
+     A named stage of a build, see span(). Use it as context manager, and
+     record metrics with set() and counters, like retries, with add().
+  """
+  enabled = True
+
+  def __init__(self, name, attrs):
+    self.name = name
+    self.attrs = attrs
+    self.parent = None
+    self.start = None
+
+  def __enter__(self):
+    stack = getattr(local, 'stack', None)
+    if (stack is None):
+      stack = local.stack = []
+    if (stack):
+      self.parent = stack[-1].name
+    stack.append(self)
+    self.start = time.time()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    wall_time = time.time() - self.start
+    local.stack.pop()
+    record = {'name': self.name, 'parent': self.parent, 'start': self.start, 'wall_time': wall_time, 'attrs': self.attrs}
+    if (exc_type is not None):
+      record['error'] = exc_type.__name__+': '+str(exc_value)
+    for sink in list(sinks):
+      try:
+        sink(record)
+      except Exception:
+        # A failing sink must not fail the build, nor keep the other sinks from the record:
+        logger.exception("The sink "+repr(sink)+" failed on the span '"+self.name+"'.")
+    return False
+
+  def set(self, key, value):
+    """ Sets the metric 'key' of the span """
+    self.attrs[key] = value
+
+  def add(self, key, amount=1):
+    """ Adds 'amount' to the counter 'key' of the span """
+    self.attrs[key] = self.attrs.get(key, 0) + amount
+
+
+def span(name, **attrs):
+  """ Returns a span of the stage 'name', with the metrics given as keyword
+      arguments, to be used in a with statement. If no sink is installed,
+      the shared NULL_SPAN is returned. Expensive metrics should only be
+      computed if the span is enabled:
+        with span('table.write_data', rows=rows) as s:
+          ...
+          if (s.enabled):
+            s.set('bytes', os.path.getsize(filename))
+  """
+  if (not sinks):
+    return NULL_SPAN
+  return Span(name, attrs)
+
+
+class CallbackSink:
+  """
+     Sink passing the record of every finished span to 'callback'.
+  """
+
+  def __init__(self, callback):
+    self.callback = callback
+
+  def __call__(self, record):
+    self.callback(record)
+
+
+class LogSink:
+  """
+     Sink writing every finished span as JSON line to a logging.Logger.
+     Input:
+      logger: logging.Logger, defaults to the logger 'py2pgftable'
+      level: Logging level of the records
+  """
+
+  def __init__(self, logger=None, level=logging.INFO):
+    if (logger is None):
+      logger = logging.getLogger('py2pgftable')
+    self.logger = logger
+    self.level = level
+
+  def __call__(self, record):
+    self.logger.log(self.level, json.dumps(record, sort_keys=True, default=str))
+
+
+class MemoryCollector:
+  """
+     Sink keeping the records of all finished spans in memory.
+  """
+
+  def __init__(self):
+    self.records = []
+    self.lock = threading.Lock()
+
+  def __call__(self, record):
+    self.lock.acquire()
+    try:
+      self.records.append(record)
+    finally:
+      self.lock.release()
+
+  def clear(self):
+    """ Removes all records """
+    self.lock.acquire()
+    try:
+      self.records = []
+    finally:
+      self.lock.release()
+
+  def summary(self):
+    """ Returns a dictionary with the span names as keys, and as values
+        dictionaries with the number of spans ('count'), their total wall
+        time ('wall_time') and the sums of their numeric metrics.
+    """
+    summary = {}
+    for record in list(self.records):
+      entry = summary.setdefault(record['name'], {'count': 0, 'wall_time': 0.0})
+      entry['count'] += 1
+      entry['wall_time'] += record['wall_time']
+      for (key, value) in record['attrs'].items():
+        if (isinstance(value, (int, long, float)) and not isinstance(value, bool)):
+          entry[key] = entry.get(key, 0) + value
+    return summary
@@ -0,0 +1,45 @@
+#File: io_fallback.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Fallbacks of the routines used from io_routines of py2pgfplots, such
+##that py2pgftable can be imported if io_routines is not on the path.
+
+
+import os
+import re
+
+
+def convert_filename_to_path_and_filename(filename):
+  """ Splits 'filename' into its directory, '.' if it has none, and the
+      name of the file.
+      Output:
+       (path, filename): Tuple of strings
+  """
+  (path, filename) = os.path.split(filename)
+  if (not path):
+    path = '.'
+  return (path, filename)
+
+
+def sorted_nicely(l):
+  """ Returns the strings of 'l' sorted in natural order, such that
+      'row10' comes after 'row9'.
+  """
+  convert = lambda text: int(text) if text.isdigit() else text
+  alphanum_key = lambda key: [convert(c) for c in re.split('([0-9]+)', key)]
+  return sorted(l, key=alphanum_key)
@@ -0,0 +1,155 @@
+#File: latex_build.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Isolated pdflatex builds: every build of a texfile writes its aux, log
+##and pdf into its own working directory within BUILD_DIRNAME, next to
+##the texfile, such that concurrent builds do not interfere. The .aux and
+##.log of the last build are kept in BUILD_DIRNAME, the aux seeds the next
+##build, and the pdf is moved next to the texfile when the build is done.
+##A further pdflatex pass is only run if the aux file changed during a
+##pass, and pdflatex asks for it.
+
+
+import os
+import shutil
+import hashlib
+import tempfile
+from latex_runner import run_command
+
+
+# Directory next to the texfiles, that holds the aux and log files of the
+# last builds and the working directories of the running builds:
+BUILD_DIRNAME = '.pgftable_build'
+
+# Maximum number of pdflatex passes of one build:
+MAX_LATEX_PASSES = 3
+
+# Output of pdflatex, that asks for another pass, if the aux file changed:
+RERUN_MARKERS = ('There were undefined references', 'Rerun to get')
+
+# Asks for another pass, but only matters if an aux file was read at the
+# start of the pass. Without one, a reference to a label would show up as
+# undefined reference as well:
+LABEL_MARKER = 'LaTeX Warning: Label(s) may have changed.'
+
+
+def file_hash(filename):
+  """ Returns the SHA1 hash of the content of 'filename', None if it does not exist """
+  try:
+    infile = open(filename, 'rb')
+  except IOError:
+    return None
+  try:
+    return hashlib.sha1(infile.read()).hexdigest()
+  finally:
+    infile.close()
+
+
+def file_mtime(filename):
+  """ Returns the modification time of 'filename', None if it does not exist """
+  try:
+    return os.path.getmtime(filename)
+  except OSError:
+    return None
+
+
+def build_filename(dir, filename, extension):
+  """ Returns the path of the kept file with 'extension' (e.g. '.aux') of the
+      texfile 'filename' in 'dir'.
+  """
+  jobname = os.path.splitext(os.path.basename(filename))[0]
+  return os.path.join(dir, BUILD_DIRNAME, jobname+extension)
+
+
+def remove_build_files(dir, filename):
+  """ Removes the kept aux and log file of the texfile 'filename' in 'dir' """
+  for extension in ('.aux', '.log'):
+    kept = build_filename(dir, filename, extension)
+    if (os.path.isfile(kept)):
+      os.remove(kept)
+
+
+class LatexBuild:
+  """
+     Isolated working directory of one build of a texfile, see run_latex.
+     Call finish() when the build is done, also if it failed.
+     Input:
+      dir: String of the directory the texfile is in, pdflatex runs in it
+      filename: String of the filename of the texfile, relative to 'dir'
+  """
+
+  def __init__(self, dir, filename):
+    self.dir = dir
+    self.filename = filename
+    self.jobname = os.path.splitext(os.path.basename(filename))[0]
+    build_dir = os.path.join(dir, BUILD_DIRNAME)
+    try:
+      os.makedirs(build_dir)
+    except OSError:
+      # Created by another build in the meantime
+      if (not os.path.isdir(build_dir)):
+        raise
+    self.workdir = tempfile.mkdtemp(prefix=self.jobname+'.', dir=build_dir)
+    # Start from the aux file of the last build:
+    kept = build_filename(dir, filename, '.aux')
+    if (os.path.isfile(kept)):
+      shutil.copy2(kept, self.work_filename('.aux'))
+    self.aux_before = None
+    self.passes = 0
+
+  def work_filename(self, extension):
+    """ Returns the path of the file with 'extension' written by pdflatex """
+    return os.path.join(self.workdir, self.jobname+extension)
+
+  def run(self, cmd, timeout=None, log=None, env=None):
+    """ Runs one pdflatex pass, given the pdflatex command 'cmd' with the
+        texfile as last argument, such that it writes into the working
+        directory. Returns the latex_runner.CommandResult.
+    """
+    self.aux_before = file_hash(self.work_filename('.aux'))
+    self.passes += 1
+    return run_command(cmd[:-1] + ['-output-directory='+self.workdir, cmd[-1]], self.dir, timeout=timeout, log=log, env=env)
+
+  def needs_rerun(self, output):
+    """ Returns True if another pass is needed after the last pass, with
+        the output 'output': if the aux file changed during the pass, and
+        pdflatex asks for another pass. Returns False after MAX_LATEX_PASSES.
+    """
+    if (self.passes >= MAX_LATEX_PASSES):
+      return False
+    if (file_hash(self.work_filename('.aux')) == self.aux_before):
+      return False
+    if (LABEL_MARKER in output and self.aux_before is not None):
+      return True
+    # The label warning itself ends with 'Rerun to get cross-references right.':
+    lines = [line for line in output.splitlines() if not (LABEL_MARKER in line)]
+    return any([marker in line for line in lines for marker in RERUN_MARKERS])
+
+  def finish(self):
+    """ Moves the pdf next to the texfile, keeps the aux and log files for
+        the next build, and removes the working directory. The files are
+        renamed, such that other processes never see partly written files.
+    """
+    try:
+      for extension in ('.aux', '.log'):
+        if (os.path.isfile(self.work_filename(extension))):
+          os.rename(self.work_filename(extension), build_filename(self.dir, self.filename, extension))
+      if (os.path.isfile(self.work_filename('.pdf'))):
+        os.rename(self.work_filename('.pdf'), os.path.join(self.dir, os.path.dirname(self.filename), self.jobname+'.pdf'))
+    finally:
+      shutil.rmtree(self.workdir, ignore_errors=True)
@@ -0,0 +1,113 @@
+#File: latex_escape.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Escaping of strings for LaTeX, that replaces underscore signs (and
+##optionally the TeX specials %, & and #) outside of math mode in a
+##single linear pass with a precompiled regular expression.
+
+
+import re
+import numpy as np
+
+
+# Math mode ($...$) is matched as a whole and kept as it is. An unbalanced
+# dollar sign is not matched by the first alternative, so the rest of the
+# string is treated as text. Characters that are already escaped with a
+# backslash are left alone:
+MATH_MODE_PATTERN = r'\$[^$]*\$'
+UNDERSCORE_PATTERN = re.compile(MATH_MODE_PATTERN + r'|(?<!\\)_')
+SPECIALS_PATTERN = re.compile(MATH_MODE_PATTERN + r'|(?<!\\)[_%&#]')
+
+# TeX specials and their escaped form:
+SPECIALS = {'%': '\\%', '&': '\\&', '#': '\\#'}
+
+# Escape functions, that were already compiled, stored by (replace_char, specials):
+escapers = {}
+
+
+def get_escaper(replace_char='_', specials=False):
+  """ Returns a function that escapes a single string, compiled once for
+      each replacement character.
+      Input:
+       replace_char: String that replaces underscore signs outside math mode
+       specials: Boolean determining if %, & and # outside math mode are
+         escaped with a backslash as well
+      Output:
+       escape: Function taking and returning a string
+  """
+  key = (replace_char, specials)
+  if (key not in escapers):
+    if (specials):
+      pattern = SPECIALS_PATTERN
+      replacements = dict(SPECIALS)
+    else:
+      pattern = UNDERSCORE_PATTERN
+      replacements = {}
+    replacements['_'] = replace_char
+    def replace(match):
+      text = match.group(0)
+      # Math mode is kept, everything else is a single character to replace:
+      return replacements.get(text, text)
+    sub = pattern.sub
+    def escape(string):
+      return sub(replace, string)
+    escapers[key] = escape
+  return escapers[key]
+
+
+def escape_latex(string, replace_char='_', specials=False):
+  """ Replaces underscore signs outside of LaTeX math mode in 'string'
+      by 'replace_char', and if 'specials' is True, escapes %, & and #
+      outside of math mode as well. Runs in linear time, and does not
+      fail on unbalanced dollar signs.
+  """
+  return get_escaper(replace_char, specials)(string)
+
+
+def cell_string(cell):
+  """ Returns the string of a cell as pgfdata.format_cell writes it: strings,
+      str or unicode, as they are, floats by their repr, narrow numpy floats
+      in their own precision, everything else by str().
+  """
+  if (isinstance(cell, basestring)):
+    return cell
+  elif (isinstance(cell, np.floating) and cell.dtype.itemsize < 8):
+    return str(cell)
+  elif (isinstance(cell, (float, np.floating))):
+    return repr(float(cell))
+  return str(cell)
+
+
+def escape_latex_cells(cells, replace_char='_', specials=False):
+  """ Escapes every cell of a list, or a numpy array, of strings, see escape_latex.
+      Cells that are not strings are converted by cell_string first.
+      Input:
+       cells: List of strings, or numpy array of strings of any shape
+       replace_char: String that replaces underscore signs outside math mode
+       specials: Boolean determining if %, & and # are escaped as well
+      Output:
+       escaped: List of strings, or numpy array of the same shape as 'cells'
+  """
+  escape = get_escaper(replace_char, specials)
+  if (isinstance(cells, np.ndarray)):
+    # Numeric cells are kept as numpy scalars, such that narrow floats are
+    # written in their own precision:
+    values = cells.ravel().tolist() if (cells.dtype.kind in 'SUO') else list(cells.ravel())
+    escaped = [escape(cell_string(cell)) for cell in values]
+    return np.array(escaped, dtype=object).reshape(cells.shape)
+  return [escape(cell_string(cell)) for cell in cells]
@@ -0,0 +1,156 @@
+#File: latex_format.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Precompiled LaTeX formats of the preamble of the standalone table
+##documents. The preamble (everything before \begin{document}) is dumped
+##once into a format file, that is named by a hash of the preamble, and
+##pdflatex loads that format instead of loading all packages again.
+##The documents themselves are not changed: in the format, \documentclass
+##is redefined to do nothing, and the \usepackage commands of the
+##preamble are no-ops, as the packages are already loaded.
+
+
+import os
+import hashlib
+import threading
+from latex_runner import run_command
+
+
+# Directory in which the format files are cached, if none is given:
+DEFAULT_FORMAT_DIR = os.environ.get('PY2PGFTABLE_FORMAT_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'py2pgftable'))
+
+# Appended to the preamble before it is dumped:
+DUMP_SUFFIX = '''\\makeatletter
+\\renewcommand{\\documentclass}[2][]{}
+\\makeatother
+\\dump
+'''
+
+# Messages of pdflatex, that show that a format file cannot be used:
+FORMAT_ERRORS = ['Fatal format file error', 'I can\'t find the format file', 'made by different executable version', 'was written by']
+
+# Names of formats that could not be built in this process:
+failed_formats = set()
+format_lock = threading.Lock()
+
+
+def extract_preamble(content):
+  """ Returns the preamble of a LaTeX document, i.e. everything before
+      \\begin{document}, or None if the document has no such line.
+  """
+  index = content.find('\\begin{document}')
+  if (index < 0):
+    return None
+  return content[:index]
+
+
+def format_name(preamble):
+  """ Returns the name of the format file of a preamble """
+  return 'pgftable_'+hashlib.sha1(preamble).hexdigest()[:16]
+
+
+def get_format(preamble, format_dir=None, timeout=None):
+  """ Returns the name of the format file of 'preamble', and builds it
+      in 'format_dir' if it does not exist yet. Returns None if the
+      format cannot be built.
+  """
+  if (format_dir is None):
+    format_dir = DEFAULT_FORMAT_DIR
+  name = format_name(preamble)
+  if (name in failed_formats):
+    return None
+  if (os.path.isfile(os.path.join(format_dir, name+'.fmt'))):
+    return name
+  format_lock.acquire()
+  try:
+    if (not os.path.isfile(os.path.join(format_dir, name+'.fmt'))):
+      if (not build_format(preamble, name, format_dir, timeout=timeout)):
+        failed_formats.add(name)
+        return None
+  finally:
+    format_lock.release()
+  return name
+
+
+def build_format(preamble, name, format_dir, timeout=None):
+  """ Dumps 'preamble' into the format file name.fmt in 'format_dir'.
+      Returns True on success.
+  """
+  if (not os.path.isdir(format_dir)):
+    try:
+      os.makedirs(format_dir)
+    except OSError:
+      return False
+  # Other processes may build the same format at the same time, so
+  # build under a unique name and rename it afterwards:
+  jobname = name+'_'+str(os.getpid())
+  texfile = open(os.path.join(format_dir, jobname+'.tex'), 'w')
+  texfile.write(preamble+'\n'+DUMP_SUFFIX)
+  texfile.close()
+  try:
+    result = run_command(['pdflatex', '-ini', '-interaction=nonstopmode', '-jobname='+jobname, '&pdflatex', jobname+'.tex'], format_dir, timeout=timeout)
+  except OSError:
+    return False
+  for extension in ('.tex', '.log'):
+    if (os.path.isfile(os.path.join(format_dir, jobname+extension))):
+      os.remove(os.path.join(format_dir, jobname+extension))
+  fmtfile = os.path.join(format_dir, jobname+'.fmt')
+  if (result.returncode != 0 or not os.path.isfile(fmtfile)):
+    if (os.path.isfile(fmtfile)):
+      os.remove(fmtfile)
+    return False
+  os.rename(fmtfile, os.path.join(format_dir, name+'.fmt'))
+  return True
+
+
+def format_failed(output):
+  """ Returns True if pdflatex's output shows that the format could not be loaded """
+  return any([error in output for error in FORMAT_ERRORS])
+
+
+def discard_format(name, format_dir=None):
+  """ Removes a stale format file, such that it is not used again """
+  if (format_dir is None):
+    format_dir = DEFAULT_FORMAT_DIR
+  failed_formats.add(name)
+  fmtfile = os.path.join(format_dir, name+'.fmt')
+  if (os.path.isfile(fmtfile)):
+    os.remove(fmtfile)
+
+
+def latex_format_command(dir, filename, format_dir=None, timeout=None):
+  """ Returns the pdflatex command and environment to compile the document
+      'filename' in 'dir' with the precompiled format of its preamble, plus
+      the name of the format. Returns (None, None, None) if the document has
+      no preamble or its format cannot be built.
+  """
+  if (format_dir is None):
+    format_dir = DEFAULT_FORMAT_DIR
+  texfile = open(os.path.join(dir, filename), 'r')
+  preamble = extract_preamble(texfile.read())
+  texfile.close()
+  if (preamble is None):
+    return None, None, None
+  name = get_format(preamble, format_dir, timeout=timeout)
+  if (name is None):
+    return None, None, None
+  # pdflatex finds the format through TEXFORMATS, the trailing path separator
+  # keeps the default search path:
+  env = dict(os.environ)
+  env['TEXFORMATS'] = os.path.abspath(format_dir)+os.pathsep+env.get('TEXFORMATS', '')
+  return ['pdflatex', '-fmt='+name, '-interaction=nonstopmode', filename], env, name
@@ -0,0 +1,264 @@
+#File: latex_runner.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Runs external programs like pdflatex and pdfcrop without a shell,
+##streams their output line by line, kills them after a timeout, and
+##limits the number of programs running at the same time. Work can be
+##submitted to background threads, which return a RunFuture to wait on.
+
+
+import os
+import sys
+import time
+import signal
+import threading
+import subprocess
+import multiprocessing
+from instrumentation import span
+
+
+# Limits the number of external programs running at the same time,
+# see set_max_concurrent:
+process_slots = threading.BoundedSemaphore(multiprocessing.cpu_count())
+
+
+def set_max_concurrent(max_concurrent):
+  """ Sets the maximum number of external programs that run at the same time.
+      This should be called before any program is started.
+  """
+  global process_slots
+  process_slots = threading.BoundedSemaphore(max(1, max_concurrent))
+
+
+class CommandResult:
+  """
+     Result of an external program run by run_command.
+     Attributes:
+      args: List of the program and its arguments
+      returncode: Exit status of the program
+      output: String of the combined stdout and stderr of the program
+      timed_out: Boolean, True if the program was killed after the timeout
+      wall_time: Wall time in seconds the program ran
+      warning: String of the error message of a non-zero exit status, that
+        check_command accepted as the program still wrote its output file,
+        None otherwise
+  """
+
+  def __init__(self, args, returncode, output, timed_out, wall_time):
+    self.args = args
+    self.returncode = returncode
+    self.output = output
+    self.timed_out = timed_out
+    self.wall_time = wall_time
+    self.warning = None
+
+  def __repr__(self):
+    return "CommandResult("+' '.join(self.args)+", returncode="+str(self.returncode)+", timed_out="+str(self.timed_out)+")"
+
+
+# Number of lines of the output of a failed program shown in its CommandError:
+ERROR_OUTPUT_LINES = 20
+
+
+class CommandError(RuntimeError):
+  """
+     Raised if an external program failed, see check_command.
+     Attributes:
+      stage: String of the name of the failed step, e.g. 'pdflatex'
+      result: CommandResult of the program
+  """
+
+  def __init__(self, message, stage=None, result=None):
+    RuntimeError.__init__(self, message)
+    self.stage = stage
+    self.result = result
+
+
+def output_tail(output, lines=ERROR_OUTPUT_LINES):
+  """ Returns the last 'lines' lines of the output of a program """
+  return '\n'.join(output.rstrip('\n').split('\n')[-lines:])
+
+
+def check_command(result, stage, written=True, status_warning=False):
+  """ Raises a CommandError if the program of 'result' was killed after
+      the timeout, exited with a non-zero status, or did not write its
+      output file, and returns 'result' otherwise. The message holds the
+      name of the step and the end of the program's output.
+      Input:
+       result: CommandResult of the program
+       stage: String of the name of the step, e.g. 'pdflatex'
+       written: Boolean, False if the output file of the program is missing
+       status_warning: Boolean determining if a non-zero exit status is
+         accepted, if the program still wrote its output file. The message
+         is then kept as result.warning. pdflatex in nonstopmode exits with
+         status 1 on errors it recovered from, but writes the pdf.
+  """
+  if (result.timed_out):
+    reason = "was killed after "+str(round(result.wall_time, 1))+" s"
+  elif (result.returncode != 0):
+    reason = "exited with status "+str(result.returncode)
+  elif (not written):
+    reason = "did not write its output file"
+  else:
+    return result
+  message = stage+" failed: '"+' '.join(result.args)+"' "+reason+", last lines of its output:\n"+output_tail(result.output)
+  if (status_warning and written and not result.timed_out):
+    result.warning = message
+    return result
+  raise CommandError(message, stage, result)
+
+
+def run_command(args, cwd, timeout=None, log=None, env=None):
+  """ Runs an external program without a shell, once one of the process
+      slots is free, and returns its CommandResult.
+      Input:
+       args: List of the program name, which is looked up in PATH, and its arguments
+       cwd: String of the directory to run the program in
+       timeout: Number of seconds after which the program is killed, None for no timeout
+       log: Function that is called with every line of output, while the
+         program is running, e.g. sys.stdout.write
+       env: Dictionary of the environment of the program, None to inherit it
+      Output:
+       result: CommandResult of the program
+  """
+  with span('command.'+os.path.basename(args[0]), args=' '.join(args), cwd=cwd) as command_span:
+    slots = process_slots
+    wait_start = time.time()
+    slots.acquire()
+    try:
+      start = time.time()
+      # No input is given to the program, so it cannot wait for user input:
+      devnull = open(os.devnull, 'r')
+      try:
+        # The program gets its own process group, so that programs it started
+        # itself are killed on a timeout as well:
+        process = subprocess.Popen(args, cwd=cwd, stdin=devnull, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, close_fds=True, preexec_fn=os.setsid, env=env)
+      finally:
+        devnull.close()
+      timed_out = []
+      timer = None
+      if (timeout is not None):
+        def kill():
+          timed_out.append(True)
+          try:
+            os.killpg(process.pid, signal.SIGKILL)
+          except OSError:
+            # The program finished in the meantime
+            pass
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+      lines = []
+      try:
+        for line in iter(process.stdout.readline, ''):
+          lines.append(line)
+          if (log is not None):
+            log(line)
+        process.stdout.close()
+        returncode = process.wait()
+      finally:
+        if (timer is not None):
+          timer.cancel()
+      result = CommandResult(args, returncode, ''.join(lines), bool(timed_out), time.time()-start)
+    finally:
+      slots.release()
+    if (command_span.enabled):
+      command_span.set('slot_wait_time', start-wait_start)
+      command_span.set('process_time', result.wall_time)
+      command_span.set('returncode', result.returncode)
+      command_span.set('timed_out', result.timed_out)
+      command_span.set('output_bytes', len(result.output))
+    return result
+
+
+class RunFuture:
+  """
+     Result of a function that runs in a background thread, see submit.
+  """
+
+  def __init__(self):
+    self._done = threading.Event()
+    self._result = None
+    self._exc_info = None
+    self._callbacks = []
+    self._lock = threading.Lock()
+
+  def done(self):
+    """ Returns True if the function has finished """
+    return self._done.is_set()
+
+  def wait(self, timeout=None):
+    """ Waits until the function has finished, returns done() """
+    self._done.wait(timeout)
+    return self.done()
+
+  def result(self, timeout=None):
+    """ Waits for the function and returns its return value, or raises
+        the exception the function raised.
+    """
+    if (not self.wait(timeout)):
+      raise RuntimeError("Timeout while waiting for the result.")
+    if (self._exc_info is not None):
+      raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+    return self._result
+
+  def add_done_callback(self, callback):
+    """ Calls callback(future) once the function has finished """
+    self._lock.acquire()
+    try:
+      if (not self.done()):
+        self._callbacks.append(callback)
+        return
+    finally:
+      self._lock.release()
+    callback(self)
+
+  def _finish(self, result, exc_info):
+    self._lock.acquire()
+    try:
+      self._result = result
+      self._exc_info = exc_info
+      self._done.set()
+      callbacks = self._callbacks
+      self._callbacks = []
+    finally:
+      self._lock.release()
+    for callback in callbacks:
+      callback(self)
+
+
+def submit(func, *args, **kwargs):
+  """ Runs func(*args, **kwargs) in a background thread and returns
+      a RunFuture for its result.
+  """
+  future = RunFuture()
+  def run():
+    try:
+      result = func(*args, **kwargs)
+    except Exception:
+      future._finish(None, sys.exc_info())
+    else:
+      future._finish(result, None)
+  thread = threading.Thread(target=run)
+  thread.daemon = True
+  thread.start()
+  return future
+
+
+def wait_all(futures):
+  """ Waits for all futures and returns their results in the same order """
+  return [future.result() for future in futures]
@@ -0,0 +1,651 @@
+#File: pgfdata.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Bulk writers for pgfplots data files (*.pgfdat). Instead of writing
+##cell by cell, whole columns are formatted at once and written in
+##large blocks, rows are streamed through one open file handle and
+##appended columns are staged until the datafile is written once.
+##Columns are read back in a single pass as numpy arrays, and their
+##statistics are cached in a sidecar file (see column_stats).
+
+
+import os
+import time
+import hashlib
+import warnings
+import numpy as np
+from latex_escape import escape_latex_cells
+from column_stats import compute_column_stats, merge_column_stats, store_column_stats, load_column_stats, stats_filename, restamp_sidecar
+from column_schema import schema_filename
+
+
+# Number of cells that are formatted and written to disk in one go:
+BLOCK_CELLS = 1 << 18
+
+
+def default_column_format(dtype):
+  """ Returns the %-format used for a column of the given numpy dtype,
+      such that the output matches str()/repr() of the single values.
+      Floats narrower than float64 are formatted as strings by format_rows,
+      see narrow_float_column.
+  """
+  if (narrow_float_column(dtype)):
+    return '%s'
+  elif (dtype.kind == 'f'):
+    return '%r'
+  elif (dtype.kind in 'iu'):
+    return '%d'
+  else:
+    return '%s'
+
+
+def narrow_float_column(dtype):
+  """ Returns True for float dtypes narrower than float64, e.g. float32.
+      Their values are written with the shortest repr of their own precision,
+      as 0.1 instead of the 0.10000000149011612 of the Python float.
+  """
+  return dtype.kind == 'f' and dtype.itemsize < 8
+
+
+def format_cell(cell):
+  """ Formats a single cell as the bulk writer formats a column of its type,
+      see default_column_format: floats by their repr, narrow numpy floats
+      in their own precision, everything else by str().
+  """
+  if (isinstance(cell, np.floating) and narrow_float_column(cell.dtype)):
+    return str(cell)
+  elif (isinstance(cell, (float, np.floating))):
+    return repr(float(cell))
+  return str(cell)
+
+
+def array_columns(array):
+  """ Splits a numeric 2D ndarray or a structured/record array into
+      a list of 1D column arrays. No data is copied, the returned
+      columns are views into 'array'.
+      Input:
+       array: 2D numpy array or 1D structured/record array
+      Output:
+       columns: List of 1D numpy arrays, one for each column
+  """
+  if (array.dtype.names is not None):
+    return [array[name] for name in array.dtype.names]
+  if (array.ndim == 1):
+    return [array]
+  return [array[:, j] for j in range(array.shape[1])]
+
+
+def column_formats(columns, formats=None, array_labels=None):
+  """ Assembles the list of %-format specifiers, one for each column.
+      Input:
+       columns: List of 1D numpy arrays
+       formats: None, a single format string used for all columns, a list
+         with one format string (or None) per column, or a dictionary
+         mapping column labels to format strings
+       array_labels: List of column labels, needed if formats is a dictionary
+      Output:
+       fmts: List of format strings
+  """
+  fmts = [default_column_format(col.dtype) for col in columns]
+  if (formats is None):
+    return fmts
+  if (isinstance(formats, basestring)):
+    return [formats for col in columns]
+  if (isinstance(formats, dict)):
+    if (not array_labels):
+      raise ValueError("Column formats given as dictionary, but no array_labels were passed.")
+    for j in range(len(array_labels)):
+      if (array_labels[j] in formats):
+        fmts[j] = formats[array_labels[j]]
+    return fmts
+  if (len(formats) != len(columns)):
+    raise ValueError("Number of column formats ("+str(len(formats))+") does not match number of columns ("+str(len(columns))+").")
+  for j in range(len(formats)):
+    if (not (formats[j] is None)):
+      fmts[j] = formats[j]
+  return fmts
+
+
+def format_rows(columns, fmts, start, stop):
+  """ Formats the rows start:stop of the given columns into one string,
+      using a single %-operation for the whole block. Cells are separated
+      by a tabular character, each row ends with a tabular character and
+      a newline, as in Py2pgfplots.write_pgfplots_data_file.
+  """
+  nrows = stop - start
+  ncols = len(columns)
+  # Interleave the columns into one flat, row major sequence of Python objects:
+  cells = np.empty(nrows*ncols, dtype=object)
+  for j in range(ncols):
+    values = columns[j][start:stop]
+    if (narrow_float_column(values.dtype) and fmts[j] == '%s'):
+      cells[j::ncols] = values.astype(str).tolist()
+    else:
+      cells[j::ncols] = values.tolist()
+  row_fmt = '\t'.join(fmts) + '\t\n'
+  return (row_fmt*nrows) % tuple(cells)
+
+
+def row_chunks(rows, cols, max_cells_per_chunk=None):
+  """ Splits the rows of a table into chunks of at most 'max_cells_per_chunk'
+      cells, and at least one row each.
+      Input:
+       rows: Number of rows of the table
+       cols: Number of columns of the table
+       max_cells_per_chunk: Maximum number of cells of a chunk, None for one chunk
+      Output:
+       chunks: List of (start, stop) tuples of the row indices of the chunks
+  """
+  if (max_cells_per_chunk is None or rows*cols <= max_cells_per_chunk):
+    return [(0, rows)]
+  rows_per_chunk = max(1, max_cells_per_chunk // max(1, cols))
+  return [(start, min(start+rows_per_chunk, rows)) for start in range(0, rows, rows_per_chunk)]
+
+
+def write_array_pgfplots_data_file(filename, array, array_labels=None, formats=None, block_cells=BLOCK_CELLS, column_stats=True, escape_specials=False):
+  """ Writes a numeric 2D ndarray, or a structured/record array, to the
+      pgfplots data file 'filename'. Whole columns are formatted at once
+      and written in blocks of about 'block_cells' cells. The given array
+      is never modified.
+      Input:
+       filename: String of the filename of the datafile to write to
+       array: 2D numpy array or 1D structured/record array
+       array_labels: List of column names for the header of the datafile.
+         For structured arrays, the field names are used if not given.
+       formats: Format specifiers of the columns, see column_formats
+       block_cells: Number of cells that are formatted in one block
+       column_stats: Boolean determining if the statistics of the numeric
+         columns are stored in the statistics sidecar of the datafile
+       escape_specials: Boolean determining if the TeX specials %, & and #
+         in string columns are escaped (see latex_escape.escape_latex)
+      Output:
+       sha1: SHA1 hex digest of the written content
+  """
+  if (not array_labels and array.dtype.names is not None):
+    array_labels = list(array.dtype.names)
+  return write_columns_pgfplots_data_file(filename, array_columns(array), array_labels=array_labels, formats=formats, block_cells=block_cells, column_stats=column_stats, escape_specials=escape_specials)
+
+
+def write_columns_pgfplots_data_file(filename, columns, array_labels=None, formats=None, block_cells=BLOCK_CELLS, column_stats=True, escape_specials=False):
+  """ Writes a list of 1D column arrays to the pgfplots data file 'filename',
+      see write_array_pgfplots_data_file. The columns may have different
+      dtypes, and are read block by block, without copying them first.
+      Input:
+       filename: String of the filename of the datafile to write to
+       columns: List of 1D numpy arrays of the same length
+       array_labels: List of column names for the header of the datafile
+       formats: Format specifiers of the columns, see column_formats
+       block_cells: Number of cells that are formatted in one block
+       column_stats: Boolean determining if the statistics of the numeric
+         columns are stored in the statistics sidecar of the datafile
+       escape_specials: Boolean determining if the TeX specials %, & and #
+         in string columns are escaped (see latex_escape.escape_latex)
+      Output:
+       sha1: SHA1 hex digest of the written content, see store_numeric_column_stats
+  """
+  discard_staged_columns(filename)
+  sha1 = hashlib.sha1()
+  datafile = open(filename, "w")
+  try:
+    for block in pgfplots_data_blocks(columns, array_labels, formats, block_cells, escape_specials):
+      sha1.update(block)
+      datafile.write(block)
+  finally:
+    datafile.close()
+  if (column_stats and array_labels):
+    store_numeric_column_stats(filename, columns, array_labels, sha1=sha1.hexdigest())
+  return sha1.hexdigest()
+
+
+def pgfplots_data_blocks(columns, array_labels=None, formats=None, block_cells=BLOCK_CELLS, escape_specials=False):
+  """ Yields the content of the pgfplots data file of a list of 1D column
+      arrays as strings, the header first, followed by blocks of rows. See
+      write_columns_pgfplots_data_file for the arguments.
+  """
+  fmts = column_formats(columns, formats, array_labels)
+  strings = [col.dtype.kind in 'SUO' for col in columns]
+  rows = len(columns[0]) if columns else 0
+  block_rows = max(1, block_cells // max(1, len(columns)))
+  if (array_labels):
+    yield '\t'.join(array_labels) + '\n'
+  for start in range(0, rows, block_rows):
+    stop = min(start+block_rows, rows)
+    # The string cells of the block are escaped, the numeric ones are written as they are:
+    cells = []
+    for (col, string) in zip(columns, strings):
+      if (string):
+        cells.append(escape_latex_cells(col[start:stop], replace_char='_', specials=escape_specials))
+      else:
+        cells.append(col[start:stop])
+    yield format_rows(cells, fmts, 0, stop-start)
+
+
+def store_numeric_column_stats(filename, columns, array_labels, sha1=None):
+  """ Stores the statistics of the numeric columns of the datafile 'filename',
+      which was written from 'columns', in its statistics sidecar. Given the
+      SHA1 hash 'sha1' of the written content, the hash is recorded, and if
+      the sidecar was stored for the same content before, it is only
+      updated to the new size and mtime (see column_stats.restamp_sidecar).
+      The schema sidecar (see column_schema) is kept valid the same way.
+  """
+  if (sha1 is not None):
+    restamp_sidecar(filename, schema_filename(filename), sha1)
+    if (restamp_sidecar(filename, stats_filename(filename), sha1)):
+      return
+  stats = {}
+  for label, col in zip(array_labels, columns):
+    if (col.dtype.kind in 'biuf'):
+      stats[label] = compute_column_stats(col)
+  if (stats or sha1 is not None):
+    store_column_stats(filename, stats, sha1=sha1)
+
+
+class PgfplotsDataFileWriter:
+  """
+     Streaming writer for pgfplots data files, that keeps one open
+     file handle and writes rows in batches. Use it as a context manager:
+
+       with PgfplotsDataFileWriter('results.pgfdat', ['time', 'error']) as writer:
+         for step in simulation:
+           writer.write_row([step.time, step.error])
+
+     Input:
+      filename: String of the filename of the datafile to write to
+      array_labels: List of column names, written as header if the
+        file is opened in mode "w". No header is written if None.
+      mode: "w" to start a new datafile, "a" to append to an existing one
+      flush_rows: Number of buffered rows after which the rows are written
+        to the file and the file is flushed
+      flush_interval: Optional number of seconds after which buffered rows
+        are flushed, even if less than flush_rows rows were buffered
+      column_stats: Boolean determining if the statistics of the numeric
+        columns are collected while writing, and stored in the statistics
+        sidecar of the datafile on close. Only used in mode "w" with labels.
+  """
+
+  def __init__(self, filename, array_labels=None, mode="w", flush_rows=1000, flush_interval=None, column_stats=True):
+    if (mode not in ("w", "a")):
+      raise ValueError("mode must be either \"w\" or \"a\", not \""+str(mode)+"\".")
+    if (flush_rows < 1):
+      raise ValueError("flush_rows must be at least 1.")
+    self.filename = filename
+    self.array_labels = array_labels
+    self.flush_rows = flush_rows
+    self.flush_interval = flush_interval
+    self.rows_written = 0
+    self._buffer = []
+    self._rows = []
+    # Statistics of each column, None for non-numeric columns:
+    self._stats = None
+    if (column_stats and mode == "w" and array_labels):
+      self._stats = [compute_column_stats([]) for label in array_labels]
+    self._last_flush = time.time()
+    if (mode == "w"):
+      discard_staged_columns(filename)
+    else:
+      materialize_staged_columns(filename)
+    self._datafile = open(filename, mode)
+    if (mode == "w" and array_labels):
+      self._datafile.write('\t'.join(array_labels) + '\n')
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+    return False
+
+  @property
+  def closed(self):
+    return self._datafile is None
+
+  def write_row(self, row):
+    """ Buffers a single row, given as a sequence of cells """
+    if (self._datafile is None):
+      raise ValueError("I/O operation on closed PgfplotsDataFileWriter for "+self.filename+".")
+    if (self.array_labels and len(row) != len(self.array_labels)):
+      raise ValueError("Row has "+str(len(row))+" elements, but the datafile "+self.filename+" has "+str(len(self.array_labels))+" columns.")
+    self._buffer.append('\t'.join([format_cell(cell) for cell in row]) + '\n')
+    if (self._stats is not None):
+      self._rows.append(row)
+    if (len(self._buffer) >= self.flush_rows):
+      self.flush()
+    elif (self.flush_interval is not None and time.time() - self._last_flush >= self.flush_interval):
+      self.flush()
+
+  def write_rows(self, rows):
+    """ Buffers all rows of an iterable or generator of rows """
+    for row in rows:
+      self.write_row(row)
+
+  def flush(self):
+    """ Writes all buffered rows to the datafile and flushes it """
+    if (self._datafile is None):
+      return
+    if (self._buffer):
+      self._datafile.write(''.join(self._buffer))
+      self.rows_written = self.rows_written + len(self._buffer)
+      self._buffer = []
+    if (self._rows):
+      for j in range(len(self._stats)):
+        if (self._stats[j] is not None):
+          try:
+            self._stats[j] = merge_column_stats(self._stats[j], compute_column_stats([row[j] for row in self._rows]))
+          except (ValueError, TypeError):
+            # Not a numeric column:
+            self._stats[j] = None
+      self._rows = []
+    self._datafile.flush()
+    self._last_flush = time.time()
+
+  def close(self):
+    """ Flushes all buffered rows and closes the datafile """
+    if (self._datafile is None):
+      return
+    try:
+      self.flush()
+    finally:
+      self._datafile.close()
+      self._datafile = None
+    if (self._stats is not None):
+      stats = {}
+      for label, col_stats in zip(self.array_labels, self._stats):
+        if (col_stats is not None):
+          stats[label] = col_stats
+      store_column_stats(self.filename, stats)
+
+
+# Column stages with appended columns that were not yet written to their
+# datafiles, stored by absolute filename:
+staged_columns = {}
+
+
+class PgfplotsColumnStage:
+  """
+     Collects columns that are appended to an existing pgfplots datafile,
+     either in memory or in one sidecar file per column, and writes the
+     datafile with all appended columns in a single pass once flush() or
+     close() is called. Every column is given including its header, as in
+     Py2pgfplots.append_column_pgfplots_data_file_simple. Staged columns
+     are lost if neither is called, so use it as a context manager:
+
+       with get_column_stage('results.pgfdat') as stage:
+         stage.append_column(['error'] + errors)
+
+     Input:
+      filename: String of the filename of the existing datafile
+      sidecar: Boolean determining if the staged columns are kept in
+        sidecar files (filename+'.colN') instead of in memory
+  """
+
+  def __init__(self, filename, sidecar=False):
+    self.filename = filename
+    self.sidecar = sidecar
+    self.columns = []
+    self.nlines = None
+    self.closed = False
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+    return False
+
+  def count_lines(self):
+    """ Number of lines of the datafile, counted once on first use """
+    if (self.nlines is None):
+      self.nlines = 0
+      datafile = open(self.filename, 'r')
+      for line in datafile:
+        self.nlines = self.nlines + 1
+      datafile.close()
+    return self.nlines
+
+  def append_column(self, col):
+    """ Stages the column 'col', that must contain one element for each
+        line of the datafile, including the header. The cells are
+        formatted as by the bulk writer, see format_cell.
+    """
+    if (self.closed):
+      raise ValueError("I/O operation on closed PgfplotsColumnStage for "+self.filename+".")
+    if (len(col) != self.count_lines()):
+      raise ValueError("The given column has an insufficient number of elements compared to the data in "+self.filename+" and hence cannot be added to the file.")
+    if (self.sidecar):
+      sidecar_filename = self.filename+'.col'+str(len(self.columns))
+      sidecar_file = open(sidecar_filename, 'w')
+      sidecar_file.write(''.join([format_cell(cell)+'\n' for cell in col]))
+      sidecar_file.close()
+      self.columns.append(sidecar_filename)
+    else:
+      self.columns.append([format_cell(cell) for cell in col])
+
+  def flush(self):
+    """ Writes the datafile including all staged columns in one pass,
+        and removes the sidecar files. Further columns can be staged.
+    """
+    if (self.columns):
+      if (self.sidecar):
+        columns = [open(sidecar_filename, 'r') for sidecar_filename in self.columns]
+      else:
+        columns = [iter(col) for col in self.columns]
+      infile = open(self.filename, 'r')
+      outfile = open(self.filename+'.tmp', 'w')
+      for line in infile:
+        cells = [line.strip()] + [next(col).rstrip('\n') for col in columns]
+        outfile.write('\t'.join(cells)+'\n')
+      outfile.close()
+      infile.close()
+      os.rename(self.filename+'.tmp', self.filename)
+      if (self.sidecar):
+        for col in columns:
+          col.close()
+        for sidecar_filename in self.columns:
+          os.remove(sidecar_filename)
+    self.columns = []
+    self.nlines = None
+
+  def close(self):
+    """ Writes all staged columns, see flush(), and removes the stage """
+    if (self.closed):
+      return
+    try:
+      self.flush()
+    finally:
+      self.remove()
+
+  def discard(self):
+    """ Drops all staged columns without writing them, removes their
+        sidecar files, and removes the stage. Used when the datafile is
+        rewritten, as the staged columns belong to its former rows.
+    """
+    if (self.closed):
+      return
+    if (self.sidecar):
+      for sidecar_filename in self.columns:
+        if (os.path.isfile(sidecar_filename)):
+          os.remove(sidecar_filename)
+    self.columns = []
+    self.remove()
+
+  def remove(self):
+    """ Closes the stage and removes it from staged_columns """
+    self.closed = True
+    if (staged_columns.get(os.path.abspath(self.filename)) is self):
+      del staged_columns[os.path.abspath(self.filename)]
+
+
+def get_column_stage(filename, sidecar=False):
+  """ Returns the column stage of the datafile 'filename', and
+      creates it if no columns have been staged for it yet.
+      The stage must be closed, see PgfplotsColumnStage.
+  """
+  key = os.path.abspath(filename)
+  if (key not in staged_columns):
+    staged_columns[key] = PgfplotsColumnStage(filename, sidecar=sidecar)
+  return staged_columns[key]
+
+
+def materialize_staged_columns(filename):
+  """ Writes all staged columns of the datafile 'filename' to disk.
+      This must be called before the datafile is read.
+  """
+  stage = staged_columns.get(os.path.abspath(filename))
+  if (stage is not None):
+    stage.flush()
+
+
+def discard_staged_columns(filename):
+  """ Drops the staged columns of the datafile 'filename', and closes its
+      stage. This is called whenever the datafile is rewritten, such that
+      columns staged for its former content are neither written to the
+      new content, nor checked against its former number of lines.
+  """
+  stage = staged_columns.get(os.path.abspath(filename))
+  if (stage is not None):
+    if (stage.columns):
+      print "Discarding "+str(len(stage.columns))+" staged column(s) of "+filename+", as the file is rewritten."
+    stage.discard()
+
+
+def materialize_all_staged_columns():
+  """ Writes all staged columns of all datafiles to disk, and closes their
+      stages. Call it before exiting, if columns were staged through
+      Py2pgfplots.append_column_pgfplots_data_file_simple.
+  """
+  for stage in staged_columns.values():
+    stage.close()
+
+
+def guess_separation_character(header):
+  """ Returns a first guess of the separation character used in a datafile,
+      given the first line of it.
+  """
+  if ('\t' in header): return '\t'
+  elif (';' in header): return ';'
+  elif (',' in header): return ','
+  return ' '
+
+
+def read_columns_pgfplots_data_file(filename, colnames, dtype=float):
+  """ Reads the data of several columns of a csv/pgfplots datafile in one pass.
+      The datafile must have column names in the first line, with the
+      corresponding data in the lines below. Purely numeric files are parsed
+      in bulk, without splitting them into lines first.
+      Input:
+        filename: String of the filename of the datafile to read data from
+        colnames: List of strings of the column names we want the data from
+        dtype: numpy dtype of the returned arrays
+      Output:
+        data: Dictionary with the column names as keys and 1D numpy arrays
+          of the values as values
+        status: Integer determining the status:
+          0: no error
+          1: column with given colnames was not found
+          2: error occured during the reading in of data
+  """
+  materialize_staged_columns(filename)
+  data = {}
+  # The body is read as one string, that is parsed without splitting it into lines first:
+  datafile = open(filename, 'r')
+  try:
+    header = datafile.readline().strip()
+    sepchar = guess_separation_character(header)
+    header = header.split(sepchar)
+    colindices = []
+    for colname in colnames:
+      if (colname not in header):
+        print "--------------------------------------------------------------------------------------------"
+        print "Error: column with label \""+colname+"\" could not be found in the header of file "+filename+"."
+        return data, 1
+      colindices.append(header.index(colname))
+    body = datafile.read()
+  finally:
+    datafile.close()
+  ncols = len(header)
+  # Bulk parse the whole body, this only succeeds if all cells are numbers,
+  # otherwise parsing stops early at the first non-numeric cell:
+  with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+    if (sepchar in ('\t', ' ')):
+      values = np.fromstring(body, dtype=dtype, sep=' ')
+    else:
+      values = np.fromstring(body.replace(sepchar, ' '), dtype=dtype, sep=' ')
+  # Without blank lines, every line holds a row:
+  nrows = body.count('\n')
+  if (body and not body.endswith('\n')):
+    nrows += 1
+  if (len(values) != ncols*nrows):
+    lines = [line for line in body.split('\n') if line.strip()]
+    nrows = len(lines)
+  if (len(values) == ncols*nrows):
+    values = values.reshape(nrows, ncols)
+    for colname, colindex in zip(colnames, colindices):
+      data[colname] = values[:, colindex].copy()
+    return data, 0
+  # Otherwise, there are non-numeric cells. Extract only the requested columns
+  # and convert those:
+  rows = [line.strip().split(sepchar) for line in lines]
+  for colname, colindex in zip(colnames, colindices):
+    cells = [row[colindex] if colindex < len(row) else '' for row in rows]
+    try:
+      data[colname] = np.array(cells).astype(dtype)
+    except ValueError:
+      for cell in cells:
+        try:
+          dtype(cell)
+        except ValueError:
+          print "--------------------------------------------------------------------------------------------"
+          print "Error, could not convert data in file "+filename+" into a floating point number!"
+          print "Number was: "+cell+"."
+          break
+      return data, 2
+  return data, 0
+
+
+def column_statistics(filename, colnames, use_hash=False):
+  """ Returns the statistics (see column_stats.compute_column_stats) of the
+      given columns of a datafile. Statistics are taken from the sidecar of
+      the datafile if it is up to date, the missing ones are computed from
+      the datafile and added to the sidecar.
+      Input:
+        filename: String of the filename of the datafile
+        colnames: List of strings of the column names
+        use_hash: Boolean determining if the datafile is identified by a
+          hash of its content, rather than only by its size and mtime
+      Output:
+        stats: Dictionary with the column names as keys and the statistics
+          of the columns as values
+        status: Integer, see read_columns_pgfplots_data_file
+  """
+  materialize_staged_columns(filename)
+  stored = load_column_stats(filename, use_hash=use_hash)
+  missing = [colname for colname in colnames if colname not in stored]
+  if (missing):
+    (data, status) = read_columns_pgfplots_data_file(filename, missing)
+    if (status != 0):
+      return {}, status
+    computed = {}
+    for colname in missing:
+      computed[colname] = compute_column_stats(data[colname])
+    store_column_stats(filename, computed, merge=True, use_hash=use_hash)
+    stored.update(computed)
+  stats = {}
+  for colname in colnames:
+    stats[colname] = stored[colname]
+  return stats, 0
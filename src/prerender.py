@@ -0,0 +1,129 @@
+#File: prerender.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Renders the text of string columns in Python, before the datafile is
+##written: escaping, string replacements (including the mapping of
+##booleans) and unit/trailing postprocessing are applied to the cells,
+##such that pgfplotstable does not test every cell against one rule
+##per row, and the settings file does not grow with the number of rows.
+##Every distinct value of a column is rendered once.
+
+
+import re
+import numpy as np
+from latex_escape import escape_latex_cells, cell_string
+from column_schema import infer_columns_schema, BOOLEAN, STRING
+
+
+# Cells with whitespace are put in braces, such that pgfplotstable reads them as one cell:
+WHITESPACE_PATTERN = re.compile(r'\s')
+
+
+def postprocess_cell(cell, item):
+  """ Returns the cell text with the unit, leading or trailing text of the
+      postprocessing entry 'item' added, like pgfplotstable would add it.
+  """
+  if (item[2] == 'unit' and item[3] == True):
+    return "$\\unit["+cell+"]{"+item[1]+"}$"
+  elif (item[2] !='unit' and item[2] !='trailing' or item[3] == False):
+    return item[1]+cell
+  return cell+item[1]
+
+
+def render_cell(cell, replacements, postprocessing, default=None):
+  """ Returns the final text of a single cell.
+      Input:
+       cell: String of the cell in the data
+       replacements: Dictionary of the string replacements of the column
+       postprocessing: List of the postprocessing entries of the column
+         that are applied in Python
+       default: String of the text of the cell if it is not replaced,
+         None for the cell itself
+  """
+  if (default is None):
+    default = cell
+  text = replacements.get(cell, default)
+  for item in postprocessing:
+    text = postprocess_cell(text, item)
+  if (WHITESPACE_PATTERN.search(text)):
+    text = "{"+text+"}"
+  return text
+
+
+def render_column(cells, replacements, postprocessing, escape=False):
+  """ Returns the rendered cells of a column as numpy object array.
+      Input:
+       cells: 1D numpy array of the cells of the column
+       replacements: Dictionary of the string replacements of the column
+       postprocessing: List of the postprocessing entries of the column
+         that are applied in Python
+       escape: Boolean determining if underscores outside math mode are
+         escaped in cells that are not replaced
+  """
+  cells = np.asarray(cells)
+  # Cells are written as pgfdata.format_cell writes them, see latex_escape.cell_string:
+  if (cells.dtype.kind in 'SUO'):
+    (values, inverse) = np.unique(np.array([cell_string(cell) for cell in cells.tolist()], dtype=object), return_inverse=True)
+    values = values.tolist()
+  else:
+    (values, inverse) = np.unique(cells, return_inverse=True)
+    values = [cell_string(value) for value in values]
+  defaults = values
+  if (escape):
+    defaults = escape_latex_cells(values, replace_char='\\_')
+  rendered = np.array([render_cell(values[i], replacements, postprocessing, defaults[i]) for i in range(len(values))], dtype=object)
+  return rendered[inverse]
+
+
+def prerender_columns(columns, colnames, spec, escape_columns=(), schema=None):
+  """ Renders the string columns of a table in Python.
+      Columns with string replacements, and string or boolean columns with
+      'unit', 'trailing' or leading postprocessing are rendered, as well as
+      the columns in 'escape_columns'. Numeric columns keep their formatting
+      and postprocessing by pgfplotstable, and so do postprocessing entries
+      of type 'code', which depend on the row number.
+      Input:
+       columns: List of 1D numpy arrays, the columns of the table
+       colnames: List of the column names
+       spec: table_spec.TableSpec of the column options, it is not changed
+       escape_columns: List of the names of columns, in which underscores
+         outside math mode are escaped
+       schema: List of column_schema.ColumnSchema of the raw data, inferred
+         if not given
+      Output:
+       columns: List of the columns, the rendered ones as numpy object arrays
+       spec: TableSpec for the settings file, in which the rendered columns
+         are marked as prerendered, without replacements and without the
+         postprocessing that was applied
+  """
+  if (schema is None):
+    schema = infer_columns_schema(columns, colnames)
+  columns = list(columns)
+  rendered_spec = spec.copy()
+  for j in range(len(colnames)):
+    colname = colnames[j]
+    postprocessing = []
+    if (schema[j].kind in (BOOLEAN, STRING) or spec.has_replacements(colname)):
+      postprocessing = [item for item in spec.postprocessing_of(colname) if item[2] != 'code']
+    if (not (spec.has_replacements(colname) or postprocessing or colname in escape_columns)):
+      continue
+    replacements = dict([(str(replace[0]), str(replace[1])) for replace in reversed(spec.replacements(colname))])
+    if (len(columns[j])):
+      columns[j] = render_column(columns[j], replacements, postprocessing, escape=(colname in escape_columns))
+    rendered_spec.mark_prerendered(colname, [item for item in spec.postprocessing_of(colname) if item[2] == 'code'])
+  return columns, rendered_spec
@@ -22,8 +22,30 @@
 
 
 import os
-import commands
-from io_routines import convert_filename_to_path_and_filename, sorted_nicely
+import time
+try:
+  from io_routines import convert_filename_to_path_and_filename, sorted_nicely
+except ImportError:
+  # io_routines of py2pgfplots is not on the path:
+  from io_fallback import convert_filename_to_path_and_filename, sorted_nicely
+from pgfdata import array_columns, row_chunks, write_array_pgfplots_data_file, write_columns_pgfplots_data_file, PgfplotsDataFileWriter
+from pgfdata import get_column_stage, materialize_staged_columns, discard_staged_columns, read_columns_pgfplots_data_file, store_numeric_column_stats
+from latex_escape import escape_latex, escape_latex_cells
+from build_manifest import BuildManifest, write_text_file, pgftable_data_filename, pgftable_chunk_filename, pgftable_chunk_filenames, pgftable_build_inputs, pgftable_build_options
+from latex_runner import run_command, submit, check_command, CommandError
+from tex_templates import table_block, chunked_table_block, standalone_document, tightpage_document, latex_cropped, include_document, settings_document
+from latex_format import latex_format_command, format_failed, discard_format
+from instrumentation import span
+from axis_domain import restrict_axis_domains
+from latex_build import LatexBuild, file_mtime
+from combined_build import combined_texfilename, combined_document, include_has_float, split_pages, remove_combined_files
+from table_jobs import TableJobResult, check_distinct_jobs, job_texfile, run_in_pool
+from column_schema import column_schema, infer_columns_schema, schema_filename, INTEGER, FLOAT, BOOLEAN, SAMPLE_ROWS
+from column_stats import stats_filename
+from table_spec import table_spec
+from prerender import prerender_columns
+from table_source import table_columns, project_columns
+from data_store import store_columns, set_refs, table_datafiles
 import numpy as np
 
 
@@ -34,40 +56,47 @@ class Py2pgfplots:
   """
 
   def __init__(self):
-  # the constructor
-  # initializing the dictionary holding the parameters:
-  self.params = {}
+    # the constructor
+    # initializing the dictionary holding the parameters:
+    self.params = {}
 
 
   # Write array to a file, to use for pgfplots:
-  def write_pgfplots_data_file(self, filename, array, array_labels=[]):
+  def write_pgfplots_data_file(self, filename, array, array_labels=[], formats=None, escape_specials=False):
     """
        writes the elements of array into a file. If array_labels
        is passed, the first row of the datafile will have names
        for the columns.
+       Numeric ndarrays and structured/record arrays are written
+       column-wise in large blocks (see pgfdata.write_array_pgfplots_data_file),
+       with optional per-column format specifiers given in 'formats',
+       and are not modified.
+       If escape_specials is True, the TeX specials %, & and # in
+       string cells are escaped as well.
     """
     # First, remove underscore sign from strings, as those give LaTeX problems in words,
     # plus preserve the LaTeX math mode:
-    array_labels = remove_underscore_preserve_math_mode(', '.join(array_labels).strip(), replace_char='_')
-    array_labels = array_labels.split(', ')
-    # The same for the data stored in 'array', as this could be strings for tables:
-    for i in range(len(array)):
-      if (type(array).__name__=='ndarray'):
-        # For numpy arrays, do this:
-        tmp = str(list(array[i])).replace('[','').replace(']','')
-      else:
-        # For normal lists:
-        tmp = ', '.join(array[i])
-      tmp = remove_underscore_preserve_math_mode(tmp, replace_char='_')
-      tmp = tmp.split(', ')
-      for j in range(len(tmp)):
-        array[i][j] = tmp[j]
+    array_labels = escape_latex_cells([label.strip() for label in array_labels], replace_char='_', specials=escape_specials)
+    # Bulk path for numpy arrays, that are numeric or structured:
+    if (isinstance(array, np.ndarray) and (array.dtype.names is not None or (array.ndim == 2 and array.dtype.kind in 'biuf'))):
+      columns = array_columns(array)
+      if (array_labels and (len(columns) != len(array_labels))):
+        print "#################################################"
+        print "# Length of array and array_labels are unequal! #"
+        print "#################################################"
+      write_array_pgfplots_data_file(filename, array, array_labels=array_labels, formats=formats, escape_specials=escape_specials)
+      return
+    # The same for the data stored in 'array', as this could be strings for tables.
+    # Every cell is escaped on its own, and 'array' is not modified:
+    array = [escape_latex_cells(row, replace_char='_', specials=escape_specials) for row in array]
     # Successfully removed underscore signs and preserved LaTeX math mode from header and data!
     # Continue:
     if (array_labels and (len(array[0]) != len(array_labels))):
       print "#################################################"
       print "# Length of array and array_labels are unequal! #"
       print "#################################################"
+    # Columns staged for the former content of the file are dropped:
+    discard_staged_columns(filename)
     # Write to file:
     datafile = open(filename, "w")
     # If array labels are given, write header:
@@ -102,6 +131,7 @@ class Py2pgfplots:
       print "#####################################"
       print "# Length of array_labels must be 2! #"
       print "#####################################"
+    discard_staged_columns(filename)
     # Write to file:
     datafile = open(filename, "w")
     # If array labels are given, write header:
@@ -129,6 +159,7 @@ class Py2pgfplots:
        that can be extended through 
        append_pgfplots_data_file_simple(filename, array)
     """
+    discard_staged_columns(filename)
     # Write to file:
     datafile = open(filename, "w")
     # If array labels are given, write header:
@@ -138,7 +169,7 @@ class Py2pgfplots:
         datafile.write('\t')
       else:
         datafile.write('\n')
-    datafile.closed
+    datafile.close()
 
 
   # Appends one-dimensional array as a row to a datafile:
@@ -146,20 +177,20 @@ class Py2pgfplots:
     """
        appends the 1-dimensional array 'array'
        to the datafile 'filename'.
+       This opens and closes the datafile for every row. To write
+       many rows, use a pgfdata.PgfplotsDataFileWriter instead,
+       which keeps the datafile open and writes rows in batches.
     """
+    # Staged columns must be written before rows are added:
+    materialize_staged_columns(filename)
     # Write to file:
     datafile = open(filename, "a")
-    for i in range(len(array)):
-      datafile.write(array[i])
-      if (i < len(array)-1):
-        datafile.write('\t')
-      else:
-        datafile.write('\n')
-    datafile.closed
+    datafile.write('\t'.join(array) + '\n')
+    datafile.close()
 
 
   # Appends a single column to a pgfdat file, including the header
-  def append_column_pgfplots_data_file_simple(filename, col):
+  def append_column_pgfplots_data_file_simple(filename, col, staged=False, sidecar=False):
     """
        appends a column of data including a header
        describing what kind of data the column
@@ -167,7 +198,23 @@ class Py2pgfplots:
        array 'col' must contain the same number of 
        elements as the existing file 'filename'
        has rows.
+       If 'staged' is True, the column is only collected (in memory,
+       or in a sidecar file if 'sidecar' is True), and the file is
+       written in one pass with all staged columns when
+       pgfdata.materialize_staged_columns(filename) is called, or when
+       the file is read through read_column_pgfplots_data_file. Staged
+       columns are lost if the file is never written this way, and are
+       discarded if the file is rewritten before, e.g. through
+       write_pgfplots_data_file.
     """
+    if (staged):
+      try:
+        get_column_stage(filename, sidecar=sidecar).append_column(col)
+      except ValueError as error:
+        print error
+      return
+    # Columns staged before must be written first, as those precede 'col':
+    materialize_staged_columns(filename)
     # Open filename for reading and get all lines:
     file = open(filename, 'r')
     alllines = file.readlines()
@@ -175,7 +222,7 @@ class Py2pgfplots:
     # Checking the consistency of number of rows in filename
     # with number of elements in col:
     if (len(alllines) != len(col)):
-      printc("The given column has an insufficient number of elements compared to the data in "+filename+" and hence cannot be added to the file.", "red", False); print
+      print "The given column has an insufficient number of elements compared to the data in "+filename+" and hence cannot be added to the file."
     else:
       # Assemble new lines, including the new column:
       z = 0
@@ -205,90 +252,33 @@ class Py2pgfplots:
             1: column with given colnames was not found
             2: error occured during the reading in of data
     """
-    status = 0
-    datafile = open(filename, 'r')
-    # Check the first line for the column names, to find out which columns we have to extract:
-    colindex = -1
-    colnames = datafile.readline().strip()
-    # Get a first guess of what seperation character is used in that datafile:
-    if ('\t' in colnames): sepchar = '\t'
-    elif (';' in colnames): sepchar = ';'
-    elif (',' in colnames): sepchar = ','
-    elif (' ' in colnames): sepchar = ' '
-    # Splitting the line where sepchar appears:
-    colnames = colnames.split(sepchar)
-    for i in range(len(colnames)):
-      if (colnames[i] == colname):
-        colindex = i
-    if (colindex < 0):
-      status = 1
-      print "--------------------------------------------------------------------------------------------"
-      print "Error: column with label \""+colname+"\" could not be found in the header of file "+filename+"."
-    # Now read in the data and store it in arrays:
+    (columns, status) = read_columns_pgfplots_data_file(filename, [colname])
+    data = []
     if (status == 0):
-      data = []
-      for line in datafile:
-        if (len(line.strip()) > 0):
-          try:
-            line = line.strip().split(sepchar)
-            data.append(float(line[colindex]))
-          except:
-            print "--------------------------------------------------------------------------------------------"
-            print "Error, could not convert data in file "+filename+" into a floating point number!"
-            print "Number was: "+line[colindex]+"."
-            status = 2
-            break
-    # Done processing the datafile, so close it:
-    datafile.close()
+      data = columns[colname].tolist()
     return data, status
 
 
   def remove_underscore_preserve_math_mode(string, replace_char='_'):
-    """Checks if string contains underscore signs outside math mode and replaces those"""
-    if (replace_char == ''):
-      replace_char == ' '
-    num_dollar = string.count('$')
-    num_undscr = string.count('_')
-    ind_dollar = []
-    modstring = ''
-    if (num_undscr != 0):
-      if (num_dollar != 0):
-        index = string.find('$')
-        for z in range(num_dollar):
-          ind_dollar.append(index)
-          index = string.find('$', index+1)
-        tmp = (string[0:ind_dollar[0]].replace('_',replace_char)) #starting point
-        modstring = modstring+tmp
-        for i in range(len(ind_dollar)):
-          if (i%2 == 0): #beginning of mathmode found --> skip substring
-            tmp = (string[ind_dollar[i]:ind_dollar[i+1]+1])
-            modstring = modstring+tmp # this is the mathmode string
-          else:  # append underscore-free string outside mathmode
-            if (i != len(ind_dollar)-1):
-              tmp = (string[ind_dollar[i]+1:ind_dollar[i+1]].replace('_',replace_char))
-            else:
-              tmp = (string[ind_dollar[i]+1:].replace('_',replace_char))
-            modstring = modstring+tmp
-      else:
-        # No mathmode found, just replace underscores with spaces:
-        modstring = string.replace('_', replace_char)
-    else: # No underscore sign found:
-      modstring = string
-    return modstring
+    """Checks if string contains underscore signs outside math mode and replaces those.
+       See latex_escape.escape_latex, which also escapes the other TeX specials."""
+    return escape_latex(string, replace_char=replace_char)
 
 
   ##########################
   # PGFPlotsTable Methods: #
   ##########################
 
-  def write_pgfplotstable_tex_file(texfile, datafile, datacolnames, data, printcols=None, printcolnames=None, precision=None, string_replace=None, postprocessing=None, caption=None):
+  def write_pgfplotstable_tex_file(texfile, datafile, datacolnames, data, printcols=None, printcolnames=None, precision=None, string_replace=None, postprocessing=None, caption=None, manifest=None, schema=None, schema_sample_rows=None, spec=None, tightpage=False):
     """ This method generates a tex file for a pgfplotstable, whereas
         the content and description/header is given in a file, which
         filename is given by an input argument.
         Input:
          texfile: Name of the texfile to be written to.
          datafile: Name of the pgfdatafile in which the table's content
-           is stored.
+           is stored, or list of names of the pgfdatafiles of the chunks of
+           rows, if the table is split into chunks, which are typeset one after
+           another, each on a new page.
          datacolnames: List of column names/header in the datafile
          data: 2D list, that contains the data to be printed, this is only
            used in order to work out the type of the element, such that
@@ -314,123 +304,67 @@ class Py2pgfplots:
            3: must either be 'unit' or 'trailing' and 4: is either True or False, determining
            if the second element is supposed to be a unit or not.
          caption: String of the caption to be printed below the table.
+         manifest: build_manifest.BuildManifest, if given, the tex files are only
+           written if their content changed
+         schema: List of column_schema.ColumnSchema of the columns. If not given,
+           it is taken from the schema cache of the datafile, or inferred from
+           the whole columns of 'data' and cached.
+         schema_sample_rows: Number of rows of 'data' used to infer the schema,
+           None for all rows
+         spec: table_spec.TableSpec of the column options, to be given instead
+           of precision, string_replace and postprocessing
+         tightpage: Boolean determining if the standalone document crops its
+           pages to the table itself, with the preview package, such that the
+           pdf needs no pdfcrop, see tex_templates.tightpage_document
     """
+    # Index the column options by column name:
+    spec = table_spec(precision, string_replace, postprocessing, spec)
+    chunked = isinstance(datafile, list)
+    if (not chunked):
+      datafile = [datafile]
+    # Get the types of all columns at once, the schema is only cached for unchunked tables:
+    if (schema is None):
+      schema = column_schema(None if chunked else datafile[0], data, datacolnames, sample_rows=schema_sample_rows)
     # First of all, examine texfile and datafile strings, and find relative paths of them:
     (texfile_path, texfile) = convert_filename_to_path_and_filename(texfile)
-    (datafile_path, datafile) = convert_filename_to_path_and_filename(datafile)
-    # Check if path of datafile is same path as texfile:
-    if (datafile_path.find(texfile_path) == 0):
-      if (len(datafile_path) == len(texfile_path)):
-        # If so, datafile_path must be '.', as LaTeX will search from it's path:
-        datafile_path = '.'
-      else:
-        # Subtract texfile_path from datafile_path:
-        datafile_path = datafile_path[len(texfile_path):]
+    datafiles = []
+    for chunkfile in datafile:
+      (datafile_path, chunkfile) = convert_filename_to_path_and_filename(chunkfile)
+      # Check if path of datafile is same path as texfile:
+      if (datafile_path.find(texfile_path) == 0):
+        if (len(datafile_path) == len(texfile_path)):
+          # If so, datafile_path must be '.', as LaTeX will search from it's path:
+          datafile_path = '.'
+        else:
+          # Subtract texfile_path from datafile_path, keeping it relative:
+          datafile_path = '.'+datafile_path[len(texfile_path):]
+      datafiles.append(datafile_path+"/"+chunkfile)
     # pgftable_name is the name that will refer to the data of the table
     # in LaTeX/PGF:
     pgftable_name = 'pgftable' + texfile[:-4]
     # Get rid of digits in pgftable_name, as digits are not allowed in LaTeX variable names:
     pgftable_name = pgftable_name.replace('0','').replace('1','').replace('2','').replace('3','').replace('4','').replace('5','').replace('6','').replace('7','').replace('8','').replace('9','').replace('_','').replace('-','')
 
-    # Now start writing files:
-    file = open(texfile_path+'/'+texfile, "w")
-    print>>file, "%% Generated file to generate a table data from a pgfdatafile using pgfplotstable"
-    print>>file, ""
-    print>>file, "\\documentclass[11pt]{article}"
-    print>>file, "% Set page legths"
-    print>>file, "\\special{papersize=550cm,550cm}"
-    print>>file, "\\hoffset-0.8in"
-    print>>file, "\\voffset-0.8in"
-    print>>file, "\\setlength{\\paperwidth}{550cm}"
-    print>>file, "\\setlength{\\paperheight}{550cm}"
-    print>>file, "\\setlength{\\textwidth}{545cm}"
-    print>>file, "\\setlength{\\textheight}{545cm}"
-    print>>file, "\\topskip0cm"
-    print>>file, "\\setlength{\\headheight}{0cm}"
-    print>>file, "\\setlength{\\headsep}{0cm}"
-    print>>file, "\\setlength{\\topmargin}{0cm}"
-    print>>file, "\\setlength{\\oddsidemargin}{0cm}"
-    print>>file, "% set the pagestyle to empty (removing pagenumber etc)"
-    print>>file, "\\pagestyle{empty}"
-    print>>file, ""
-    print>>file, "% Additional packages:"
-    print>>file, "\\usepackage{amssymb}"
-    print>>file, "\\usepackage{textcomp}"
-    print>>file, "\\usepackage{units}"
-    print>>file, "\\usepackage[english]{babel}"
-    print>>file, "\\usepackage[babel]{csquotes}"
-    print>>file, "\\usepackage{color}"
-    print>>file, "\\usepackage{pdflscape}"
-    print>>file, ""
-    print>>file, "% PGF:"
-    print>>file, "\\usepackage{tikz}"
-    print>>file, "% \\usepackage{pgfplots}"
-    print>>file, "\\usepackage{pgfplotstable}"
-    print>>file, "% recommended:"
-    print>>file, "\\usepackage{booktabs}"
-    print>>file, "\\usepackage{array}"
-    print>>file, "\\usepackage{colortbl}"
-    print>>file, ""
-    print>>file, "\\begin{document}"
-    print>>file, ""
-    print>>file, "\\begin{landscape}"
-    print>>file, ""
-    print>>file, "% Load table settings:"
-    print>>file, "\\input{pgftablesettings_"+texfile+"}"
-    print>>file, "% Load table data:"
-    print>>file, "\\pgfplotstableread{"+datafile_path+"/"+datafile+"}\\"+pgftable_name
-    print>>file, ""
-    if (not (caption is None)): # Caption given, so print caption, and create table environment
-      print>>file, "\\begin{table}"
-    else:
-      None # Just create the table, without table environment, and without caption and label, that should be done in the 
-    print>>file, "  \\centering"
     # Make a string, seperated by commas, of the given list 'printcols'
     # First, remove underscore signs from printcols:
-    # Remove underscore signs from datacolnames:
     if (not (printcols is None)):
-      printcols = remove_underscore_preserve_math_mode(','.join(printcols).strip(), replace_char='_')
+      printcols = ','.join(escape_latex_cells(printcols, replace_char='_'))
+    else:
+      printcols = ','.join(escape_latex_cells(datacolnames, replace_char='_'))
+    # The part that loads and typesets the table, which is shared by the standalone
+    # and the include file:
+    if (chunked):
+      block = chunked_table_block("pgftablesettings_"+texfile, datafiles, pgftable_name, printcols, caption=caption, label="tab:"+texfile[:-4])
     else:
-      printcols = remove_underscore_preserve_math_mode(','.join(datacolnames).strip(), replace_char='_')
-    print>>file, "  \\pgfplotstabletypeset[columns={"+printcols+"},"
-    print>>file, "  ]\\"+pgftable_name
-    # Add caption and label:
-    if (not (caption is None)):
-      print>>file, "  \\caption{"+caption+"}"
-      print>>file, "  \\label{tab:"+texfile[:-4]+"}"
-    # End of table environment:
-    if (not (caption is None)):
-      print>>file, "\\end{table}"
-    print>>file, ""
-    print>>file, "\\end{landscape}"
-    print>>file, ""
-    print>>file, "\\end{document}"
-    # Close texfile:
-    file.closed
-
-    # Now write the pgftable settings file:
-
-    file = open(texfile_path+"/pgftablesettings_"+texfile, "w")
-    print>>file, "% PGFPlotsTable settings are defined below."
-    print>>file, "% To load them:"
-    print>>file, "% \\input{"+texfile_path+"/pgftablesettings_"+texfile+"}"
-    print>>file, ""
-    print>>file, "\\pgfplotstableset{"
-    print>>file, "    %    col sep=&,row sep=\\\\"
-    print>>file, "    %    col sep=space, ignore chars={(,),\ ,\#}"
-    print>>file, "    % Coloring:"
-    print>>file, "    every even row/.style={before row={\\rowcolor[gray]{0.85}}}," # \\rowcolor[blue]{0.5}
-    print>>file, "    % Table header:"
-    print>>file, "    every head row/.style={before row=\\toprule,after row=\midrule},"
-    print>>file, "    every last row/.style={after row=\\bottomrule},"
-    print>>file, "    % Set column parameters:"
+      block = table_block("pgftablesettings_"+texfile, datafiles[0], pgftable_name, printcols, caption=caption, label="tab:"+texfile[:-4])
+
+    # Now assemble the column styles of the pgftable settings file:
+    column_styles = []
     # Remove underscore signs from datacolnames:
-    datacolnames = remove_underscore_preserve_math_mode(', '.join(datacolnames).strip(), replace_char='_')
-    datacolnames = datacolnames.split(', ')
+    datacolnames = escape_latex_cells([colname.strip() for colname in datacolnames], replace_char='_')
     # Now define the column names/strings, as they should appear in the document:
-    colprintnames = remove_underscore_preserve_math_mode(', '.join(datacolnames).strip(), replace_char='\_')
-    colprintnames = colprintnames.split(', ')
-    print>>file, "    columns={"+', '.join(datacolnames)+"},"
+    colprintnames = escape_latex_cells(datacolnames, replace_char='\_')
+    column_styles.append("    columns={"+', '.join(datacolnames)+"},")
     # Depending on the type of element in 
     for j in range(len(datacolnames)):
       string = False
@@ -442,226 +376,124 @@ class Py2pgfplots:
         printcolname = remove_underscore_preserve_math_mode(printcolname.strip(), replace_char='\_')
       else:
         printcolname = colprintnames[j]
-      print>>file, "    columns/"+datacolnames[j]+"/.style={column name="+printcolname+","
+      column_styles.append("    columns/"+datacolnames[j]+"/.style={column name="+printcolname+",")
       # Finding out if the data of this column is a number, or a string:
       # First, check if a precision was specified for this column:
-      precision_entry_found = False
-      if (not (precision is None)):
-        for i in range(len(precision)):
-          if (datacolnames[j] == precision[i][0]):
-            # Then print that entry:
-            print>>file, "        "+precision[i][1]+","
-            precision_entry_found = True
-            # And break out of the loop:
-            break
-      if (not precision_entry_found):
-        try:
-          tmp = float(data[0][j])
-          # For this particular case, we want strings only, although most entries are actually numbers:
-          #raise Exception # raising an exception will force the entry to be treated as a string!
-          # If we were able to convert, then tell pgfplotstable to use format numbers:
-          # Now find out if it is an integer or float:
-          # First of all, if the current column name is in string_replace, raise an exception:
-          for i in string_replace:
-            if (any([datacolnames[j] in string_replace_item for string_replace_item in string_replace])):
-              raise Exception
-          # If no entry of this column is in string_replace or precision, continue to convert the string into a number:
-          try:
-            tmp = int(data[0][j])
+      precision_entry = spec.precision_of(datacolnames[j])
+      if (not (precision_entry is None)):
+        # Then print that entry:
+        column_styles.append("        "+precision_entry+",")
+      boolean = False
+      if (precision_entry is None):
+        # Columns with string replacements, or rendered in Python, are always treated as strings:
+        if (spec.has_replacements(datacolnames[j]) or spec.is_prerendered(datacolnames[j])):
+          string = True
+          boolean = (schema[j].kind == BOOLEAN)
+        elif (schema[j].kind in (INTEGER, FLOAT)):
+          # If this is a number, tell pgfplotstable to use format numbers:
+          if (schema[j].kind == INTEGER):
             # This is an integer:
-            print>>file, "        sci,"
-            print>>file, "        precision=0, fixed,"
-          except:
+            column_styles.append("        sci,")
+            column_styles.append("        precision=0, fixed,")
+          else:
             # This is a floating point number:
-            print>>file, "        sci, sci zerofill,"
-            print>>file, "        precision=3, fixed,"
-          if (not (postprocessing is None)):
-            # Check if postprocessing is done later for this column, 
-            # and if so, do not align numbers by decimal point
-            if (not (any([datacolnames[j] in postitem for postitem in postprocessing]))):
-              print>>file, "        dec sep align,"
-            else: #do not align by decimal point
-              print>>file, "        %dec sep align,"
-          else: # If postprocessing is None (not given by user, use dec sep align:
-              print>>file, "        dec sep align,"
-        except:
+            column_styles.append("        sci, sci zerofill,")
+            column_styles.append("        precision=3, fixed,")
+          # Check if postprocessing is done later for this column, 
+          # and if so, do not align numbers by decimal point
+          if (not spec.is_postprocessed(datacolnames[j])):
+            column_styles.append("        dec sep align,")
+          else: #do not align by decimal point
+            column_styles.append("        %dec sep align,")
+        else:
           string = True
-          # If that failed, it is a string:
-          print>>file, "        string type,"
+          # Booleans are centered:
+          boolean = (schema[j].kind == BOOLEAN)
+        if (string):
+          column_styles.append("        string type,")
           # Now, if present, write string replace information to the texfile:
-          boolean = False
-          if (not (string_replace is None)):
-            for item in string_replace:
-              if (item[0] == datacolnames[j]): # item[0] is the column name
-                for replace in item[1:]: # in replace are the replacement strings
-                  print>>file, "        string replace={"+str(replace[0])+"}{"+str(replace[1])+"},"
-                  # Check if there is an entry of a boolean, because booleans should be
-                  # centered, whereas strings should be left aligned
-                  if (replace[0] == 'True' or replace[0] == 'False'):
-                    boolean = True
+          for replace in spec.replacements(datacolnames[j]): # in replace are the replacement strings
+            column_styles.append("        string replace={"+str(replace[0])+"}{"+str(replace[1])+"},")
+          # Check if there is an entry of a boolean, because booleans should be
+          # centered, whereas strings should be left aligned
+          if (spec.is_boolean(datacolnames[j])):
+            boolean = True
       # If this is the first column, add a vertical line in the table:
       if (j==0):
-        print>>file, "        column type={l|},"
+        column_styles.append("        column type={l|},")
       else:
         if (string and not boolean):
-          print>>file, "        column type=r," #lets assume, we want the strings to be right aligned
+          column_styles.append("        column type=r,") #lets assume, we want the strings to be right aligned
         elif (string and boolean):
-          print>>file, "        column type=c,"
+          column_styles.append("        column type=c,")
       # Add postprocessing entries (for now only units possible):
-      if (not (postprocessing is None)):
-        for item in postprocessing:
-          if (item[0] == datacolnames[j]):
-            if (item[2] != 'code'):
-              print>>file, "        postproc cell content/.append style={"
-              if (item[2] == 'unit' and item[3] == True):
-                print>>file, "            /pgfplots/table/@cell content/.add={$\unit[}{]{"+item[1]+"}$},"
-              elif (item[2] !='unit' and item[2] !='trailing' or item[3] == False) :
-                print>>file, "            /pgfplots/table/@cell content/.add={"+item[1]+"}{},"
-              elif (item[2] =='trailing' and item[3] == True):
-                print>>file, "            /pgfplots/table/@cell content/.add={}{"+item[1]+"},"
-            elif (item[2] =='code' and item[3] == True):
-              # This inner list append pgf code to the postprocessing in pgf, thus this list has six element
-              print>>file, "            postproc cell content/.append code={"
-              print>>file, "                \ifnum\pgfplotstablerow="+str(item[1])
-              print>>file, "                    \pgfkeysalso{/pgfplots/table/@cell content/.add={}{"+str(item[4])+"}}"
-              print>>file, "                \else"
-              print>>file, "                    \pgfkeysalso{/pgfplots/table/@cell content/.add={}{"+str(item[5])+"}}"
-              print>>file, "                \\fi"
-            print>>file, "        },"
-      print>>file, "    },"
-    print>>file, "}"
-    file.closed
-    # Now that the (standalone) file has been written, write another file that can be included
-    # in another latex document with \input{..}
-    # First read in the file that was just written to disk:
-    infile = open(texfile_path+'/'+texfile, 'r')
-    outfile = open(texfile_path+'/'+texfile.replace('.tex','')+'_include.tex', 'w')
-    write_to_file = False
-    for line in infile:
-      if ('% Load table settings' in line):
-        write_to_file = True
-        outfile.write('% Load this file in your LaTeX document with:\n')
-        outfile.write('% \input{'+texfile.replace('.tex','')+'_include.tex'+'}\n\n')
-      elif (not (caption is None) and '\end{table}' in line): # \end{table} is only part of the output if caption was given!
-        write_to_file = False
-        outfile.write(line)
-      elif (caption is None and '\end{landscape}' in line):
-        write_to_file = False
-      if (write_to_file):
-        outfile.write(line)
-    outfile.close()  
-    infile.close()
-
-
-  def prevent_dimension_too_large_error(dir, texfilename):
+      for item in spec.postprocessing_of(datacolnames[j]):
+        if (item[2] != 'code'):
+          column_styles.append("        postproc cell content/.append style={")
+          if (item[2] == 'unit' and item[3] == True):
+            column_styles.append("            /pgfplots/table/@cell content/.add={$\unit[}{]{"+item[1]+"}$},")
+          elif (item[2] !='unit' and item[2] !='trailing' or item[3] == False) :
+            column_styles.append("            /pgfplots/table/@cell content/.add={"+item[1]+"}{},")
+          elif (item[2] =='trailing' and item[3] == True):
+            column_styles.append("            /pgfplots/table/@cell content/.add={}{"+item[1]+"},")
+        elif (item[2] =='code' and item[3] == True):
+          # This inner list append pgf code to the postprocessing in pgf, thus this list has six element
+          column_styles.append("            postproc cell content/.append code={")
+          column_styles.append("                \ifnum\pgfplotstablerow="+str(item[1]))
+          column_styles.append("                    \pgfkeysalso{/pgfplots/table/@cell content/.add={}{"+str(item[4])+"}}")
+          column_styles.append("                \else")
+          column_styles.append("                    \pgfkeysalso{/pgfplots/table/@cell content/.add={}{"+str(item[5])+"}}")
+          column_styles.append("                \\fi")
+        column_styles.append("        },")
+      column_styles.append("    },")
+
+    if (not tightpage):
+      standalone = standalone_document(block)
+    elif (chunked):
+      # Each chunk is cropped to its own page:
+      standalone = tightpage_document(chunked_table_block("pgftablesettings_"+texfile, datafiles, pgftable_name, printcols, caption=caption, label="tab:"+texfile[:-4], preview=True), preview=False, floats=(not (caption is None)))
+    else:
+      # Tables in a table environment are cropped as floats, to the height
+      # of the table only, such that pdfcrop is still run on them:
+      standalone = tightpage_document(block, preview=(caption is None), floats=(not (caption is None)))
+    # Now write the standalone, the settings and the include file, each with a single write:
+    write_text_file(texfile_path+'/'+texfile, standalone, manifest)
+    write_text_file(texfile_path+"/pgftablesettings_"+texfile, settings_document(texfile_path+"/pgftablesettings_"+texfile, column_styles), manifest)
+    # The include file can be loaded in another latex document with \input{..}:
+    include_filename = texfile.replace('.tex','')+'_include.tex'
+    write_text_file(texfile_path+'/'+include_filename, include_document(include_filename, block, caption=caption), manifest)
+
+
+  def prevent_dimension_too_large_error(dir, texfilename, workers=None):
     """ This method is executed if the string '! Dimension too large'
         was found in pdflatex's output. It tries to make minor modifications
-        to the given tex file in order to prevent this error from happening.
+        to the given tex file in order to prevent this error from happening:
+        the 'restrict x/y to domain' lines are set to the min/max values of
+        the plotted data, and 'scale only axis' is commented out.
         Input:
          dir: Directory name where the tex file is in
          texfilename: Name of the tex file to run
+         workers: Maximum number of datafiles that are scanned at the same time,
+           None to use a pool only for several large datafiles, see
+           axis_domain.pool_workers
+        Output:
+         changed: Boolean, True if the tex file was modified
     """
-    # Dictionary to store relevant data for each datafile we find in texfilename:
-    datadict = {}
-    # First, let's find out the relevant datafiles we have to check:
-    # Open texfile:
-    texfile = open(dir+'/'+texfilename, 'r')
-    texfile_lines = texfile.readlines()
-    texfile.close()
-    # Assemble a list of addplot commands in the texfile, those are the lines
-    # we have to process:
-    curve_cmds = []
-    for line in texfile_lines:
-      if (line.strip().startswith('\\addplot')):
-        curve_cmds.append(line.strip())
-    for line in curve_cmds:
-      # Get the datafilename:
-      datafilename = line.split('{')[-1].split('}')[0]
-      # And get the relevant columns of that datafile:
-      colnames = line.split('table[')[-1].split(']')[0]
-      colnames = colnames.split(',')
-      for col in colnames:
-          col = col.replace(' ','')
-          if ('x=' in col):
-            xcolname = col.split('=')[-1].strip()
-          elif ('y=' in col):
-            ycolname = col.split('=')[-1].strip()
-      # Now add column labels into datadict:
-      datadict.update({datafilename : {'xcolname' : xcolname, 'ycolname' : ycolname}})
-
-    # Now scan the data of relevant columns to find min/max x/y values of each plot in texfilename
-    for datafilename in sorted(datadict.iterkeys()):
-      # Open datafile:
-      # Now get the corresponding column names:
-      xcolname = datadict[datafilename]['xcolname']
-      ycolname = datadict[datafilename]['ycolname']
-      # Potential error message for reading in data from the datafile:
-      datafile_errmsg = "++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++"
-      datafile_errmsg = datafile_errmsg+"\nSerious error was found. Please check your datafile"
-      datafile_errmsg = datafile_errmsg+"\n   \""+datafilename+"\""
-      datafile_errmsg = datafile_errmsg+"\nfor valid floating point numbers and"
-      datafile_errmsg = datafile_errmsg+"\nthat the column labels are as they are supposed to be."
-      datafile_errmsg = datafile_errmsg+"\nSkipping this datafile!"
-      # Now read data from datafile:
-      (xdata, status) = read_column_pgfplots_data_file(datafilename, xcolname)
-      if (status != 0):
-        # Error occured, so skip this datafile
-        print datafile_errmsg
-        continue
-      (ydata, status) = read_column_pgfplots_data_file(datafilename, ycolname)
-      if (status != 0):
-        # Error occured, so skip this datafile
-        print datafile_errmsg
-        continue
-      # Now find the min/max values:
-      xmin = min(xdata); xmax = max(xdata)
-      ymin = min(ydata); ymax = max(ydata)
-      # Now that we have the min/max values of the relevant datacolumns in datafile, 
-      # store those min/max values in the dict:
-      datadict[datafilename].update({'xmin':xmin, 'xmax':xmax, 'ymin':ymin, 'ymax':ymax})
-
-    # Now that we have all the data we need, lets modify the texfile with the pgfplot commands slightly
-    # in order to prevent the '! dimension too large error':
-    xmin = 10e15; xmax = -10e15; ymin = 10e15; ymax = -10e15
-    for datafilename in sorted(datadict.iterkeys()):
-      print "datafilename = ", datafilename
-      # Now determine the xmin/xmax and ymin/ymax values of the entire plot:
-      if (datadict[datafilename]['xmin'] < xmin): xmin = datadict[datafilename]['xmin']
-      if (datadict[datafilename]['xmax'] > xmax): xmax = datadict[datafilename]['xmax']
-      if (datadict[datafilename]['ymin'] < ymin): ymin = datadict[datafilename]['ymin']
-      if (datadict[datafilename]['ymax'] > ymax): ymax = datadict[datafilename]['ymax']
-    # The lines of the texfile are still stored in the variable 'texfile_lines'
-    new_texfile_lines = []
-    for line in texfile_lines:
-      # Find line starting with 'scale only axis':
-      if (line.strip().startswith('scale only axis')):
-        # Commenting out 'scale only axis command:
-        new_texfile_lines.append(line.split('scale only axis')[0]+'% scale only axis'+line.split('scale only axis')[-1])
-      elif (line.strip().startswith('restrict x to domain') or line.strip().replace(' ','').startswith('%restrictxtodomain')):
-        precmndstring = line.split('restrict x to domain')[0].split('%')[0]
-        new_texfile_lines.append(precmndstring+'restrict x to domain='+str(xmin)+':'+str(xmax)+', % use this if you get a \'dimension too large\' error\n')
-      elif (line.strip().startswith('restrict y to domain') or line.strip().replace(' ','').startswith('%restrictytodomain')):
-        precmndstring = line.split('restrict y to domain')[0].split('%')[0]
-        new_texfile_lines.append(precmndstring+'restrict y to domain='+str(ymin)+':'+str(ymax)+', % use this if you get a \'dimension too large\' error\n')
-      else:
-        new_texfile_lines.append(line)
-    # Now the new lines of the texfile have been assembled, write them to disk:
-    texfile = open(texfilename, 'w')
-    for new_line in new_texfile_lines:
-      texfile.write(new_line)
-    texfile.close()
-
+    return restrict_axis_domains(dir, texfilename, scale_only_axis=False, workers=workers)
 
 
-
-  def write_dict_status_pgftable(directory, texfilename, dict, first_colname, printcols=None, printcolnames=None, precision=None, string_replace=None, postprocessing=None, caption=None, pdflatex=True, pdfcrop=True):
+  def write_dict_status_pgftable(directory, texfilename, dict, first_colname, printcols=None, printcolnames=None, precision=None, string_replace=None, postprocessing=None, caption=None, pdflatex=True, pdfcrop=True, incremental=False, asynchronous=False, timeout=None, precompiled_preamble=False, spec=None, prerender=False, max_cells_per_chunk=None, tightpage=False, project=None, shared_data=False):
     """ This method assembles lists of the content of the given dictionary
         and then calls methods to write pgf data files of the dictionary,
         and to update the pdf showing the table.
         Input:
          directory: The directory in which the table should be written to
          texfilename: String of the filename of the pgf-tex-table.
-         dict: 2D Dictionary of which all content will be written to file
+         dict: 2D Dictionary of which all content will be written to file, with
+           one inner dictionary for each row. Instead, a pandas DataFrame, a numpy
+           structured/record array, or a dictionary of column arrays can be given,
+           their columns are written without converting them to a table of
+           strings first, see table_source.table_columns.
          first_colname: String of the name of the first column, e.g. 'simulation name'
          printcols: List of columns to print in the table, whereas the elements
            of 'printcols' refer to the strings of the column labels of the datafile
@@ -686,38 +518,124 @@ class Py2pgfplots:
            generated texfile
          pdfcrop: Boolean determining if pdfcrop should run on the
           generated pdf
+         tightpage: Boolean determining if pdflatex crops the page to the table
+           itself, such that the pdf is final after compiling it, and pdfcrop
+           only runs if the preview package is not installed
+         incremental: Boolean determining if the build manifest of 'directory'
+           is used, such that unchanged files are not rewritten, and pdflatex
+           and pdfcrop are skipped if the inputs of the pdf did not change
+         asynchronous: Boolean determining if pdflatex and pdfcrop run in the
+           background. If True, a latex_runner.RunFuture is returned at once,
+           that finishes when the pdf is done.
+         timeout: Number of seconds after which pdflatex or pdfcrop are killed,
+           None for no timeout
+         precompiled_preamble: Boolean determining if pdflatex loads the preamble
+           from a cached format file, see run_latex
+         spec: table_spec.TableSpec of the column options, to be given instead
+           of precision, string_replace and postprocessing. It is not changed,
+           such that it can be used for many tables.
+         prerender: Boolean determining if the escaping of the first column, the
+           string replacements and the postprocessing of string columns are
+           applied in Python when the datafile is written (see prerender), instead
+           of by pgfplotstable. The settings file then does not grow with the
+           number of rows, which keeps pdflatex fast for large tables.
+         max_cells_per_chunk: Maximum number of cells TeX holds in memory at once.
+           Larger tables are split into chunks of rows, each written to its own
+           datafile and typeset on its own page with the header repeated, e.g.
+           50000 for TeX's default main memory. None to typeset the table at once.
+         project: Boolean determining if only the first column, the columns in
+           'printcols' and the columns the options of those refer to (with
+           \\thisrow{..}) are written to the datafile, such that pdflatex does
+           not read the other columns. Defaults to True if printcols is given,
+           unless shared_data is True, such that tables with different printcols
+           can share their datafile.
+         shared_data: Boolean determining if the datafiles are put into the
+           content-addressed store of 'directory' (see data_store), which is
+           shared by all tables of the directory. Tables with the same data
+           then use the same datafile, which is only written once. Stored
+           datafiles no table uses anymore are removed by
+           data_store.collect_garbage.
+        Raises a latex_runner.CommandError if pdflatex or pdfcrop fails, see
+        run_latex and run_pdfcrop.
+        If asynchronous, it is raised by the result() of the returned future.
     """
-    # First assemble the header of the table:
-    for dir in sorted_nicely(dict.iterkeys()):
-      datadict = dict[dir]
-      array_labels = [first_colname]
-      for key, value in datadict.items():
-        # Key is pratically the header of our table, with a leading
-        # 'dirname', as the directory name of the simulation is not
-        # stored in 'key', but in 'dir'. value is the content of the
-        # table.
-        array_labels.append(key)
-      break
-    # Now the content of the table, each row below the header:
-    if (string_replace is None):
-      string_replace = []
-    table_rows = [[0 for j in range(len(array_labels))] for i in range(len(dict.keys()))]
-    i = 0
-    for dir in sorted_nicely(dict.iterkeys()):
-      datadict = dict[dir]
-      j = 0
-      table_rows[i][j] = str(dir)
-      for key, value in datadict.items():
-        j = j + 1
-        table_rows[i][j] = str(value)
-      # For this dirname, add an entry into string_replace,
-      # in order to add color and proper \_ for the table:
-      string_replace.append([first_colname, [dir, remove_underscore_preserve_math_mode(dir, replace_char='\_')]])
-      i = i + 1
-
-    # Write datafile:
-    pgfdat_filename = directory+'/'+texfilename.split('.tex')[0].split('/')[-1]+'_data.pgfdat'
-    write_pgfplots_data_file(pgfdat_filename, table_rows, array_labels=array_labels)
+    # Index the column options, the replacements of the directory names are added to a copy:
+    spec = table_spec(precision, string_replace, postprocessing, spec).copy()
+    # Get the columns of the table, the content of DataFrames, structured
+    # arrays and dictionaries of columns is used as it is:
+    with span('table.columns', texfile=texfilename) as columns_span:
+      (array_labels, columns) = table_columns(dict, first_colname)
+      columns_span.set('rows', len(columns[0]))
+      columns_span.set('cols', len(columns))
+      if (project is None):
+        project = not (printcols is None or shared_data)
+      referenced = None
+      if (project and not (printcols is None)):
+        referenced = spec.referenced_columns(printcols)
+      # Columns referred to by their index need all columns in their order:
+      if (not (referenced is None)):
+        colnames = set(printcols) | referenced
+        escaped_labels = escape_latex_cells([str(label).strip() for label in array_labels], replace_char='_')
+        colnames = [label for (label, escaped_label) in zip(array_labels, escaped_labels) if label in colnames or escaped_label in colnames]
+        (array_labels, columns) = project_columns(array_labels, columns, colnames)
+        columns_span.set('projected_cols', len(columns))
+    schema = None
+    with span('table.escape', texfile=texfilename, prerender=prerender):
+      if (not prerender and columns[0].dtype.kind in 'SUO'):
+        # For each row name, add an entry into string_replace,
+        # in order to add color and proper \_ for the table:
+        rownames = set()
+        for rowname in columns[0].tolist():
+          if (not (rowname in rownames)):
+            rownames.add(rowname)
+            spec.add_string_replace(first_colname, [[rowname, remove_underscore_preserve_math_mode(str(rowname), replace_char='\_')]])
+      if (prerender):
+        # Render the string columns now, the row names are escaped in Python:
+        schema = infer_columns_schema(columns, array_labels, sample_rows=SAMPLE_ROWS)
+        (columns, spec) = prerender_columns(columns, array_labels, spec, escape_columns=[first_colname], schema=schema)
+
+    manifest = None
+    if (incremental):
+      manifest = BuildManifest(directory)
+    # Write datafile, or one datafile for each chunk of rows of a large table:
+    pgfdat_filename = pgftable_data_filename(directory, texfilename)
+    chunks = row_chunks(len(columns[0]), len(array_labels), max_cells_per_chunk)
+    if (shared_data):
+      # The names of the stored datafiles are known once they are written:
+      datafiles = []
+    elif (len(chunks) == 1):
+      datafiles = [pgfdat_filename]
+    else:
+      datafiles = [pgftable_chunk_filename(directory, texfilename, k) for k in range(len(chunks))]
+    # Remove datafiles of an earlier build, that are not used anymore, with their sidecars:
+    for filename in [pgfdat_filename] + pgftable_chunk_filenames(directory, texfilename):
+      if (not (filename in datafiles)):
+        for unused in (filename, stats_filename(filename), schema_filename(filename)):
+          if (os.path.isfile(unused)):
+            os.remove(unused)
+    # The columns are written block by block, without building a table of strings:
+    datafile_labels = escape_latex_cells([str(label).strip() for label in array_labels], replace_char='_')
+    with span('table.write_data', texfile=texfilename, rows=len(columns[0]), cols=len(columns), chunks=len(chunks)) as data_span:
+      for (k, (start, stop)) in enumerate(chunks):
+        chunk_columns = [col[start:stop] for col in columns]
+        if (shared_data):
+          datafiles.append(store_columns(directory, chunk_columns, datafile_labels))
+          continue
+        filename = datafiles[k]
+        if (manifest is None):
+          write_columns_pgfplots_data_file(filename, chunk_columns, array_labels=datafile_labels)
+        else:
+          # Write to a temporary file first, and only replace the datafile if it changed:
+          sha1 = write_columns_pgfplots_data_file(filename+'.tmp', chunk_columns, array_labels=datafile_labels, column_stats=False)
+          manifest.replace_file(filename+'.tmp', filename)
+          store_numeric_column_stats(filename, chunk_columns, datafile_labels, sha1=sha1)
+      if (data_span.enabled):
+        data_span.set('bytes', sum([os.path.getsize(filename) for filename in datafiles]))
+    # Record the stored datafiles the table uses, or that it uses none:
+    set_refs(directory, texfilename, datafiles if shared_data else [])
+    if (schema is None):
+      # The schema is cached next to the datafile of unchunked tables:
+      schema = column_schema(None if (len(datafiles) > 1) else datafiles[0], columns, array_labels, sample_rows=SAMPLE_ROWS, infer=infer_columns_schema)
     # Now write texfile to generate the pdf with the table:
     texfile = directory+'/'+texfilename
 
@@ -728,52 +646,341 @@ class Py2pgfplots:
       printcols = array_labels
 
     # Write to texfile:
-    write_pgfplotstable_tex_file(texfile, pgfdat_filename, array_labels, table_rows, printcols=printcols, printcolnames=printcolnames, precision=precision, string_replace=string_replace, postprocessing=postprocessing, caption=caption)
-    if (pdflatex):
-      # Produce pdf:
-      (dir, texfile) = convert_filename_to_path_and_filename(texfile)
-      run_latex(dir, texfile)
-      if (pdfcrop):
-        # Crop white space from pdf:
-        run_pdfcrop(dir, texfile[:-3]+'pdf', texfile[:-3]+'pdf')
-
-
+    with span('table.write_tex', texfile=texfilename) as tex_span:
+      write_pgfplotstable_tex_file(texfile, datafiles if (len(datafiles) > 1) else datafiles[0], array_labels, columns, printcols=printcols, printcolnames=printcolnames, caption=caption, manifest=manifest, spec=spec, schema=schema, tightpage=tightpage)
+      if (tex_span.enabled):
+        tex_span.set('bytes', sum([os.path.getsize(filename) for filename in pgftable_build_inputs(directory, texfilename)[:2]]))
+    if (manifest is not None):
+      manifest.save()
+    if (not pdflatex):
+      return
+    # Produce pdf, unless it was already built from the current files:
+    (dir, texfile) = convert_filename_to_path_and_filename(texfile)
+    pdffile = dir+'/'+texfile[:-3]+'pdf'
+    build_inputs = pgftable_build_inputs(directory, texfilename)
+    build_options = pgftable_build_options(pdfcrop, tightpage)
+    def compile_pdf():
+      with span('table.compile', texfile=texfilename) as compile_span:
+        if (manifest is None or not manifest.is_current(pdffile, build_inputs, build_options)):
+          result = run_latex(dir, texfile, timeout=timeout, precompiled_preamble=precompiled_preamble)
+          if (pdfcrop and not (tightpage and latex_cropped(result.output))):
+            # Crop white space from pdf:
+            run_pdfcrop(dir, texfile[:-3]+'pdf', texfile[:-3]+'pdf', timeout=timeout)
+          if (manifest is not None and os.path.isfile(pdffile)):
+            manifest.record(pdffile, build_inputs, build_options)
+            manifest.save()
+        else:
+          compile_span.set('up_to_date', True)
+    if (asynchronous):
+      return submit(compile_pdf)
+    compile_pdf()
 
 
-  def run_latex(dir, filename):
+  def write_dict_status_pgftables(specs, processes=None, pdflatex=True, pdfcrop=True, precompiled_preamble=False, combined=False):
+    """ This method builds many tables at once. First all data and tex files
+        are written, then pdflatex and pdfcrop run on a pool of worker processes.
+        Input:
+         specs: List of dictionaries, each holding the keyword arguments of
+           write_dict_status_pgftable for one table, at least 'directory',
+           'texfilename', 'dict' and 'first_colname'. No two specs may have
+           the same directory and texfilename.
+         processes: Maximum number of tables that are compiled at the same time,
+           defaults to the number of CPUs
+         pdflatex: Boolean determining if pdflatex should run on the
+           generated texfiles
+         pdfcrop: Boolean determining if pdfcrop should run on the
+          generated pdfs
+         precompiled_preamble: Boolean determining if pdflatex loads the preamble
+           from a cached format file, see run_latex. The format is built once,
+           before the tables are compiled.
+         combined: Boolean determining if the tables of each directory are
+           compiled with a single pdflatex run, see compile_tables_combined.
+           Tables split into chunks, and tables of a failed combined build,
+           are compiled on their own.
+        Output:
+         results: List of table_jobs.TableJobResult, one for each spec in specs,
+           with errors and timings of each stage
+    """
+    check_distinct_jobs(specs)
+    results = []
+    compile_jobs = []
+    for spec in specs:
+      result = TableJobResult(job_texfile(spec))
+      kwargs = dict(spec)
+      kwargs.update({'pdflatex': False, 'pdfcrop': False})
+      if (result.run_stage('generate', write_dict_status_pgftable, **kwargs) and pdflatex):
+        # Incremental tables are only compiled if their inputs changed:
+        if (spec.get('incremental', False)):
+          build_inputs = pgftable_build_inputs(spec['directory'], spec['texfilename'])
+          build_options = pgftable_build_options(pdfcrop, spec.get('tightpage', False))
+          if (BuildManifest(spec['directory']).is_current(result.texfile[:-3]+'pdf', build_inputs, build_options)):
+            results.append(result)
+            continue
+        compile_jobs.append((len(results), result.texfile, pdfcrop, precompiled_preamble, spec.get('tightpage', False)))
+      results.append(result)
+    compiled = {}
+    if (combined and compile_jobs):
+      # Tables split into chunks have several pages, so they are compiled on their own:
+      combinable = [job for job in compile_jobs if not (pgftable_chunk_filenames(specs[job[0]]['directory'], specs[job[0]]['texfilename'])
+                    or len(table_datafiles(specs[job[0]]['directory'], specs[job[0]]['texfilename'])) > 1)]
+      # Tables with and without tightpage are put into different documents:
+      for tightpage in set([job[4] for job in combinable]):
+        jobs = [job for job in combinable if job[4] == tightpage]
+        start = time.time()
+        done = compile_tables_combined([job[1] for job in jobs], pdfcrop=pdfcrop, precompiled_preamble=precompiled_preamble, tightpage=tightpage)
+        elapsed = time.time() - start
+        for job in jobs:
+          if (done[job[1]]):
+            compiled[job[0]] = TableJobResult(job[1])
+            compiled[job[0]].timings['combined'] = elapsed
+      compile_jobs = [job for job in compile_jobs if not (job[0] in compiled)]
+    if (precompiled_preamble and compile_jobs):
+      # Build the format once, instead of in every worker:
+      (dir, texfile) = convert_filename_to_path_and_filename(compile_jobs[0][1])
+      latex_format_command(dir, texfile)
+    # Now compile the tables, each job works on its own texfile:
+    for (i, result) in zip([job[0] for job in compile_jobs], run_in_pool(compile_table_job, compile_jobs, processes)):
+      compiled[i] = result
+    for i in sorted(compiled.keys()):
+      results[i].ok = compiled[i].ok
+      results[i].error = compiled[i].error
+      results[i].warnings.extend(compiled[i].warnings)
+      results[i].timings.update(compiled[i].timings)
+      # The manifests are only updated here, so that the workers do not write them concurrently:
+      spec = specs[i]
+      if (compiled[i].ok and spec.get('incremental', False) and os.path.isfile(results[i].texfile[:-3]+'pdf')):
+        manifest = BuildManifest(spec['directory'])
+        manifest.record(results[i].texfile[:-3]+'pdf', pgftable_build_inputs(spec['directory'], spec['texfilename']), pgftable_build_options(pdfcrop, spec.get('tightpage', False)))
+        manifest.save()
+    return results
+
+
+  def compile_tables_combined(texfiles, pdfcrop=True, precompiled_preamble=False, timeout=None, tightpage=False):
+    """ Compiles the tables of the given texfiles, as written by
+        write_pgfplotstable_tex_file, with one pdflatex run per directory,
+        instead of one per table. The include files of the tables are put
+        into one document, one table per page, which is compiled and
+        optionally cropped once, and its pages are split with pdfseparate
+        into the pdfs of the tables, with the same names as if each table
+        was compiled on its own.
+        Input:
+         texfiles: List of strings of the paths of the texfiles of the tables
+         pdfcrop: Boolean determining if pdfcrop should run on the combined pdf
+         precompiled_preamble: Boolean determining if pdflatex loads the preamble
+           from a cached format file, see run_latex
+         timeout: Number of seconds after which a program is killed,
+           None for no timeout
+         tightpage: Boolean determining if pdflatex crops every page to its
+           table, such that pdfcrop only runs if the preview package is not
+           installed, see tex_templates.tightpage_document
+        Output:
+         done: Dictionary with the texfiles as keys, and True as value if the
+           pdf of the table was built. If pdflatex or pdfcrop failed on the combined
+           document, it did not yield one page per table, or pdfseparate is
+           not available, no pdf of that directory is built, and the tables
+           should be compiled on their own.
+    """
+    done = dict([(texfile, False) for texfile in texfiles])
+    directories = {}
+    for texfile in texfiles:
+      (dir, filename) = convert_filename_to_path_and_filename(texfile)
+      directories.setdefault(dir, []).append((filename, texfile))
+    for (dir, tables) in directories.items():
+      filenames = [filename for (filename, texfile) in tables]
+      combined_filename = combined_texfilename()
+      with span('table.combined', directory=dir, tables=len(filenames)):
+        try:
+          include_filenames = [filename[:-4]+'_include.tex' for filename in filenames]
+          floats = None
+          if (tightpage):
+            floats = [include_has_float(dir+'/'+filename) for filename in include_filenames]
+          write_text_file(dir+'/'+combined_filename, combined_document(include_filenames, tightpage=tightpage, floats=floats))
+          try:
+            result = run_latex(dir, combined_filename, timeout=timeout, precompiled_preamble=precompiled_preamble)
+          except CommandError:
+            # The tables of this directory are compiled on their own:
+            continue
+          combined_pdf = combined_filename[:-3]+'pdf'
+          if (pdfcrop and not (tightpage and latex_cropped(result.output))):
+            # Crop white space from every page at once:
+            try:
+              run_pdfcrop(dir, combined_pdf, combined_pdf, timeout=timeout)
+            except CommandError:
+              continue
+          if (split_pages(dir, combined_pdf, [dir+'/'+filename[:-3]+'pdf' for filename in filenames], timeout=timeout)):
+            for (filename, texfile) in tables:
+              done[texfile] = True
+        finally:
+          remove_combined_files(dir, combined_filename)
+    return done
+
+
+
+
+  def run_latex(dir, filename, timeout=None, log=None, precompiled_preamble=False, format_dir=None, preflight=True, isolated=True):
     """ This method runs pdflatex on the given filename
         in directory dir and if successful produces a pdf
         Input:
          dir: Directory name where the tex file is in
          filename: Name of the tex file to run
+         timeout: Number of seconds after which a pdflatex run is killed,
+           None for no timeout
+         log: Function that is called with every line of pdflatex's output
+         precompiled_preamble: Boolean determining if the preamble of the tex file
+           is loaded from a cached format file (see latex_format), which is built
+           on first use. Falls back to a normal run if the format is not usable.
+         format_dir: Directory of the cached format files, defaults to
+           latex_format.DEFAULT_FORMAT_DIR
+         preflight: Boolean determining if the axis domains of the pgfplots
+           figures in the tex file are set from their data before the first
+           run (see axis_domain), such that pdflatex does not fail with a
+           '! Dimension too large' error. Tex files without an '\\addplot'
+           command are not parsed.
+         isolated: Boolean determining if pdflatex writes its aux, log and pdf
+           files into a working directory of its own (see latex_build), such
+           that concurrent builds do not interfere. The aux and log files of
+           the last build are kept in latex_build.BUILD_DIRNAME in 'dir', and
+           another pass is only run if the aux file changed and pdflatex asks
+           for it. Otherwise, pdflatex writes into 'dir' and runs a second
+           time if labels may have changed.
+        Output:
+         result: latex_runner.CommandResult of the last pdflatex run
+        Raises a latex_runner.CommandError if the tex file could not be read
+        or written by the preflight, or, with the end of pdflatex's output,
+        if the last pdflatex run was killed after the timeout, or did not
+        write a new pdf. If it exited with a non-zero status, but wrote the
+        pdf, the error is kept as the warning of the result.
     """
-    cmd = 'cd '+dir+'; pdflatex -interaction=nonstopmode '+filename
-    shellout = commands.getoutput(cmd)
-    # For testing only:
-    # Printing out shellout:
-    if ('! Dimension too large.' in shellout):
-      print "=============================================================="
-      #print "Dimension too large error found in pdflatex output. Making a few"
-      #print "adjustments on the given tex file to prevent this error."
-      #print "filename: ", filename
-      prevent_dimension_too_large_error(dir, filename)
-      #for line in shellout:
-      #  print "line: ", line
-      #  print "shellout: "
-      #  print shellout
-      print "=============================================================="
-    # Check we have to rerun, because of labels:
-    if (shellout.find('LaTeX Warning: Label(s) may have changed.') >= 0):
-      shellout = commands.getoutput(cmd)
-
-
-  def run_pdfcrop(dir, filename, newfilename):
+    with span('latex.run', texfile=filename, format_fallbacks=0, dimension_fixes=0, label_reruns=0) as latex_span:
+      pdffile = os.path.join(dir, os.path.splitext(filename)[0]+'.pdf')
+      pdf_mtime = file_mtime(pdffile)
+      if (preflight):
+        with span('latex.preflight', texfile=filename) as preflight_span:
+          try:
+            preflight_span.set('changed', restrict_axis_domains(dir, filename))
+          except IOError as error:
+            raise CommandError("preflight failed: the axis domains of '"+os.path.join(dir, filename)+"' could not be set: "+str(error), 'preflight')
+      cmd = ['pdflatex', '-interaction=nonstopmode', filename]
+      env = None
+      fmt = None
+      if (precompiled_preamble):
+        (fmt_cmd, fmt_env, fmt) = latex_format_command(dir, filename, format_dir=format_dir, timeout=timeout)
+        if (fmt is not None):
+          (cmd, env) = (fmt_cmd, fmt_env)
+      latex_span.set('precompiled_preamble', fmt is not None)
+      build = None
+      run = lambda cmd, env: run_command(cmd, dir, timeout=timeout, log=log, env=env)
+      if (isolated):
+        build = LatexBuild(dir, filename)
+        run = lambda cmd, env: build.run(cmd, timeout=timeout, log=log, env=env)
+      try:
+        result = run(cmd, env)
+        if (fmt is not None and format_failed(result.output)):
+          # The format is stale or broken, so discard it and run without it:
+          latex_span.add('format_fallbacks')
+          discard_format(fmt, format_dir)
+          (cmd, env) = (['pdflatex', '-interaction=nonstopmode', filename], None)
+          result = run(cmd, env)
+        shellout = result.output
+        # For testing only:
+        # Printing out shellout:
+        if ('! Dimension too large.' in shellout):
+          print "=============================================================="
+          #print "Dimension too large error found in pdflatex output. Making a few"
+          #print "adjustments on the given tex file to prevent this error."
+          #print "filename: ", filename
+          latex_span.add('dimension_fixes')
+          with span('latex.dimension_fix', texfile=filename):
+            changed = prevent_dimension_too_large_error(dir, filename)
+          if (changed):
+            # Compile the modified tex file:
+            result = run(cmd, env)
+            shellout = result.output
+          #for line in shellout:
+          #  print "line: ", line
+          #  print "shellout: "
+          #  print shellout
+          if ('! Dimension too large.' in shellout):
+            print "The '! Dimension too large' error of "+filename+" could not be prevented."
+          print "=============================================================="
+        if (build is not None):
+          # Rerun as long as the aux file changes and pdflatex asks for it:
+          while (build.needs_rerun(shellout)):
+            latex_span.add('label_reruns')
+            result = run(cmd, env)
+            shellout = result.output
+        # Check we have to rerun, because of labels:
+        elif (shellout.find('LaTeX Warning: Label(s) may have changed.') >= 0):
+          latex_span.add('label_reruns')
+          result = run(cmd, env)
+      finally:
+        if (build is not None):
+          build.finish()
+      latex_span.set('returncode', result.returncode)
+      return check_command(result, 'pdflatex', written=(file_mtime(pdffile) not in (None, pdf_mtime)), status_warning=True)
+
+
+  def run_pdfcrop(dir, filename, newfilename, timeout=None, log=None):
     """
         Runs pdfcrop on a pdf, in order to remove white space
         Input:
          dir: String of the directory where the pdf is in
          filename: String of the pdf filename
          newfilename: String of the cropped version of 'filename'
+         timeout: Number of seconds after which pdfcrop is killed,
+           None for no timeout
+         log: Function that is called with every line of pdfcrop's output
+        Output:
+         result: latex_runner.CommandResult of pdfcrop
+        Raises a latex_runner.CommandError if pdfcrop was killed after the
+        timeout, exited with a non-zero status, or 'newfilename' is missing.
     """
-    cmd = 'cd '+dir+'; pdfcrop '+filename+' '+newfilename
-    shellout = commands.getoutput(cmd)
+    with span('pdfcrop.run', pdffile=filename) as pdfcrop_span:
+      result = run_command(['pdfcrop', filename, newfilename], dir, timeout=timeout, log=log)
+      pdfcrop_span.set('returncode', result.returncode)
+      return check_command(result, 'pdfcrop', written=os.path.isfile(os.path.join(dir, newfilename)))
+
+
+  def run_latex_async(dir, filename, timeout=None, log=None, precompiled_preamble=False, format_dir=None):
+    """ Same as run_latex, but runs in the background and returns a
+        latex_runner.RunFuture of the result at once.
+    """
+    return submit(run_latex, dir, filename, timeout=timeout, log=log, precompiled_preamble=precompiled_preamble, format_dir=format_dir)
+
+
+  def run_pdfcrop_async(dir, filename, newfilename, timeout=None, log=None):
+    """ Same as run_pdfcrop, but runs in the background and returns a
+        latex_runner.RunFuture of the result at once.
+    """
+    return submit(run_pdfcrop, dir, filename, newfilename, timeout=timeout, log=log)
+
+
+
+
+def compile_table_job(job):
+  """ Worker of write_dict_status_pgftables, that runs pdflatex and
+      optionally pdfcrop on one table.
+      Input:
+       job: Tuple of the index of the job, the path of the texfile, a boolean
+         determining if pdfcrop should run, a boolean determining if a
+         precompiled preamble is used, and a boolean determining if the
+         texfile crops its page itself (tightpage)
+      Output:
+       result: table_jobs.TableJobResult of the job, not ok if pdflatex or
+         pdfcrop failed, see run_latex and run_pdfcrop
+  """
+  (index, texfile, pdfcrop, precompiled_preamble, tightpage) = job
+  result = TableJobResult(texfile)
+  (dir, texfile) = convert_filename_to_path_and_filename(texfile)
+  # The methods of Py2pgfplots take no self, so they are called as functions
+  # of the class, and not looked up by their bare names in the worker:
+  latex_results = []
+  def latex():
+    latex_results.append(Py2pgfplots.run_latex.im_func(dir, texfile, precompiled_preamble=precompiled_preamble))
+  if (not result.run_stage('latex', latex)):
+    return result
+  if (latex_results[0].warning is not None):
+    result.warnings.append('latex: '+latex_results[0].warning)
+  if (pdfcrop and not (tightpage and latex_cropped(latex_results[0].output))):
+    result.run_stage('pdfcrop', Py2pgfplots.run_pdfcrop.im_func, dir, texfile[:-3]+'pdf', texfile[:-3]+'pdf')
+  return result
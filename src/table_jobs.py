@@ -0,0 +1,107 @@
+#File: table_jobs.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Bookkeeping for building many tables at once: per-job results with
+##errors and timings, and a bounded pool of worker processes.
+
+
+import os
+import time
+import traceback
+import multiprocessing
+from latex_runner import CommandError
+
+
+class TableJobResult:
+  """
+     Result of building one table of a batch.
+     Attributes:
+      texfile: String of the path of the table's texfile
+      ok: Boolean, False if any stage of the job raised an error
+      error: String of the traceback of the error, None if ok. If a program
+        failed, the name of the stage and the message of its
+        latex_runner.CommandError, with the end of the program's output
+      timings: Dictionary with the stage names ('generate', 'latex',
+        'pdfcrop') as keys and the wall time in seconds as values
+      warnings: List of strings of the errors the stages recovered from,
+        e.g. of a pdflatex run that exited with a non-zero status, but
+        wrote the pdf
+  """
+
+  def __init__(self, texfile):
+    self.texfile = texfile
+    self.ok = True
+    self.error = None
+    self.timings = {}
+    self.warnings = []
+
+  def __repr__(self):
+    return "TableJobResult("+self.texfile+", ok="+str(self.ok)+", timings="+str(self.timings)+")"
+
+  def run_stage(self, stage, func, *args, **kwargs):
+    """ Runs func(*args, **kwargs) as the given stage of the job, records
+        its wall time and, if it fails, the error. Returns False on error.
+    """
+    start = time.time()
+    try:
+      func(*args, **kwargs)
+    except CommandError as error:
+      self.ok = False
+      self.error = stage+': '+str(error)
+    except Exception:
+      self.ok = False
+      self.error = traceback.format_exc()
+    self.timings[stage] = time.time() - start
+    return self.ok
+
+
+def job_texfile(spec):
+  """ Returns the normalized path of the texfile of a table spec """
+  return os.path.normpath(os.path.abspath(os.path.join(spec['directory'], spec['texfilename'])))
+
+
+def check_distinct_jobs(specs):
+  """ Raises a ValueError if two table specs would write to the same
+      working files, i.e. if they have the same directory and texfilename.
+  """
+  texfiles = {}
+  for i in range(len(specs)):
+    texfile = job_texfile(specs[i])
+    if (texfile in texfiles):
+      raise ValueError("Table specs "+str(texfiles[texfile])+" and "+str(i)+" both write to "+texfile+".")
+    texfiles[texfile] = i
+
+
+def run_in_pool(func, jobs, processes=None):
+  """ Runs func(job) for every job on a pool of at most 'processes' worker
+      processes, and returns the results in the order of 'jobs'.
+      'func' must be a module level function, such that it can be pickled.
+      With processes=1, or a single job, no worker process is started.
+  """
+  if (processes is None):
+    processes = multiprocessing.cpu_count()
+  processes = max(1, min(processes, len(jobs)))
+  if (processes == 1):
+    return [func(job) for job in jobs]
+  pool = multiprocessing.Pool(processes)
+  try:
+    results = pool.map(func, jobs, chunksize=1)
+  finally:
+    pool.close()
+    pool.join()
+  return results
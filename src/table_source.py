@@ -0,0 +1,158 @@
+#File: table_source.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Turns the data given to Py2pgfplots.write_dict_status_pgftable into a
+##list of 1D column arrays: dictionaries of dictionaries (one per row),
+##pandas DataFrames, numpy structured/record arrays and dictionaries of
+##column arrays. The columns of the latter three are used as they are,
+##without converting their values to strings first.
+
+
+import numpy as np
+try:
+  from io_routines import sorted_nicely
+except ImportError:
+  # io_routines of py2pgfplots is not on the path:
+  from io_fallback import sorted_nicely
+
+
+def is_dataframe(data):
+  """ Returns True if 'data' looks like a pandas DataFrame. pandas is not
+      imported, such that it is only needed if DataFrames are passed.
+  """
+  return hasattr(data, 'columns') and hasattr(data, 'index') and hasattr(data, 'iloc')
+
+
+def is_row_dict(data):
+  """ Returns True if 'data' is a dictionary of dictionaries, with one inner
+      dictionary for each row, as taken by write_dict_status_pgftable.
+  """
+  if (not isinstance(data, dict)):
+    return False
+  for value in data.itervalues():
+    return isinstance(value, dict)
+  return True
+
+
+# Cell of a row, that has no entry for a column of the other rows:
+MISSING_CELL = 'nan'
+
+
+def is_number(value):
+  """ Returns True if 'value' is an integer or a float, Python's or numpy's,
+      but not a boolean.
+  """
+  return isinstance(value, (int, long, float, np.integer, np.floating)) and not isinstance(value, bool)
+
+
+def row_dict_column(data, rownames, key):
+  """ Returns the column 'key' of a dictionary of dictionaries as a 1D array.
+      If all rows that have an entry for the column have a number, it is an
+      integer array, or a float array with NaN for the rows without an entry.
+      Otherwise it is an object array of strings, with MISSING_CELL for the
+      rows without an entry.
+  """
+  present = [data[rowname][key] for rowname in rownames if key in data[rowname]]
+  if (all([is_number(value) for value in present])):
+    if (len(present) == len(rownames)):
+      column = np.array(present)
+    else:
+      column = np.array([data[rowname][key] if key in data[rowname] else np.nan for rowname in rownames], dtype=float)
+    if (column.dtype.kind in 'iuf'):
+      return column
+  return np.array([str(data[rowname][key]) if key in data[rowname] else MISSING_CELL for rowname in rownames], dtype=object)
+
+
+def row_dict_columns(data, first_colname):
+  """ Returns the labels and columns of a dictionary of dictionaries. The
+      rows are sorted by their keys, which form the first column. The other
+      columns are the keys of all rows' dictionaries, in the order in which
+      they first occur. Numeric columns are kept as numbers, see
+      row_dict_column. Cells of rows without an entry for a column are set
+      to MISSING_CELL, or NaN in numeric columns.
+  """
+  rownames = sorted_nicely(data.iterkeys())
+  keys = []
+  known = set()
+  for rowname in rownames:
+    for key in data[rowname].keys():
+      if (not (key in known)):
+        known.add(key)
+        keys.append(key)
+  columns = [np.array([str(rowname) for rowname in rownames], dtype=object)]
+  for key in keys:
+    columns.append(row_dict_column(data, rownames, key))
+  return [first_colname] + keys, columns
+
+
+def move_first(labels, columns, first_colname):
+  """ Moves the column 'first_colname' to the front, raises a ValueError if
+      there is no such column.
+  """
+  if (not (first_colname in labels)):
+    raise ValueError("The table has no column '"+str(first_colname)+"', available columns are: "+', '.join([str(label) for label in labels])+".")
+  j = labels.index(first_colname)
+  return [labels[j]] + labels[:j] + labels[j+1:], [columns[j]] + columns[:j] + columns[j+1:]
+
+
+def table_columns(data, first_colname):
+  """ Returns the column labels and the list of 1D column arrays of a table.
+      Input:
+       data: One of
+         - dictionary of dictionaries, the keys of the outer one being the
+           row names, which form the first column, e.g. the simulation names
+         - pandas DataFrame, its index forms the first column, unless it has
+           a column named 'first_colname'
+         - numpy structured/record array, with a field named 'first_colname'
+         - dictionary of column arrays or lists, with a key 'first_colname',
+           the other columns are sorted by their keys
+       first_colname: String of the name of the first column
+      Output:
+       labels: List of the column labels
+       columns: List of 1D numpy arrays, views of the data where possible
+  """
+  if (is_dataframe(data)):
+    labels = [str(label) for label in data.columns]
+    columns = [np.asarray(data[label].values) for label in data.columns]
+    if (first_colname in labels):
+      return move_first(labels, columns, first_colname)
+    return [first_colname] + labels, [np.asarray(data.index.values)] + columns
+  if (isinstance(data, np.ndarray)):
+    if (data.dtype.names is None):
+      raise TypeError("Numpy arrays must be structured or record arrays, such that their columns have names.")
+    labels = list(data.dtype.names)
+    return move_first(labels, [data[name] for name in labels], first_colname)
+  if (is_row_dict(data)):
+    return row_dict_columns(data, first_colname)
+  if (isinstance(data, dict)):
+    labels = sorted_nicely(data.iterkeys())
+    columns = [np.asarray(data[label]) for label in labels]
+    if (len(set([len(col) for col in columns])) > 1):
+      raise ValueError("All columns must have the same length, got lengths "+', '.join([str(label)+': '+str(len(col)) for (label, col) in zip(labels, columns)])+".")
+    return move_first(labels, columns, first_colname)
+  raise TypeError("Unsupported table data of type "+type(data).__name__+".")
+
+
+def project_columns(labels, columns, colnames):
+  """ Returns the labels and columns of the columns named in 'colnames',
+      in the order of 'labels'. The first column, holding the row names,
+      is always kept. Names in 'colnames' that are no label are ignored.
+  """
+  colnames = set(colnames)
+  keep = [j for j in range(len(labels)) if j == 0 or labels[j] in colnames]
+  return [labels[j] for j in keep], [columns[j] for j in keep]
@@ -0,0 +1,172 @@
+#File: table_spec.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##The column options of a table (precision, string_replace and
+##postprocessing) indexed by column name. The option lists are checked
+##and indexed once, such that looking up the options of a column does
+##not scan the lists again, and a TableSpec can be used for many tables.
+
+
+import re
+
+
+# Strings that are replaced in boolean columns:
+BOOLEAN_STRINGS = ('True', 'False')
+
+# References to other columns of the same row in the LaTeX code of options,
+# by column name and by column index:
+COLUMN_REFERENCE = re.compile(r'\\(?:get)?thisrow\s*\{([^}]*)\}')
+COLUMN_INDEX_REFERENCE = re.compile(r'\\(?:get)?thisrowno\b')
+
+
+class TableSpec:
+  """
+     Column options of a table, indexed by column name.
+     Input:
+      precision: 2D List of two elements, first is a string of the corresponding column
+        name, second is a string of column data type and numerical precision entries
+      string_replace: List of lists, with the first element being the string
+        of the affected columnname, and the following elements being lists of
+        two elements each, the text to be replaced and the text that should
+        appear in the table instead
+      postprocessing: List of lists, whereas inner list has at least 4 elements:
+        1: column name to postprocess, 2: LaTeX code to add to the column,
+        3: 'unit', 'trailing' or 'code', and 4: True or False. Entries of type
+        'code' have two more elements, the code for the row given as second
+        element, and the code for all other rows.
+     A ValueError is raised if an option is malformed.
+  """
+
+  def __init__(self, precision=None, string_replace=None, postprocessing=None):
+    self.precision = {}
+    self.string_replace = {}
+    self.boolean_columns = set()
+    self.postprocessing = {}
+    self.prerendered = set()
+    if (not (precision is None)):
+      for item in precision:
+        if (len(item) != 2):
+          raise ValueError("Precision entries must have two elements, got "+str(item)+".")
+        # The first entry of a column is used:
+        if (not (item[0] in self.precision)):
+          self.precision[item[0]] = item[1]
+    if (not (string_replace is None)):
+      for item in string_replace:
+        if (len(item) < 1):
+          raise ValueError("String replace entries must start with a column name.")
+        self.add_string_replace(item[0], item[1:])
+    if (not (postprocessing is None)):
+      for item in postprocessing:
+        if (len(item) < 4 or (item[2] == 'code' and len(item) < 6)):
+          raise ValueError("Postprocessing entry "+str(item)+" has too few elements.")
+        self.postprocessing.setdefault(item[0], []).append(item)
+
+  def add_string_replace(self, colname, replacements):
+    """ Appends the replacements, a list of [text, replacement] pairs, to
+        the string replacements of the column 'colname'.
+    """
+    for replace in replacements:
+      if (len(replace) != 2):
+        raise ValueError("String replacements of column "+str(colname)+" must be pairs, got "+str(replace)+".")
+      if (replace[0] in BOOLEAN_STRINGS):
+        self.boolean_columns.add(colname)
+    self.string_replace.setdefault(colname, []).extend(replacements)
+
+  def copy(self):
+    """ Returns a copy, that can be extended without changing this TableSpec """
+    spec = TableSpec()
+    spec.precision = dict(self.precision)
+    spec.string_replace = dict([(colname, list(replacements)) for (colname, replacements) in self.string_replace.items()])
+    spec.boolean_columns = set(self.boolean_columns)
+    spec.postprocessing = dict(self.postprocessing)
+    spec.prerendered = set(self.prerendered)
+    return spec
+
+  def mark_prerendered(self, colname, postprocessing=None):
+    """ Marks the column 'colname' as rendered in Python (see prerender), it
+        is typeset as string without replacements, and only with the
+        postprocessing entries in 'postprocessing'.
+    """
+    self.prerendered.add(colname)
+    if (colname in self.string_replace):
+      del self.string_replace[colname]
+    if (postprocessing):
+      self.postprocessing[colname] = list(postprocessing)
+    elif (colname in self.postprocessing):
+      del self.postprocessing[colname]
+
+  def precision_of(self, colname):
+    """ Returns the precision entry of a column, or None """
+    return self.precision.get(colname)
+
+  def replacements(self, colname):
+    """ Returns the list of [text, replacement] pairs of a column """
+    return self.string_replace.get(colname, [])
+
+  def has_replacements(self, colname):
+    """ Returns True if string replacements are given for a column """
+    return colname in self.string_replace
+
+  def is_prerendered(self, colname):
+    """ Returns True if the cells of a column were rendered in Python """
+    return colname in self.prerendered
+
+  def is_boolean(self, colname):
+    """ Returns True if 'True' or 'False' are replaced in a column """
+    return colname in self.boolean_columns
+
+  def postprocessing_of(self, colname):
+    """ Returns the list of postprocessing entries of a column """
+    return self.postprocessing.get(colname, [])
+
+  def is_postprocessed(self, colname):
+    """ Returns True if postprocessing entries are given for a column """
+    return colname in self.postprocessing
+
+  def referenced_columns(self, colnames):
+    """ Returns the set of names of the columns, that the options of the
+        columns 'colnames' refer to with \\thisrow{..} or \\getthisrow{..}.
+        Returns None if an option refers to a column by its index, with
+        \\thisrowno{..}, such that the order of all columns must be kept.
+    """
+    texts = []
+    for colname in colnames:
+      if (colname in self.precision):
+        texts.append(self.precision[colname])
+      texts.extend([replace[1] for replace in self.replacements(colname)])
+      for item in self.postprocessing_of(colname):
+        texts.extend(item[1:])
+    referenced = set()
+    for text in texts:
+      if (not isinstance(text, basestring)):
+        continue
+      if (COLUMN_INDEX_REFERENCE.search(text)):
+        return None
+      referenced.update([name.strip() for name in COLUMN_REFERENCE.findall(text)])
+    return referenced
+
+
+def table_spec(precision=None, string_replace=None, postprocessing=None, spec=None):
+  """ Returns 'spec' if it is given, and otherwise a TableSpec of the option
+      lists. A ValueError is raised if both are given.
+  """
+  if (spec is None):
+    return TableSpec(precision, string_replace, postprocessing)
+  if (not (precision is None and string_replace is None and postprocessing is None)):
+    raise ValueError("Give either a TableSpec or precision, string_replace and postprocessing, not both.")
+  return spec
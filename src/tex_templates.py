@@ -0,0 +1,261 @@
+#File: tex_templates.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Fragments of the LaTeX files written by Py2pgfplots.write_pgfplotstable_tex_file.
+##The static parts are assembled once at import, the table specific parts are
+##filled in by the functions below, and the standalone document, the include
+##file and the settings file are assembled from the same fragments.
+
+
+# Preamble of the standalone documents, up to the packages:
+PREAMBLE_PACKAGES = '\n'.join([
+  "%% Generated file to generate a table data from a pgfdatafile using pgfplotstable",
+  "",
+  "\\documentclass[11pt]{article}",
+  "% Set page legths",
+  "\\special{papersize=550cm,550cm}",
+  "\\hoffset-0.8in",
+  "\\voffset-0.8in",
+  "\\setlength{\\paperwidth}{550cm}",
+  "\\setlength{\\paperheight}{550cm}",
+  "\\setlength{\\textwidth}{545cm}",
+  "\\setlength{\\textheight}{545cm}",
+  "\\topskip0cm",
+  "\\setlength{\\headheight}{0cm}",
+  "\\setlength{\\headsep}{0cm}",
+  "\\setlength{\\topmargin}{0cm}",
+  "\\setlength{\\oddsidemargin}{0cm}",
+  "% set the pagestyle to empty (removing pagenumber etc)",
+  "\\pagestyle{empty}",
+  "",
+  "% Additional packages:",
+  "\\usepackage{amssymb}",
+  "\\usepackage{textcomp}",
+  "\\usepackage{units}",
+  "\\usepackage[english]{babel}",
+  "\\usepackage[babel]{csquotes}",
+  "\\usepackage{color}",
+  "\\usepackage{pdflscape}",
+  "",
+  "% PGF:",
+  "\\usepackage{tikz}",
+  "% \\usepackage{pgfplots}",
+  "\\usepackage{pgfplotstable}",
+  "% recommended:",
+  "\\usepackage{booktabs}",
+  "\\usepackage{array}",
+  "\\usepackage{colortbl}",
+  "",
+]) + '\n'
+
+# Preamble of the standalone document, up to and including \begin{landscape}:
+STANDALONE_PREAMBLE = PREAMBLE_PACKAGES + '\n'.join([
+  "\\begin{document}",
+  "",
+  "\\begin{landscape}",
+  "",
+]) + '\n'
+
+# Written to pdflatex's output by a tightpage document, if its pages are not
+# cropped to the tables, such that pdfcrop is still needed:
+NOT_CROPPED_MESSAGE = 'py2pgftable: the page is not cropped to the table'
+
+# Line of a tightpage document, whose tables in a table environment are
+# cropped as floats, i.e. to the \textwidth wide box of the float:
+NOT_CROPPED_LINE = "\\typeout{"+NOT_CROPPED_MESSAGE+"}\n"
+
+# Preamble of the standalone document, whose pages are cropped to the tables
+# by the preview package. Without the package, the preview environment does
+# nothing, and NOT_CROPPED_MESSAGE is written when the document is compiled.
+# A preview environment crops to the box of its content, which is as wide
+# as the \textwidth for a \centering paragraph. \pgftabletrim, at the end of
+# a preview environment, rebuilds the single line of the table's paragraph
+# with its natural width, i.e. the width of the table. Outside of a box,
+# without the preview package, it ends the paragraph only:
+TIGHTPAGE_PREAMBLE = PREAMBLE_PACKAGES + '\n'.join([
+  "% Crop the pages to the tables:",
+  "\\IfFileExists{preview.sty}{\\usepackage[active,tightpage,floats]{preview}}{\\newenvironment{preview}{}{}\\def\\pgftablenotcropped{}}",
+  "\\newcommand{\\pgftabletrim}{\\par\\ifinner\\setbox0\\lastbox\\ifvoid0\\else\\hbox{\\unhbox0}\\fi\\fi}",
+  "",
+  "\\begin{document}",
+  "\\ifdefined\\pgftablenotcropped\\typeout{"+NOT_CROPPED_MESSAGE+"}\\fi",
+  "",
+]) + '\n'
+
+# End of the tightpage document:
+TIGHTPAGE_END = '\n'.join([
+  "",
+  "\\end{document}",
+]) + '\n'
+
+# End of the standalone document:
+STANDALONE_END = '\n'.join([
+  "",
+  "\\end{landscape}",
+  "",
+  "\\end{document}",
+]) + '\n'
+
+# Common settings of all tables, following the header of the settings file:
+SETTINGS_PROLOGUE = '\n'.join([
+  "",
+  "\\pgfplotstableset{",
+  "    %    col sep=&,row sep=\\\\",
+  "    %    col sep=space, ignore chars={(,),\\ ,\\#}",
+  "    % Coloring:",
+  "    every even row/.style={before row={\\rowcolor[gray]{0.85}}},",
+  "    % Table header:",
+  "    every head row/.style={before row=\\toprule,after row=\\midrule},",
+  "    every last row/.style={after row=\\bottomrule},",
+  "    % Set column parameters:",
+]) + '\n'
+
+
+def table_block(settings_filename, datafile, pgftable_name, printcols, caption=None, label=None):
+  """ Returns the part of the document that loads the settings and data
+      of a table and typesets it, optionally in a table environment with
+      caption and label. This is the part shared by the standalone
+      document and the include file.
+      Input:
+       settings_filename: String of the filename of the settings file
+       datafile: String of the path of the datafile, relative to the texfile
+       pgftable_name: String of the LaTeX name of the table's data
+       printcols: String of the comma separated columns to print
+       caption: String of the caption, or None for no table environment
+       label: String of the label, used if a caption is given
+  """
+  lines = [
+    "% Load table settings:",
+    "\\input{"+settings_filename+"}",
+    "% Load table data:",
+    "\\pgfplotstableread{"+datafile+"}\\"+pgftable_name,
+    "",
+  ]
+  if (not (caption is None)):
+    lines.append("\\begin{table}")
+  lines.append("  \\centering")
+  lines.append("  \\pgfplotstabletypeset[columns={"+printcols+"},")
+  lines.append("  ]\\"+pgftable_name)
+  if (not (caption is None)):
+    lines.append("  \\caption{"+caption+"}")
+    lines.append("  \\label{"+label+"}")
+    lines.append("\\end{table}")
+  return '\n'.join(lines) + '\n'
+
+
+def chunked_table_block(settings_filename, datafiles, pgftable_name, printcols, caption=None, label=None, preview=False):
+  """ Returns the part of the document that typesets a table, whose rows are
+      split into several datafiles. Each chunk is read and typeset on its own
+      page, with the header repeated, such that TeX only holds one chunk in
+      memory at a time. The caption and label are put on the first chunk.
+      Input:
+       settings_filename: String of the filename of the settings file
+       datafiles: List of strings of the paths of the datafiles of the chunks,
+         relative to the texfile
+       pgftable_name: String of the LaTeX name of the table's data
+       printcols: String of the comma separated columns to print
+       caption: String of the caption, or None for no table environment
+       label: String of the label, used if a caption is given
+       preview: Boolean determining if each chunk without table environment
+         is put in a preview environment, for tightpage_document
+  """
+  preview = preview and (caption is None)
+  lines = [
+    "% Load table settings:",
+    "\\input{"+settings_filename+"}",
+  ]
+  for k in range(len(datafiles)):
+    if (k > 0):
+      lines.append("\\clearpage")
+    lines.append("% Load and typeset chunk "+str(k+1)+" of "+str(len(datafiles))+" of the table data:")
+    lines.append("\\pgfplotstableread{"+datafiles[k]+"}\\"+pgftable_name)
+    lines.append("")
+    if (not (caption is None)):
+      lines.append("\\begin{table}")
+    if (preview):
+      lines.append("\\begin{preview}")
+    lines.append("  \\centering")
+    lines.append("  \\pgfplotstabletypeset[columns={"+printcols+"},")
+    lines.append("  ]\\"+pgftable_name)
+    if (preview):
+      lines.append("\\pgftabletrim")
+      lines.append("\\end{preview}")
+    if (not (caption is None)):
+      if (k == 0):
+        lines.append("  \\caption{"+caption+"}")
+        lines.append("  \\label{"+label+"}")
+      lines.append("\\end{table}")
+  return '\n'.join(lines) + '\n'
+
+
+def standalone_document(block, preamble=STANDALONE_PREAMBLE, end=STANDALONE_END):
+  """ Returns the standalone document of a table, given its table_block """
+  return preamble + block + end
+
+
+def preview_block(block):
+  """ Returns the block in a preview environment, such that its page is
+      cropped to it. Tables in a table environment must not be put in a
+      preview environment, they are cropped as floats. The block must end
+      with the paragraph of the table, which is trimmed to the table's width.
+  """
+  return "\\begin{preview}\n" + block + "\\pgftabletrim\n\\end{preview}\n"
+
+
+def tightpage_document(block, preview=True, floats=False):
+  """ Returns the standalone document of a table, given its table_block,
+      whose page is cropped to the table by pdflatex, see TIGHTPAGE_PREAMBLE.
+      Input:
+       block: String of the table_block
+       preview: Boolean determining if the block is put in a preview
+         environment, False if the table is in a table environment, or if
+         the block has its own preview environments
+       floats: Boolean, True if the table is in a table environment. Its
+         page is then only cropped to the height of the table by pdflatex,
+         and NOT_CROPPED_MESSAGE is written, such that pdfcrop is still run
+  """
+  if (preview):
+    block = preview_block(block)
+  if (floats):
+    block = NOT_CROPPED_LINE + block
+  return TIGHTPAGE_PREAMBLE + block + TIGHTPAGE_END
+
+
+def latex_cropped(output):
+  """ Returns False if pdflatex's output of a tightpage document shows that
+      the page could not be cropped, such that pdfcrop is needed.
+  """
+  return not (NOT_CROPPED_MESSAGE in output)
+
+
+def include_document(include_filename, block, caption=None):
+  """ Returns the file to \\input into other documents, given the table_block """
+  header = "% Load this file in your LaTeX document with:\n% \\input{"+include_filename+"}\n\n"
+  if (caption is None):
+    return header + block + "\n"
+  return header + block
+
+
+def settings_document(settings_path, column_styles):
+  """ Returns the settings file of a table.
+      Input:
+       settings_path: String of the path of the settings file, as mentioned in its header
+       column_styles: List of the lines of the column styles
+  """
+  header = "% PGFPlotsTable settings are defined below.\n% To load them:\n% \\input{"+settings_path+"}\n"
+  return header + SETTINGS_PROLOGUE + '\n'.join(column_styles + ["}"]) + '\n'
@@ -0,0 +1,35 @@
+#File: py2pgftable_module.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Imports py2pgftable for the tests and benchmarks. The methods of
+##Py2pgfplots call each other by their bare names, so they are set up as
+##functions of the module as well.
+##Usage: from py2pgftable_module import py2pgftable
+
+
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import py2pgftable
+from py2pgftable import Py2pgfplots
+
+for (name, function) in vars(Py2pgfplots).items():
+  if (isinstance(function, types.FunctionType)):
+    setattr(py2pgftable, name, function)
@@ -0,0 +1,100 @@
+#File: test_axis_domain.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Setting the axis domains of pgfplots figures from their data.
+##Usage: python -m unittest discover -s tests
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from pgfdata import write_columns_pgfplots_data_file
+import axis_domain
+from axis_domain import restrict_axis_domains, restrict_domain_lines, pool_workers
+
+FIGURE = """\\begin{axis}[
+  restrict x to domain=0:1, % use this if you get a 'dimension too large' error
+  % restrict y to domain=0:1,
+]
+\\addplot table[x=t, y=u]{data.pgfdat};
+\\end{axis}
+"""
+
+
+class TestAxisDomain(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def write_texfile(self, content):
+    texfile = open(os.path.join(self.tmpdir, 'figure.tex'), 'w')
+    texfile.write(content)
+    texfile.close()
+
+  def read_texfile(self):
+    texfile = open(os.path.join(self.tmpdir, 'figure.tex'), 'r')
+    try:
+      return texfile.read()
+    finally:
+      texfile.close()
+
+  def test_bounds_written_by_repr(self):
+    lines = restrict_domain_lines(FIGURE.splitlines(True), (0.1+0.2, 1e22, -1.0/3, np.float64(2.5)))
+    self.assertTrue(lines[1].startswith('  restrict x to domain=0.30000000000000004:1e+22,'))
+    self.assertTrue(lines[2].startswith('  restrict y to domain=-0.3333333333333333:2.5,'))
+
+  def test_domain_of_the_plotted_data(self):
+    columns = [np.array([0.1+0.2, 1.0/3, 2.0]), np.array([-1.5, 1e-7, 4.0])]
+    write_columns_pgfplots_data_file(os.path.join(self.tmpdir, 'data.pgfdat'), columns, array_labels=['t', 'u'])
+    self.write_texfile(FIGURE)
+    self.assertTrue(restrict_axis_domains(self.tmpdir, 'figure.tex'))
+    tex = self.read_texfile()
+    self.assertTrue('restrict x to domain=0.30000000000000004:2.0,' in tex)
+    self.assertTrue('restrict y to domain=-1.5:4.0,' in tex)
+    self.assertFalse(restrict_axis_domains(self.tmpdir, 'figure.tex'))
+
+  def test_serial_scan_of_small_datafiles(self):
+    filenames = []
+    for k in range(3):
+      filenames.append(os.path.join(self.tmpdir, 'curve'+str(k)+'.pgfdat'))
+      write_columns_pgfplots_data_file(filenames[-1], [np.arange(100.0)], array_labels=['t'])
+    self.assertEqual(pool_workers(filenames), 1)
+    (min_bytes, workers) = (axis_domain.POOL_MIN_BYTES, axis_domain.DOMAIN_WORKERS)
+    try:
+      (axis_domain.POOL_MIN_BYTES, axis_domain.DOMAIN_WORKERS) = (os.path.getsize(filenames[0]), 3)
+      self.assertEqual(pool_workers(filenames), 3)
+      self.assertEqual(pool_workers(filenames[:1]+[os.path.join(self.tmpdir, 'missing.pgfdat')]), 1)
+    finally:
+      (axis_domain.POOL_MIN_BYTES, axis_domain.DOMAIN_WORKERS) = (min_bytes, workers)
+
+  def test_texfile_without_figure_kept(self):
+    self.write_texfile("\\pgfplotstabletypeset{data.pgfdat}\nrestrict x to domain=0:1,\n")
+    self.assertFalse(restrict_axis_domains(self.tmpdir, 'figure.tex'))
+    self.assertEqual(self.read_texfile(), "\\pgfplotstabletypeset{data.pgfdat}\nrestrict x to domain=0:1,\n")
+
+
+if __name__ == '__main__':
+  unittest.main()
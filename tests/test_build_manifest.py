@@ -0,0 +1,142 @@
+#File: test_build_manifest.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##When the build manifest keeps generated files, and when it skips or
+##rebuilds a target, also across saved and reloaded manifests.
+##Usage: python -m unittest discover -s tests
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from build_manifest import BuildManifest, MANIFEST_FILENAME, write_text_file, pgftable_build_options
+
+
+class ManifestTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def path(self, name):
+    return os.path.join(self.tmpdir, name)
+
+  def write(self, name, content):
+    write_text_file(self.path(name), content)
+    return self.path(name)
+
+  def read(self, name):
+    infile = open(self.path(name), 'r')
+    try:
+      return infile.read()
+    finally:
+      infile.close()
+
+
+class TestGeneratedFiles(ManifestTestCase):
+
+  def test_write_file_skips_same_content(self):
+    manifest = BuildManifest(self.tmpdir)
+    self.assertTrue(manifest.write_file(self.path('a.tex'), 'a'))
+    os.utime(self.path('a.tex'), (0, 0))
+    self.assertFalse(manifest.write_file(self.path('a.tex'), 'a'))
+    self.assertEqual(os.path.getmtime(self.path('a.tex')), 0)
+    self.assertTrue(manifest.write_file(self.path('a.tex'), 'b'))
+    self.assertEqual(self.read('a.tex'), 'b')
+
+  def test_replace_file(self):
+    manifest = BuildManifest(self.tmpdir)
+    self.write('data.pgfdat', 'x\n1\n')
+    os.utime(self.path('data.pgfdat'), (0, 0))
+    self.write('data.pgfdat.tmp', 'x\n1\n')
+    self.assertFalse(manifest.replace_file(self.path('data.pgfdat.tmp'), self.path('data.pgfdat')))
+    self.assertFalse(os.path.exists(self.path('data.pgfdat.tmp')))
+    self.assertEqual(os.path.getmtime(self.path('data.pgfdat')), 0)
+    self.write('data.pgfdat.tmp', 'x\n2\n')
+    self.assertTrue(manifest.replace_file(self.path('data.pgfdat.tmp'), self.path('data.pgfdat')))
+    self.assertFalse(os.path.exists(self.path('data.pgfdat.tmp')))
+    self.assertEqual(self.read('data.pgfdat'), 'x\n2\n')
+
+
+class TestTargets(ManifestTestCase):
+
+  def setUp(self):
+    ManifestTestCase.setUp(self)
+    self.inputs = [self.write('a.tex', 'a'), self.write('a_data.pgfdat', 'x\n1\n')]
+    self.target = self.write('a.pdf', '%PDF-1.4')
+    manifest = BuildManifest(self.tmpdir)
+    manifest.record(self.target, self.inputs)
+    manifest.save()
+
+  def test_skipped_if_unchanged(self):
+    self.assertTrue(BuildManifest(self.tmpdir).is_current(self.target, self.inputs))
+
+  def test_rebuilt_if_an_input_changed(self):
+    self.write('a_data.pgfdat', 'x\n2\n')
+    self.assertFalse(BuildManifest(self.tmpdir).is_current(self.target, self.inputs))
+    # Touching an input, without changing it, needs no rebuild:
+    self.write('a_data.pgfdat', 'x\n1\n')
+    self.assertTrue(BuildManifest(self.tmpdir).is_current(self.target, self.inputs))
+
+  def test_rebuilt_if_the_inputs_differ(self):
+    manifest = BuildManifest(self.tmpdir)
+    self.assertFalse(manifest.is_current(self.target, self.inputs[:1]))
+    self.assertFalse(manifest.is_current(self.target, self.inputs+[self.write('b.pgfdat', 'y\n')]))
+
+  def test_rebuilt_if_the_options_differ(self):
+    manifest = BuildManifest(self.tmpdir)
+    self.assertFalse(manifest.is_current(self.target, self.inputs, pgftable_build_options(True, False)))
+    manifest.record(self.target, self.inputs, pgftable_build_options(True, False))
+    manifest.save()
+    manifest = BuildManifest(self.tmpdir)
+    self.assertTrue(manifest.is_current(self.target, self.inputs, pgftable_build_options(True, False)))
+    self.assertFalse(manifest.is_current(self.target, self.inputs, pgftable_build_options(False, False)))
+    self.assertFalse(manifest.is_current(self.target, self.inputs, pgftable_build_options(True, True)))
+
+  def test_rebuilt_if_the_target_changed(self):
+    self.write('a.pdf', '%PDF-1.5')
+    self.assertFalse(BuildManifest(self.tmpdir).is_current(self.target, self.inputs))
+    os.remove(self.target)
+    self.assertFalse(BuildManifest(self.tmpdir).is_current(self.target, self.inputs))
+
+  def test_rebuilt_without_valid_manifest(self):
+    self.write(MANIFEST_FILENAME, '{"targets": ')
+    self.assertFalse(BuildManifest(self.tmpdir).is_current(self.target, self.inputs))
+
+  def test_manifests_of_one_directory_merged(self):
+    first = BuildManifest(self.tmpdir)
+    second = BuildManifest(self.tmpdir)
+    target = self.write('b.pdf', '%PDF-1.4')
+    first.record(target, self.inputs[:1])
+    second.write_file(self.path('b.tex'), 'b')
+    first.save()
+    second.save()
+    manifest = BuildManifest(self.tmpdir)
+    self.assertTrue(manifest.is_current(target, self.inputs[:1]))
+    self.assertTrue(manifest.is_current(self.target, self.inputs))
+    self.assertEqual(sorted(manifest.files.keys()), ['b.tex'])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,90 @@
+#File: test_column_schema.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Inference and caching of the column schema of a datafile.
+##Usage: python -m unittest discover -s tests
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from pgfdata import write_columns_pgfplots_data_file
+from column_schema import column_schema, infer_columns_schema, INTEGER, FLOAT, STRING
+
+
+class TestColumnSchema(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.datafile = os.path.join(self.tmpdir, 'data.pgfdat')
+    self.inferred = 0
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def infer(self, data, colnames, sample_rows=None):
+    self.inferred += 1
+    return infer_columns_schema(data, colnames, sample_rows=sample_rows)
+
+  def build(self, columns, labels, sample_rows=None):
+    """ Writes the datafile and returns its schema, as a build of a table does """
+    write_columns_pgfplots_data_file(self.datafile, columns, array_labels=labels)
+    return column_schema(self.datafile, columns, labels, sample_rows=sample_rows, infer=self.infer)
+
+  def test_kinds(self):
+    columns = [np.array(['a', 'b']), np.array([1, 2]), np.array([0.5, 0.25])]
+    schema = self.build(columns, ['name', 'n', 'x'])
+    self.assertEqual([col.kind for col in schema], [STRING, INTEGER, FLOAT])
+    self.assertEqual(schema[2].decimals, 2)
+
+  def test_inferred_from_sample(self):
+    columns = [np.array(['1', 'x', 'x', 'x', '2'], dtype=object), np.array([0.5, 0.25, 0.125, 1.0, 2.0])]
+    schema = infer_columns_schema(columns, ['n', 'x'], sample_rows=2)
+    self.assertEqual([col.kind for col in schema], [INTEGER, FLOAT])
+    self.assertEqual(schema[1].max_magnitude, 2.0)
+    self.assertEqual(infer_columns_schema(columns, ['n', 'x'])[0].kind, STRING)
+
+  def test_cached_across_rewrites_with_same_content(self):
+    columns = [np.array(['a', 'b']), np.array([0.5, 0.25])]
+    self.build(columns, ['name', 'x'])
+    os.utime(self.datafile, (0, 0))
+    schema = self.build(columns, ['name', 'x'])
+    self.assertEqual(self.inferred, 1)
+    self.assertEqual(schema[1].decimals, 2)
+    columns[1] = np.array([0.5, 0.125])
+    schema = self.build(columns, ['name', 'x'])
+    self.assertEqual(self.inferred, 2)
+    self.assertEqual(schema[1].decimals, 3)
+
+  def test_stale_for_other_sample(self):
+    columns = [np.array(['1', 'x', 'x', 'x', '2'], dtype=object)]
+    self.assertEqual(self.build(columns, ['n'], sample_rows=2)[0].kind, INTEGER)
+    self.assertEqual(self.build(columns, ['n'], sample_rows=2)[0].kind, INTEGER)
+    self.assertEqual(self.inferred, 1)
+    self.assertEqual(self.build(columns, ['n'])[0].kind, STRING)
+    self.assertEqual(self.build(columns, ['n'], sample_rows=3)[0].kind, STRING)
+    self.assertEqual(self.inferred, 3)
+
+
+if __name__ == '__main__':
+  unittest.main()
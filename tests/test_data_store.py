@@ -0,0 +1,131 @@
+#File: test_data_store.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Tables sharing their datafiles through the content-addressed store.
+##Usage: python -m unittest discover -s tests
+
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from py2pgftable_module import py2pgftable
+from data_store import store_columns, store_directory, table_datafiles, collect_garbage, REFS_FILENAME, STALE_TMP_SECONDS
+from column_stats import stats_filename
+from column_schema import schema_filename
+
+STATUS = {
+  'run_1': {'error': 1.5e-3, 'steps': 10},
+  'run_2': {'error': 2.25e-4, 'steps': 20},
+}
+
+
+class TestDataStore(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.store = store_directory(self.tmpdir)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def build(self, name, status=STATUS, **kwargs):
+    py2pgftable.write_dict_status_pgftable(self.tmpdir, name, status, 'run', pdflatex=False, shared_data=True, **kwargs)
+
+  def stored(self):
+    return sorted([name for name in os.listdir(self.store) if name.endswith('.pgfdat')])
+
+  def refs(self):
+    refs_file = open(os.path.join(self.store, REFS_FILENAME), 'r')
+    try:
+      return json.load(refs_file)
+    finally:
+      refs_file.close()
+
+  def read_texfile(self, name):
+    texfile = open(os.path.join(self.tmpdir, name), 'r')
+    try:
+      return texfile.read()
+    finally:
+      texfile.close()
+
+  def test_tables_share_their_datafile(self):
+    self.build('a.tex')
+    self.build('b.tex', printcols=['run', 'error'])
+    self.assertEqual(len(self.stored()), 1)
+    self.assertEqual(self.refs(), {'a.tex': self.stored(), 'b.tex': self.stored()})
+    self.assertEqual(table_datafiles(self.tmpdir, 'a.tex'), [os.path.join(self.store, self.stored()[0])])
+    self.assertTrue('\\pgfplotstableread{./'+os.path.basename(self.store)+'/'+self.stored()[0]+'}' in self.read_texfile('b.tex'))
+    self.assertFalse(os.path.isfile(os.path.join(self.tmpdir, 'a_data.pgfdat')))
+
+  def test_datafile_written_once(self):
+    columns = [np.array(['run_1', 'run_2'], dtype=object), np.array([0.5, 0.25])]
+    filename = store_columns(self.tmpdir, columns, ['run', 'x'])
+    os.utime(filename, (0, 0))
+    self.assertEqual(store_columns(self.tmpdir, columns, ['run', 'x']), filename)
+    self.assertEqual(os.path.getmtime(filename), 0)
+    self.assertTrue(os.path.isfile(stats_filename(filename)))
+    self.assertNotEqual(store_columns(self.tmpdir, [columns[0], columns[1]*2], ['run', 'x']), filename)
+
+  def test_chunks_stored(self):
+    status = dict([('run_'+str(i), {'error': 0.5**i}) for i in range(1, 5)])
+    self.build('a.tex', status=status, max_cells_per_chunk=4)
+    self.assertEqual(len(self.refs()['a.tex']), 2)
+    self.assertEqual(sorted(self.refs()['a.tex']), self.stored())
+
+  def test_collect_garbage(self):
+    self.build('a.tex')
+    self.build('b.tex')
+    status = dict(STATUS)
+    status['run_3'] = {'error': 0.5, 'steps': 30}
+    self.build('b.tex', status=status)
+    # The datafile of 'a.tex' is still used:
+    self.assertEqual(collect_garbage(self.tmpdir), [])
+    self.assertEqual(len(self.stored()), 2)
+    old = os.path.join(self.store, self.refs()['a.tex'][0])
+    os.remove(os.path.join(self.tmpdir, 'a.tex'))
+    self.assertEqual(collect_garbage(self.tmpdir), [old])
+    self.assertEqual(self.stored(), self.refs()['b.tex'])
+    self.assertEqual(sorted(self.refs().keys()), ['b.tex'])
+    for filename in (stats_filename(old), schema_filename(old)):
+      self.assertFalse(os.path.isfile(filename))
+    # Without shared_data, the table uses no stored datafile anymore:
+    py2pgftable.write_dict_status_pgftable(self.tmpdir, 'b.tex', STATUS, 'run', pdflatex=False)
+    self.assertEqual(self.refs(), {})
+    self.assertEqual(len(collect_garbage(self.tmpdir)), 1)
+    self.assertEqual(self.stored(), [])
+
+  def test_stale_tmp_files_removed(self):
+    self.build('a.tex')
+    stale = os.path.join(self.store, 'x.pgfdat.1_2.tmp')
+    fresh = os.path.join(self.store, 'y.pgfdat.1_2.tmp')
+    for filename in (stale, fresh):
+      open(filename, 'w').close()
+    os.utime(stale, (0, 0))
+    self.assertEqual(collect_garbage(self.tmpdir), [stale])
+    self.assertTrue(os.path.isfile(fresh))
+    os.utime(fresh, (0, os.path.getmtime(fresh) - STALE_TMP_SECONDS - 1))
+    self.assertEqual(collect_garbage(self.tmpdir), [fresh])
+    self.assertEqual(len(self.stored()), 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
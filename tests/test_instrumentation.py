@@ -0,0 +1,120 @@
+#File: test_instrumentation.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Spans of the stages of a table build, collected with a MemoryCollector
+##while the tables are compiled with the stubs of the benchmarks.
+##Usage: python -m unittest discover -s tests
+
+
+import os
+import time
+import shutil
+import logging
+import tempfile
+import unittest
+
+from py2pgftable_module import py2pgftable
+from instrumentation import span, install_sink, remove_sink, MemoryCollector, NULL_SPAN
+from latex_build import build_filename
+
+STUBS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'stubs')
+
+STATUS = {'run_1': {'error': 0.5}, 'run_2': {'error': 0.25}}
+
+
+class ListHandler(logging.Handler):
+  """ Keeps the messages of the logged records """
+
+  def __init__(self):
+    logging.Handler.__init__(self)
+    self.messages = []
+
+  def emit(self, record):
+    self.messages.append(record.getMessage())
+
+
+class TestInstrumentation(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.path = os.environ['PATH']
+    os.environ['PATH'] = os.pathsep.join([os.path.abspath(STUBS_DIR), self.path])
+    self.collector = install_sink(MemoryCollector())
+
+  def tearDown(self):
+    remove_sink(self.collector)
+    os.environ['PATH'] = self.path
+    shutil.rmtree(self.tmpdir)
+
+  def test_stage_names(self):
+    py2pgftable.write_dict_status_pgftable(self.tmpdir, 'status.tex', STATUS, 'run')
+    names = set([record['name'] for record in self.collector.records])
+    for name in ('table.columns', 'table.escape', 'table.write_data', 'table.write_tex', 'table.compile',
+                 'latex.run', 'latex.preflight', 'command.pdflatex', 'pdfcrop.run', 'command.pdfcrop'):
+      self.assertTrue(name in names, name)
+    parents = dict([(record['name'], record['parent']) for record in self.collector.records])
+    self.assertEqual(parents['latex.run'], 'table.compile')
+    self.assertEqual(parents['command.pdflatex'], 'latex.run')
+
+  def test_retry_counters(self):
+    py2pgftable.write_dict_status_pgftable(self.tmpdir, 'status.tex', STATUS, 'run', caption='Status')
+    summary = self.collector.summary()
+    self.assertEqual(summary['latex.run']['count'], 1)
+    self.assertEqual(summary['latex.run']['dimension_fixes'], 0)
+    self.assertEqual(summary['latex.run']['format_fallbacks'], 0)
+    # The aux file kept from the build has no labels, so pdflatex asks for another pass:
+    auxfile = open(build_filename(self.tmpdir, 'status.tex', '.aux'), 'w')
+    auxfile.write('\\relax\n')
+    auxfile.close()
+    self.collector.clear()
+    py2pgftable.write_dict_status_pgftable(self.tmpdir, 'status.tex', STATUS, 'run', caption='Status')
+    summary = self.collector.summary()
+    self.assertEqual(summary['latex.run']['label_reruns'], 1)
+    self.assertEqual(summary['command.pdflatex']['count'], 2)
+
+  def test_failing_sink_logged(self):
+    def fail(record):
+      raise ValueError("sink is broken")
+    handler = ListHandler()
+    logging.getLogger('py2pgftable').addHandler(handler)
+    install_sink(fail)
+    try:
+      with span('stage', rows=3):
+        pass
+    finally:
+      remove_sink(fail)
+      logging.getLogger('py2pgftable').removeHandler(handler)
+    self.assertEqual([record['name'] for record in self.collector.records], ['stage'])
+    self.assertEqual(len(handler.messages), 1)
+    self.assertTrue("failed on the span 'stage'" in handler.messages[0])
+
+  def test_no_overhead_without_sink(self):
+    remove_sink(self.collector)
+    self.assertTrue(span('stage', rows=3) is NULL_SPAN)
+    start = time.time()
+    for i in xrange(10000):
+      with span('stage', rows=i) as stage:
+        stage.add('retries')
+    # A few microseconds per span, instead of the tens of a recorded span:
+    self.assertTrue(time.time()-start < 0.1)
+    py2pgftable.write_dict_status_pgftable(self.tmpdir, 'status.tex', STATUS, 'run', pdflatex=False)
+    self.assertEqual(self.collector.records, [])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,309 @@
+#File: test_latex_build.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Compiling tables with the pdflatex and pdfcrop stubs of the benchmarks,
+##and with stubs that fail, time out, or write no output file, which are
+##put first on the PATH by the tests.
+##Usage: python -m unittest discover -s tests
+
+
+import os
+import sys
+import stat
+import shutil
+import tempfile
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+from py2pgftable_module import py2pgftable
+from latex_runner import CommandError
+from combined_build import combined_document, COUNTERS_RESET
+from tex_templates import NOT_CROPPED_LINE, STANDALONE_PREAMBLE, STANDALONE_END
+
+STUBS_DIR = os.path.join(TESTS_DIR, '..', 'benchmarks', 'stubs')
+
+STATUS = {'run_1': {'error': 0.5}, 'run_2': {'error': 0.25}}
+
+# Stubs of pdflatex, that fail in different ways:
+FAILING_PDFLATEX = '#!/bin/sh\necho "! Undefined control sequence."\necho "l.12 The undefined command"\nexit 1\n'
+SILENT_PDFLATEX = '#!/bin/sh\necho "Output written on nothing."\nexit 0\n'
+HANGING_PDFLATEX = '#!/bin/sh\nsleep 10\n'
+# Stub of pdflatex, that reports an error it recovered from, but writes the pdf:
+RECOVERING_PDFLATEX = '#!/bin/sh\n'+os.path.abspath(os.path.join(STUBS_DIR, 'pdflatex'))+' "$@"\necho "! Missing $ inserted."\nexit 1\n'
+FAILING_PDFCROP = '#!/bin/sh\necho "!!! Error: Cannot open pdf"\nexit 2\n'
+
+
+class LatexTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.bindir = os.path.join(self.tmpdir, 'bin')
+    os.mkdir(self.bindir)
+    self.path = os.environ['PATH']
+    os.environ['PATH'] = os.pathsep.join([self.bindir, os.path.abspath(STUBS_DIR), self.path])
+
+  def tearDown(self):
+    os.environ['PATH'] = self.path
+    shutil.rmtree(self.tmpdir)
+
+  def stub(self, program, script):
+    """ Puts a stub of 'program' with the shell script 'script' first on the PATH """
+    filename = os.path.join(self.bindir, program)
+    stubfile = open(filename, 'w')
+    stubfile.write(script)
+    stubfile.close()
+    os.chmod(filename, os.stat(filename).st_mode | stat.S_IXUSR)
+
+  def texfile(self, name='status.tex'):
+    return os.path.join(self.tmpdir, name)
+
+  def read_texfile(self, name='status.tex'):
+    texfile = open(self.texfile(name), 'r')
+    try:
+      return texfile.read()
+    finally:
+      texfile.close()
+
+  def build(self, name='status.tex', **kwargs):
+    kwargs.setdefault('pdflatex', False)
+    return py2pgftable.write_dict_status_pgftable(self.tmpdir, name, STATUS, 'run', **kwargs)
+
+
+class TestRunLatex(LatexTestCase):
+
+  def test_success(self):
+    self.build()
+    result = py2pgftable.run_latex(self.tmpdir, 'status.tex')
+    self.assertEqual(result.returncode, 0)
+    self.assertEqual(result.warning, None)
+    self.assertTrue(os.path.isfile(self.texfile('status.pdf')))
+
+  def test_failure_raises(self):
+    self.build()
+    self.stub('pdflatex', FAILING_PDFLATEX)
+    try:
+      py2pgftable.run_latex(self.tmpdir, 'status.tex')
+      self.fail("No CommandError raised.")
+    except CommandError as error:
+      self.assertEqual(error.stage, 'pdflatex')
+      self.assertEqual(error.result.returncode, 1)
+      self.assertTrue('exited with status 1' in str(error))
+      self.assertTrue('! Undefined control sequence.' in str(error))
+
+  def test_missing_pdf_raises(self):
+    self.build()
+    # A pdf of an earlier build does not count:
+    open(self.texfile('status.pdf'), 'w').close()
+    self.stub('pdflatex', SILENT_PDFLATEX)
+    self.assertRaises(CommandError, py2pgftable.run_latex, self.tmpdir, 'status.tex')
+    self.assertRaises(CommandError, py2pgftable.run_latex, self.tmpdir, 'status.tex', isolated=False)
+
+  def test_failure_with_pdf_warns(self):
+    self.build()
+    self.stub('pdflatex', RECOVERING_PDFLATEX)
+    for isolated in (True, False):
+      result = py2pgftable.run_latex(self.tmpdir, 'status.tex', isolated=isolated)
+      self.assertEqual(result.returncode, 1)
+      self.assertTrue('exited with status 1' in result.warning)
+      self.assertTrue('! Missing $ inserted.' in result.warning)
+      self.assertTrue(os.path.isfile(self.texfile('status.pdf')))
+      os.remove(self.texfile('status.pdf'))
+
+  def test_unreadable_texfile_raises(self):
+    try:
+      py2pgftable.run_latex(self.tmpdir, 'missing.tex')
+      self.fail("No CommandError raised.")
+    except CommandError as error:
+      self.assertEqual(error.stage, 'preflight')
+      self.assertTrue('missing.tex' in str(error))
+
+  def test_timeout_raises(self):
+    self.build()
+    self.stub('pdflatex', HANGING_PDFLATEX)
+    try:
+      py2pgftable.run_latex(self.tmpdir, 'status.tex', timeout=0.5)
+      self.fail("No CommandError raised.")
+    except CommandError as error:
+      self.assertTrue(error.result.timed_out)
+      self.assertTrue('was killed after' in str(error))
+
+  def test_status_table_raises(self):
+    self.stub('pdflatex', FAILING_PDFLATEX)
+    self.assertRaises(CommandError, self.build, pdflatex=True, pdfcrop=False)
+    future = self.build(pdflatex=True, pdfcrop=False, asynchronous=True)
+    self.assertRaises(CommandError, future.result)
+
+  def test_incremental_records_no_failed_build(self):
+    self.stub('pdflatex', FAILING_PDFLATEX)
+    self.assertRaises(CommandError, self.build, pdflatex=True, pdfcrop=False, incremental=True)
+    os.remove(os.path.join(self.bindir, 'pdflatex'))
+    self.build(pdflatex=True, pdfcrop=False, incremental=True)
+    self.assertTrue(os.path.isfile(self.texfile('status.pdf')))
+
+  def test_incremental_skips_current_pdf(self):
+    self.build(pdflatex=True, incremental=True)
+    self.stub('pdflatex', FAILING_PDFLATEX)
+    self.build(pdflatex=True, incremental=True)
+    self.assertRaises(CommandError, self.build, pdflatex=True, incremental=True, caption='Status')
+
+  def test_incremental_rebuilds_with_other_options(self):
+    self.build(pdflatex=True, pdfcrop=False, incremental=True)
+    self.stub('pdfcrop', FAILING_PDFCROP)
+    self.assertRaises(CommandError, self.build, pdflatex=True, pdfcrop=True, incremental=True)
+    os.remove(os.path.join(self.bindir, 'pdfcrop'))
+    self.build(pdflatex=True, pdfcrop=True, incremental=True)
+    self.stub('pdflatex', FAILING_PDFLATEX)
+    self.build(pdflatex=True, pdfcrop=True, incremental=True)
+    specs = [{'directory': self.tmpdir, 'texfilename': 'status.tex', 'dict': STATUS, 'first_colname': 'run', 'incremental': True}]
+    self.assertEqual([result.ok for result in py2pgftable.write_dict_status_pgftables(specs, processes=1)], [True])
+    self.assertEqual([result.ok for result in py2pgftable.write_dict_status_pgftables(specs, processes=1, pdfcrop=False)], [False])
+
+  def test_combined_build(self):
+    names = ['a.tex', 'b.tex', 'c.tex']
+    specs = [{'directory': self.tmpdir, 'texfilename': name, 'dict': STATUS, 'first_colname': 'run'} for name in names]
+    results = py2pgftable.write_dict_status_pgftables(specs, processes=1, combined=True)
+    self.assertEqual([result.ok for result in results], [True]*3)
+    self.assertEqual([sorted(result.timings.keys()) for result in results], [['combined', 'generate']]*3)
+    # Every table gets its page of the combined document:
+    for (k, name) in enumerate(names):
+      self.assertTrue(self.read_texfile(name[:-3]+'pdf').endswith('%%Page: '+str(k+1)+'\n'))
+    self.assertEqual([filename for filename in os.listdir(self.tmpdir) if filename.startswith('pgftables_combined_') or filename.startswith('.pages_')], [])
+    # Without pdfseparate, the tables are compiled on their own:
+    self.stub('pdfseparate', '#!/bin/sh\nexit 1\n')
+    results = py2pgftable.write_dict_status_pgftables(specs, processes=1, combined=True)
+    self.assertEqual([result.ok for result in results], [True]*3)
+    self.assertEqual([sorted(result.timings.keys()) for result in results], [['generate', 'latex', 'pdfcrop']]*3)
+
+  def test_failed_combined_build(self):
+    self.build('a.tex')
+    self.build('b.tex')
+    self.stub('pdflatex', FAILING_PDFLATEX)
+    done = py2pgftable.compile_tables_combined([self.texfile('a.tex'), self.texfile('b.tex')], pdfcrop=False)
+    self.assertEqual(done, {self.texfile('a.tex'): False, self.texfile('b.tex'): False})
+
+
+class TestCompileTableJob(LatexTestCase):
+
+  def job(self, pdfcrop=True):
+    return (0, self.texfile(), pdfcrop, False, False)
+
+  def test_success(self):
+    self.build()
+    result = py2pgftable.compile_table_job(self.job())
+    self.assertTrue(result.ok)
+    self.assertEqual(result.error, None)
+    self.assertEqual(sorted(result.timings.keys()), ['latex', 'pdfcrop'])
+
+  def test_failing_pdflatex(self):
+    self.build()
+    self.stub('pdflatex', FAILING_PDFLATEX)
+    result = py2pgftable.compile_table_job(self.job())
+    self.assertFalse(result.ok)
+    self.assertTrue(result.error.startswith('latex: pdflatex failed'))
+    self.assertTrue(result.error.endswith('! Undefined control sequence.\nl.12 The undefined command'))
+    self.assertFalse(os.path.isfile(self.texfile('status.pdf')))
+    self.assertEqual(sorted(result.timings.keys()), ['latex'])
+
+  def test_recovering_pdflatex(self):
+    self.build()
+    self.stub('pdflatex', RECOVERING_PDFLATEX)
+    result = py2pgftable.compile_table_job(self.job())
+    self.assertTrue(result.ok)
+    self.assertEqual(len(result.warnings), 1)
+    self.assertTrue(result.warnings[0].startswith('latex: pdflatex failed'))
+    self.assertEqual(sorted(result.timings.keys()), ['latex', 'pdfcrop'])
+    specs = [{'directory': self.tmpdir, 'texfilename': 'status.tex', 'dict': STATUS, 'first_colname': 'run'}]
+    results = py2pgftable.write_dict_status_pgftables(specs, processes=1)
+    self.assertTrue(results[0].ok)
+    self.assertEqual(len(results[0].warnings), 1)
+
+  def test_failing_pdfcrop(self):
+    self.build()
+    self.stub('pdfcrop', FAILING_PDFCROP)
+    result = py2pgftable.compile_table_job(self.job())
+    self.assertFalse(result.ok)
+    self.assertTrue(result.error.startswith('pdfcrop: pdfcrop failed'))
+    self.assertTrue('exited with status 2' in result.error)
+    self.assertTrue(py2pgftable.compile_table_job(self.job(pdfcrop=False)).ok)
+
+  def test_batch(self):
+    specs = [{'directory': self.tmpdir, 'texfilename': name, 'dict': STATUS, 'first_colname': 'run', 'incremental': True} for name in ('a.tex', 'b.tex')]
+    self.stub('pdflatex', FAILING_PDFLATEX)
+    results = py2pgftable.write_dict_status_pgftables(specs, processes=1)
+    self.assertEqual([result.ok for result in results], [False, False])
+    self.assertTrue(all([result.error.startswith('latex: pdflatex failed') for result in results]))
+    os.remove(os.path.join(self.bindir, 'pdflatex'))
+    results = py2pgftable.write_dict_status_pgftables(specs, processes=1)
+    self.assertEqual([result.ok for result in results], [True, True])
+    self.assertEqual([sorted(result.timings.keys()) for result in results], [['generate', 'latex', 'pdfcrop']]*2)
+
+
+class TestTightpage(LatexTestCase):
+
+  def test_table_trimmed_to_its_width(self):
+    self.build(tightpage=True)
+    tex = self.read_texfile()
+    self.assertTrue('\\pgftabletrim\n\\end{preview}' in tex)
+    self.assertFalse(NOT_CROPPED_LINE in tex)
+    self.assertFalse('pgftabletrim' in self.read_texfile('status_include.tex'))
+    result = py2pgftable.compile_table_job((0, self.texfile(), True, False, True))
+    self.assertTrue(result.ok)
+    self.assertEqual(sorted(result.timings.keys()), ['latex'])
+
+  def test_chunks_trimmed_to_their_width(self):
+    self.build(tightpage=True, max_cells_per_chunk=2)
+    tex = self.read_texfile()
+    self.assertEqual(tex.count('\\begin{preview}'), 2)
+    self.assertEqual(tex.count('\\pgftabletrim\n\\end{preview}'), 2)
+
+  def test_floats_cropped_with_pdfcrop(self):
+    self.build(tightpage=True, caption='Status')
+    self.assertFalse('\\begin{preview}' in self.read_texfile())
+    result = py2pgftable.compile_table_job((0, self.texfile(), True, False, True))
+    self.assertTrue(result.ok)
+    self.assertEqual(sorted(result.timings.keys()), ['latex', 'pdfcrop'])
+
+  def test_combined_floats_cropped_with_pdfcrop(self):
+    tex = combined_document(['a_include.tex', 'b_include.tex'], tightpage=True, floats=[False, True])
+    self.assertEqual(tex.count('\\pgftabletrim\n\\end{preview}'), 1)
+    self.assertTrue(NOT_CROPPED_LINE in tex)
+    self.assertFalse(NOT_CROPPED_LINE in combined_document(['a_include.tex'], tightpage=True))
+
+
+class TestCombinedDocument(LatexTestCase):
+
+  def test_pages_match_single_builds(self):
+    for name in ('a.tex', 'b.tex'):
+      self.build(name, caption='Table '+name[0])
+    include_filenames = [self.texfile(name) for name in ('a_include.tex', 'b_include.tex')]
+    tex = combined_document(include_filenames)
+    self.assertTrue(tex.startswith(STANDALONE_PREAMBLE) and tex.endswith(STANDALONE_END))
+    pages = tex[len(STANDALONE_PREAMBLE):-len(STANDALONE_END)].split('\\clearpage\n')
+    for (page, name, include_filename) in zip(pages, ('a.tex', 'b.tex'), include_filenames):
+      # Every table starts with the counters of a single build, and
+      # typesets the same block as its standalone document:
+      self.assertEqual(page, COUNTERS_RESET+'\\begingroup\n\\input{'+include_filename+'}\n\\endgroup\n')
+      block = self.read_texfile(name)[len(STANDALONE_PREAMBLE):-len(STANDALONE_END)]
+      self.assertTrue(self.read_texfile(os.path.basename(include_filename)).endswith(block))
+    self.assertEqual(len(pages), 2)
+    pages = combined_document(include_filenames, tightpage=True, floats=[True, True]).split('\\clearpage\n')
+    self.assertTrue(all([COUNTERS_RESET+'\\begingroup' in page for page in pages]))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,96 @@
+#File: test_latex_escape.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Escaping of table cells for LaTeX, in particular around math mode,
+##already escaped characters and unbalanced dollar signs.
+##Usage: python -m unittest discover -s tests
+
+
+import os
+import sys
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from latex_escape import escape_latex, escape_latex_cells, get_escaper
+
+
+class TestEscapeLatex(unittest.TestCase):
+
+  def test_underscores(self):
+    self.assertEqual(escape_latex('run_1_a', '\\_'), 'run\\_1\\_a')
+    self.assertEqual(escape_latex('run_1', ' '), 'run 1')
+    self.assertEqual(escape_latex('__', '-'), '--')
+    self.assertEqual(escape_latex('', '\\_'), '')
+
+  def test_already_escaped(self):
+    self.assertEqual(escape_latex('a\\_b_c', '\\_'), 'a\\_b\\_c')
+    self.assertEqual(escape_latex('50\\% & 1\\#', specials=True), '50\\% \\& 1\\#')
+
+  def test_math_mode_kept(self):
+    self.assertEqual(escape_latex('$x_1$ of run_1', '\\_'), '$x_1$ of run\\_1')
+    self.assertEqual(escape_latex('$a_1$_$b_2$', '\\_'), '$a_1$\\_$b_2$')
+    self.assertEqual(escape_latex('$50%$ & #_1', '\\_', specials=True), '$50%$ \\& \\#\\_1')
+    self.assertEqual(escape_latex('$$', '\\_'), '$$')
+
+  def test_unbalanced_dollar(self):
+    self.assertEqual(escape_latex('cost_$5', '\\_'), 'cost\\_$5')
+    self.assertEqual(escape_latex('$x_1$ and $y_2', '\\_'), '$x_1$ and $y\\_2')
+    # A single dollar sign among many must not make the escaping quadratic:
+    self.assertEqual(escape_latex('$'+'a_'*10000, '-'), '$'+'a-'*10000)
+
+  def test_specials_only_if_requested(self):
+    self.assertEqual(escape_latex('50% & #1'), '50% & #1')
+    self.assertEqual(escape_latex('50% & #1', specials=True), '50\\% \\& \\#1')
+
+  def test_escapers_compiled_once(self):
+    self.assertTrue(get_escaper('\\_') is get_escaper('\\_'))
+    self.assertFalse(get_escaper('\\_') is get_escaper('\\_', specials=True))
+
+
+class TestEscapeLatexCells(unittest.TestCase):
+
+  def test_list(self):
+    self.assertEqual(escape_latex_cells(['run_1', 2, 0.5, u'a_b'], '\\_'), ['run\\_1', '2', '0.5', u'a\\_b'])
+
+  def test_array_keeps_shape(self):
+    cells = np.array([['a_1', 'b_2'], ['$c_3$', 'd']])
+    escaped = escape_latex_cells(cells, '\\_')
+    self.assertEqual(escaped.shape, (2, 2))
+    self.assertEqual(escaped.tolist(), [['a\\_1', 'b\\_2'], ['$c_3$', 'd']])
+    self.assertEqual(escape_latex_cells(np.array([1, 2]), '\\_').tolist(), ['1', '2'])
+
+  def test_floats_by_repr(self):
+    self.assertEqual(escape_latex_cells([0.1+0.2, 1e-20, np.float64(1.0/3)]), ['0.30000000000000004', '1e-20', '0.3333333333333333'])
+    self.assertEqual(escape_latex_cells(np.array([0.1+0.2, 1e22])).tolist(), ['0.30000000000000004', '1e+22'])
+    self.assertEqual(escape_latex_cells(np.array([0.1], dtype=np.float32)).tolist(), ['0.1'])
+    self.assertEqual(escape_latex_cells(np.array([0.1+0.2, 'a_b'], dtype=object), '\\_').tolist(), ['0.30000000000000004', 'a\\_b'])
+
+  def test_unicode_kept(self):
+    cells = [u'\xe9t\xe9_1', u'$\u03b1_i$', 'x_1']
+    escaped = escape_latex_cells(cells, '\\_')
+    self.assertEqual(escaped, [u'\xe9t\xe9\\_1', u'$\u03b1_i$', 'x\\_1'])
+    self.assertTrue(isinstance(escaped[0], unicode))
+    self.assertTrue(isinstance(escaped[2], str))
+    escaped = escape_latex_cells(np.array(cells, dtype=object), '\\_')
+    self.assertEqual(escaped.tolist(), [u'\xe9t\xe9\\_1', u'$\u03b1_i$', 'x\\_1'])
+    self.assertEqual(escape_latex_cells(np.array([u'\xe9_1'])).tolist(), [u'\xe9_1'])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,229 @@
+#File: test_pgfdata.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Round trips of the pgfplots datafile writers of pgfdata.
+##Usage: python -m unittest discover -s tests
+
+
+import os
+import sys
+import shutil
+import hashlib
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from pgfdata import format_cell, write_array_pgfplots_data_file, write_columns_pgfplots_data_file, PgfplotsDataFileWriter
+from pgfdata import get_column_stage, staged_columns, read_columns_pgfplots_data_file
+from py2pgftable_module import py2pgftable
+from column_stats import load_column_stats, content_sha1, stats_filename
+
+
+class PgfdataTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def datafile(self, name='data.pgfdat'):
+    return os.path.join(self.tmpdir, name)
+
+  def read_lines(self, filename):
+    datafile = open(filename, 'r')
+    lines = datafile.read().splitlines()
+    datafile.close()
+    return lines
+
+  def hash_file(self, filename):
+    datafile = open(filename, 'rb')
+    try:
+      return hashlib.sha1(datafile.read()).hexdigest()
+    finally:
+      datafile.close()
+
+  def assert_round_trip(self, filename, labels, columns):
+    """ Reads the datafile back and compares it, and its sidecar, to 'columns' """
+    (data, status) = read_columns_pgfplots_data_file(filename, labels)
+    self.assertEqual(status, 0)
+    stats = load_column_stats(filename)
+    for label, col in zip(labels, columns):
+      self.assertEqual(data[label].tolist(), [float(format_cell(value)) for value in col])
+      self.assertEqual(stats[label]['min'], data[label].min())
+      self.assertEqual(stats[label]['max'], data[label].max())
+
+
+class TestArrayWriter(PgfdataTestCase):
+
+  def test_float64_round_trip(self):
+    array = np.array([[0.1, 1.0/3.0], [1e-300, 2.0**60], [-7.25, 1e22]])
+    write_array_pgfplots_data_file(self.datafile(), array, ['a', 'b'])
+    self.assert_round_trip(self.datafile(), ['a', 'b'], [array[:, 0], array[:, 1]])
+
+  def test_float32_shortest_repr(self):
+    array = np.array([[0.1, 2.5], [1e-5, 3.3]], dtype=np.float32)
+    write_array_pgfplots_data_file(self.datafile(), array, ['a', 'b'])
+    self.assertEqual(self.read_lines(self.datafile()), ['a\tb', '0.1\t2.5\t', '1e-05\t3.3\t'])
+    self.assert_round_trip(self.datafile(), ['a', 'b'], [array[:, 0], array[:, 1]])
+
+  def test_structured_array(self):
+    array = np.array([(1, 0.5, 'x'), (2, 0.25, 'y')], dtype=[('n', int), ('v', np.float32), ('s', 'S1')])
+    write_array_pgfplots_data_file(self.datafile(), array)
+    self.assertEqual(self.read_lines(self.datafile()), ['n\tv\ts', '1\t0.5\tx\t', '2\t0.25\ty\t'])
+    self.assert_round_trip(self.datafile(), ['n', 'v'], [array['n'], array['v']])
+
+  def test_string_columns_escaped_by_block(self):
+    columns = [np.array(['run_'+str(i) for i in range(5)], dtype=object), np.arange(5)]
+    write_columns_pgfplots_data_file(self.datafile(), columns, array_labels=['run', 'n'], block_cells=4)
+    self.assertEqual(self.read_lines(self.datafile())[1:], ['run_'+str(i)+'\t'+str(i)+'\t' for i in range(5)])
+    columns[0][2] = '$p_2$ & 50%'
+    write_columns_pgfplots_data_file(self.datafile(), columns, array_labels=['run', 'n'], block_cells=4, escape_specials=True)
+    self.assertEqual(self.read_lines(self.datafile())[3], '$p_2$ \\& 50\\%\t2\t')
+
+  def test_sidecar_survives_rewrite_with_same_content(self):
+    array = np.array([[1.0, 2.0], [3.0, 4.0]])
+    sha1 = write_array_pgfplots_data_file(self.datafile(), array, ['a', 'b'])
+    self.assertEqual(sha1, self.hash_file(self.datafile()))
+    self.assertEqual(content_sha1(self.datafile()), sha1)
+    # Mark the sidecar, to see that it is updated, but not recomputed:
+    sidecar = open(stats_filename(self.datafile()), 'r')
+    content = sidecar.read().replace('"count": 2', '"count": 7', 1)
+    sidecar.close()
+    sidecar = open(stats_filename(self.datafile()), 'w')
+    sidecar.write(content)
+    sidecar.close()
+    os.utime(self.datafile(), (0, 0))
+    write_array_pgfplots_data_file(self.datafile(), array, ['a', 'b'])
+    self.assertEqual(sorted([col['count'] for col in load_column_stats(self.datafile()).values()]), [2, 7])
+    write_array_pgfplots_data_file(self.datafile(), array*2, ['a', 'b'])
+    self.assertEqual(load_column_stats(self.datafile())['b']['max'], 8.0)
+    self.assertEqual(content_sha1(self.datafile()), self.hash_file(self.datafile()))
+
+
+class TestStreamingWriter(PgfdataTestCase):
+
+  def test_full_precision_matches_sidecar(self):
+    rows = [[0.1*k, 1.0/(k+3), np.float32(0.1)*k] for k in range(25)]
+    with PgfplotsDataFileWriter(self.datafile(), ['a', 'b', 'c'], flush_rows=7) as writer:
+      writer.write_rows(rows)
+    self.assertEqual(writer.rows_written, 25)
+    self.assertEqual(self.read_lines(self.datafile())[4].split('\t'), [repr(0.1*3), repr(1.0/6), str(np.float32(0.1)*3)])
+    self.assert_round_trip(self.datafile(), ['a', 'b', 'c'], [[row[j] for row in rows] for j in range(3)])
+
+  def test_append_mode(self):
+    with PgfplotsDataFileWriter(self.datafile(), ['a']) as writer:
+      writer.write_row([1])
+    with PgfplotsDataFileWriter(self.datafile(), mode="a") as writer:
+      writer.write_row([2])
+    self.assertEqual(self.read_lines(self.datafile()), ['a', '1', '2'])
+    self.assertRaises(ValueError, writer.write_row, [3])
+
+
+class TestColumnStage(PgfdataTestCase):
+
+  def write_base(self):
+    write_array_pgfplots_data_file(self.datafile(), np.array([[1.0], [2.0]]), ['x'])
+
+  def test_context_manager_writes_columns(self):
+    self.write_base()
+    for sidecar in (False, True):
+      with get_column_stage(self.datafile(), sidecar=sidecar) as stage:
+        stage.append_column(['y'+str(sidecar), 0.1+0.2, np.float32(0.1)])
+      self.assertFalse(os.path.abspath(self.datafile()) in staged_columns)
+      self.assertRaises(ValueError, stage.append_column, ['z', 1, 2])
+    self.assertEqual(self.read_lines(self.datafile()), ['x\tyFalse\tyTrue', '1.0\t0.30000000000000004\t0.30000000000000004', '2.0\t0.1\t0.1'])
+    self.assertEqual(sorted(os.listdir(self.tmpdir)), ['data.pgfdat', 'data.pgfdat.colstats'])
+
+  def test_read_flushes_stage(self):
+    self.write_base()
+    stage = get_column_stage(self.datafile())
+    stage.append_column(['y', 3, 4])
+    (data, status) = read_columns_pgfplots_data_file(self.datafile(), ['y'])
+    self.assertEqual(data['y'].tolist(), [3.0, 4.0])
+    stage.append_column(['z', 5, 6])
+    stage.close()
+    self.assertEqual(self.read_lines(self.datafile())[1:], ['1.0\t3\t5', '2.0\t4\t6'])
+
+  def test_rewrite_discards_stage(self):
+    for sidecar in (False, True):
+      self.write_base()
+      get_column_stage(self.datafile(), sidecar=sidecar).append_column(['y', 3, 4])
+      write_array_pgfplots_data_file(self.datafile(), np.array([[5.0], [6.0], [7.0]]), ['x'])
+      self.assertFalse(os.path.abspath(self.datafile()) in staged_columns)
+      self.assertEqual(sorted(os.listdir(self.tmpdir)), ['data.pgfdat', 'data.pgfdat.colstats'])
+      # The new stage counts the lines of the rewritten file:
+      with get_column_stage(self.datafile(), sidecar=sidecar) as stage:
+        stage.append_column(['z', 8, 9, 10])
+      self.assertEqual(self.read_lines(self.datafile()), ['x\tz', '5.0\t8', '6.0\t9', '7.0\t10'])
+
+  def test_py2pgfplots_writers_discard_stage(self):
+    self.write_base()
+    py2pgftable.append_column_pgfplots_data_file_simple(self.datafile(), ['y', 3, 4], staged=True)
+    py2pgftable.write_pgfplots_data_file(None, self.datafile(), [['a', 1]], ['name', 'n'])
+    self.assertFalse(os.path.abspath(self.datafile()) in staged_columns)
+    self.assertEqual(self.read_lines(self.datafile()), ['name\tn', 'a\t1\t'])
+    py2pgftable.append_column_pgfplots_data_file_simple(self.datafile(), ['y', 3], staged=True)
+    py2pgftable.write_pgfplots_data_file_header_simple(self.datafile(), ['x'])
+    py2pgftable.append_pgfplots_data_file_simple(self.datafile(), ['1'])
+    self.assertEqual(self.read_lines(self.datafile()), ['x', '1'])
+
+  def test_unstaged_append_writes_stage_first(self):
+    self.write_base()
+    py2pgftable.append_column_pgfplots_data_file_simple(self.datafile(), ['y', 3, 4], staged=True)
+    py2pgftable.append_column_pgfplots_data_file_simple(self.datafile(), ['z', 5, 6])
+    self.assertEqual(self.read_lines(self.datafile()), ['x\ty\tz', '1.0\t3\t5', '2.0\t4\t6'])
+    # A column of the wrong length is reported, and the file is kept:
+    py2pgftable.append_column_pgfplots_data_file_simple(self.datafile(), ['w', 7])
+    self.assertEqual(self.read_lines(self.datafile())[0], 'x\ty\tz')
+
+
+class TestReader(PgfdataTestCase):
+
+  def write_text(self, text):
+    datafile = open(self.datafile(), 'w')
+    datafile.write(text)
+    datafile.close()
+
+  def test_numeric_with_blank_lines(self):
+    self.write_text('a\tb\n1\t2\t\n\n3\t4\t\n\n')
+    (data, status) = read_columns_pgfplots_data_file(self.datafile(), ['b', 'a'])
+    self.assertEqual(status, 0)
+    self.assertEqual((data['a'].tolist(), data['b'].tolist()), ([1.0, 3.0], [2.0, 4.0]))
+
+  def test_csv_without_final_newline(self):
+    self.write_text('a,b\n1,2\n3,4')
+    (data, status) = read_columns_pgfplots_data_file(self.datafile(), ['b'])
+    self.assertEqual((data['b'].tolist(), status), ([2.0, 4.0], 0))
+
+  def test_non_numeric_columns(self):
+    self.write_text('name\tx\nrun_1\t0.5\nrun_2\t1e-3\n')
+    (data, status) = read_columns_pgfplots_data_file(self.datafile(), ['x'])
+    self.assertEqual((data['x'].tolist(), status), ([0.5, 1e-3], 0))
+    (data, status) = read_columns_pgfplots_data_file(self.datafile(), ['name'])
+    self.assertEqual(status, 2)
+
+  def test_missing_column(self):
+    self.write_text('a\n1\n')
+    (data, status) = read_columns_pgfplots_data_file(self.datafile(), ['b'])
+    self.assertEqual((data, status), ({}, 1))
+
+
+if __name__ == '__main__':
+  unittest.main()
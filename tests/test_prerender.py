@@ -0,0 +1,51 @@
+#File: test_prerender.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Rendering of string columns in Python, before the datafile is written.
+##Usage: python -m unittest discover -s tests
+
+
+import os
+import sys
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from prerender import render_column
+
+
+class TestRenderColumn(unittest.TestCase):
+
+  def test_replacements_and_escaping(self):
+    cells = np.array(['run_1', 'True', 'run_1', 'a b'], dtype=object)
+    rendered = render_column(cells, {'True': '\\checkmark'}, [], escape=True)
+    self.assertEqual(rendered.tolist(), ['run\\_1', '\\checkmark', 'run\\_1', '{a b}'])
+
+  def test_numbers_formatted_as_in_the_datafile(self):
+    rendered = render_column(np.array([0.1+0.2, 0.5, 0.1+0.2]), {'0.5': 'half'}, [])
+    self.assertEqual(rendered.tolist(), ['0.30000000000000004', 'half', '0.30000000000000004'])
+    self.assertEqual(render_column(np.array([0.1, 2.5], dtype=np.float32), {}, []).tolist(), ['0.1', '2.5'])
+    self.assertEqual(render_column(np.array([1.0/3, 'x_1'], dtype=object), {}, [], escape=True).tolist(), ['0.3333333333333333', 'x\\_1'])
+
+  def test_unicode_cells(self):
+    rendered = render_column(np.array([u'\xe9t\xe9_1', 'b'], dtype=object), {}, [], escape=True)
+    self.assertEqual(rendered.tolist(), [u'\xe9t\xe9\\_1', 'b'])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,102 @@
+#File: test_status_table.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Builds of status tables through Py2pgfplots.write_dict_status_pgftable,
+##without compiling them: the datafiles, their sidecars, and the files
+##the build manifest keeps or rewrites.
+##Usage: python -m unittest discover -s tests
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+from py2pgftable_module import py2pgftable
+from pgfdata import read_columns_pgfplots_data_file
+from column_stats import content_sha1
+from build_manifest import hash_file, pgftable_data_filename
+
+STATUS = {
+  'run_1': {'error': 1.5e-3, 'steps': 10},
+  'run_2': {'error': 2.25e-4, 'steps': 20},
+  'run_10': {'error': 0.1, 'steps': 40},
+}
+
+
+class TestStatusTable(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.datafile = pgftable_data_filename(self.tmpdir, 'status.tex')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def build(self, status=STATUS, **kwargs):
+    py2pgftable.write_dict_status_pgftable(self.tmpdir, 'status.tex', status, 'run', pdflatex=False, **kwargs)
+
+  def test_datafile_round_trip(self):
+    self.build()
+    (data, status) = read_columns_pgfplots_data_file(self.datafile, ['error', 'steps'])
+    self.assertEqual(status, 0)
+    self.assertEqual(data['error'].tolist(), [1.5e-3, 2.25e-4, 0.1])
+    self.assertEqual(data['steps'].tolist(), [10, 20, 40])
+
+  def test_incremental_sidecars(self):
+    self.build(incremental=True)
+    self.assertEqual(sorted([name for name in os.listdir(self.tmpdir) if 'pgfdat' in name]), ['status_data.pgfdat', 'status_data.pgfdat.colstats', 'status_data.pgfdat.schema'])
+    self.assertEqual(content_sha1(self.datafile), hash_file(self.datafile))
+
+  def test_incremental_keeps_unchanged_files(self):
+    self.build(incremental=True)
+    filenames = [os.path.join(self.tmpdir, 'status.tex'), self.datafile]
+    for filename in filenames:
+      os.utime(filename, (0, 0))
+    self.build(incremental=True)
+    self.assertEqual([os.path.getmtime(filename) for filename in filenames], [0, 0])
+    self.assertEqual(content_sha1(self.datafile), hash_file(self.datafile))
+    status = dict(STATUS)
+    status['run_3'] = {'error': 0.5, 'steps': 30}
+    self.build(status=status, incremental=True)
+    self.assertNotEqual(os.path.getmtime(self.datafile), 0)
+    self.assertEqual(content_sha1(self.datafile), hash_file(self.datafile))
+    (data, code) = read_columns_pgfplots_data_file(self.datafile, ['steps'])
+    self.assertEqual(data['steps'].tolist(), [10, 20, 30, 40])
+
+  def datafiles(self):
+    return sorted([name for name in os.listdir(self.tmpdir) if 'pgfdat' in name])
+
+  def test_shrinking_chunked_table(self):
+    status = dict([('run_'+str(i), {'error': 0.5**i, 'steps': i}) for i in range(1, 7)])
+    self.build(status=status, max_cells_per_chunk=6)
+    self.assertEqual(self.datafiles(), ['status_data_part'+str(k)+'.pgfdat'+suffix for k in range(3) for suffix in ('', '.colstats')])
+    del status['run_5'], status['run_6']
+    self.build(status=status, max_cells_per_chunk=6)
+    self.assertEqual(self.datafiles(), ['status_data_part'+str(k)+'.pgfdat'+suffix for k in range(2) for suffix in ('', '.colstats')])
+    del status['run_3'], status['run_4']
+    self.build(status=status, max_cells_per_chunk=6)
+    self.assertEqual(self.datafiles(), ['status_data.pgfdat', 'status_data.pgfdat.colstats', 'status_data.pgfdat.schema'])
+    status['run_3'] = {'error': 0.125, 'steps': 3}
+    self.build(status=status, max_cells_per_chunk=6)
+    self.assertEqual(self.datafiles(), ['status_data_part'+str(k)+'.pgfdat'+suffix for k in range(2) for suffix in ('', '.colstats')])
+
+
+if __name__ == '__main__':
+  unittest.main()
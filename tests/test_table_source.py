@@ -0,0 +1,76 @@
+#File: test_table_source.py
+#Copyright (C) 2013 Frank Milthaler.
+#
+#This file is part of Py2PGFTable.
+#
+#Py2PGFTable is free software: you can redistribute it and/or modify
+#it under the terms of the GNU General Public License as published by
+#the Free Software Foundation, either version 3 of the License, or
+#(at your option) any later version.
+
+#Py2PGFTable is distributed in the hope that it will be useful,
+#but WITHOUT ANY WARRANTY; without even the implied warranty of
+#MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#GNU General Public License for more details.
+#
+#You should have received a copy of the GNU General Public License
+#along with Py2PGFTable. If not, see <http://www.gnu.org/licenses/>.
+#
+##Conversion of the supported table inputs into columns.
+##Usage: python -m unittest discover -s tests
+
+
+import os
+import sys
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from table_source import table_columns, project_columns, MISSING_CELL
+
+
+class TestTableColumns(unittest.TestCase):
+
+  def test_row_dicts_sorted_nicely(self):
+    data = {'run10': {'n': 3}, 'run9': {'n': 2}, 'run1': {'n': 1}}
+    (labels, columns) = table_columns(data, 'run')
+    self.assertEqual(labels, ['run', 'n'])
+    self.assertEqual(columns[0].tolist(), ['run1', 'run9', 'run10'])
+    self.assertEqual(columns[1].tolist(), [1, 2, 3])
+    self.assertEqual(columns[1].dtype.kind, 'i')
+
+  def test_row_dicts_with_missing_keys(self):
+    data = {'a': {'x': 1, 'z': 'p_1'}, 'b': {'x': 2, 'y': 0.5}, 'c': {'y': 0.25, 'z': 3}}
+    (labels, columns) = table_columns(data, 'run')
+    self.assertEqual(labels, ['run', 'x', 'z', 'y'])
+    self.assertEqual(columns[1].dtype, np.float64)
+    self.assertEqual(columns[1][:2].tolist(), [1.0, 2.0])
+    self.assertTrue(np.isnan(columns[1][2]))
+    self.assertEqual(columns[2].tolist(), ['p_1', MISSING_CELL, '3'])
+    self.assertTrue(np.isnan(columns[3][0]))
+    self.assertEqual(columns[3][1:].tolist(), [0.5, 0.25])
+
+  def test_row_dicts_with_booleans(self):
+    (labels, columns) = table_columns({'a': {'ok': True}, 'b': {'ok': False}}, 'run')
+    self.assertEqual(columns[1].tolist(), ['True', 'False'])
+
+  def test_column_dict(self):
+    (labels, columns) = table_columns({'x': [1, 2], 'run': ['a', 'b']}, 'run')
+    self.assertEqual(labels, ['run', 'x'])
+    self.assertRaises(ValueError, table_columns, {'x': [1, 2], 'run': ['a']}, 'run')
+    self.assertRaises(ValueError, table_columns, {'x': [1, 2]}, 'run')
+
+  def test_structured_array(self):
+    array = np.array([(1.5, 'a')], dtype=[('x', float), ('run', 'S1')])
+    (labels, columns) = table_columns(array, 'run')
+    self.assertEqual(labels, ['run', 'x'])
+    self.assertTrue(np.may_share_memory(columns[1], array))
+    self.assertRaises(TypeError, table_columns, np.zeros((2, 2)), 'run')
+
+  def test_project_keeps_first_column(self):
+    (labels, columns) = project_columns(['run', 'x', 'y'], [0, 1, 2], ['y', 'z'])
+    self.assertEqual((labels, columns), (['run', 'y'], [0, 2]))
+
+
+if __name__ == '__main__':
+  unittest.main()